@@ -5,6 +5,7 @@ import requests
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from agent.report_generator import generate_wildfire_report
+from app.services.keywords import get_agent_matcher
 from ddgs import DDGS
 
 
@@ -64,18 +65,15 @@ def analyze_website(url: str) -> dict:
     # --------------------------------
     # STEP 4: Detect wildfire programs
     # --------------------------------
-    program_keywords = [
-        "fire risk", "fire management", "wildfire", "hazard", "satellite", "detection",
-        "response", "preparedness", "mapping", "data", "analytics", "insurance", "climate"
-    ]
+    matcher = get_agent_matcher()
     programs = []
     for link in soup.find_all("a", href=True):
-        text_lower = link.get_text().lower()
-        if any(k in text_lower for k in program_keywords):
+        keywords = matcher.find(link.get_text())
+        if keywords:
             programs.append({
                 "name": link.get_text(strip=True),
                 "description": f"Program or resource related to {link.get_text(strip=True)}",
-                "keywords": [k for k in program_keywords if k in text_lower]
+                "keywords": [k.rstrip("*") for k in keywords]
             })
     programs = programs[:10] if programs else []
 
@@ -13,6 +13,9 @@ import requests
 from bs4 import BeautifulSoup
 import openai
 from agent.report_generator import generate_wildfire_report
+from app.services.keywords import get_agent_matcher
+from app.services.llm_client import create_chat_completion
+from app.services.llm_telemetry import telemetry
 
 
 
@@ -103,8 +106,8 @@ def analyze_website(url: str) -> dict:
 
     print(f"🔍 Analyzing {url} with GPT-4o...")
 
-    client = openai.OpenAI(api_key=openai.api_key)
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        "wildfire_agent",
         model="gpt-4o",
         messages=[
     {"role": "system", "content": "You are an AI assistant extracting wildfire-related organization info in JSON."},
@@ -133,6 +136,13 @@ Return valid JSON only. Text: {website_text}
         print(f"⚠️ Failed to parse GPT output for {url}")
         return {}
 
+    # Tag programs with the shared keyword list when the model left keywords out
+    matcher = get_agent_matcher()
+    for program in analysis_json.get("programs") or []:
+        if isinstance(program, dict) and not program.get("keywords"):
+            text = f"{program.get('name') or ''} {program.get('description') or ''}"
+            program["keywords"] = [k.rstrip("*") for k in matcher.find(text)]
+
     return {"url": url, "data": analysis_json}
 
 # ---------------------------------------------------------
@@ -252,6 +262,10 @@ if __name__ == "__main__":
 
         generate_wildfire_report(formatted_results, filename_prefix="wildfire_report")
 
+    print("📊 LLM telemetry:")
+    print(telemetry.format_summary())
+    telemetry.save_snapshot("wildfire_agent")
+
 
     
 headers = {
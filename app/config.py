@@ -152,15 +152,137 @@ class Settings:
         # 🔹 OpenAI configuration
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.llm_model = "gpt-4o-mini"
+        self.llm_base_url = os.getenv("OPENAI_BASE_URL")  # None = api.openai.com
+        self.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.llm_request_timeout = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+        self.llm_max_retry_after_seconds = float(os.getenv("LLM_MAX_RETRY_AFTER", "30"))  # cap on server Retry-After
+
+        # 🔹 Local LLM stub server (OpenAI-compatible, for benchmarking)
+        # Set LLM_STUB_ENABLED=true to point every LLM client at the stub
+        # started with `python app/workers/llm_stub_server.py`.
+        self.llm_stub_enabled = os.getenv("LLM_STUB_ENABLED", "false").lower() == "true"
+        self.llm_stub_host = os.getenv("LLM_STUB_HOST", "127.0.0.1")
+        self.llm_stub_port = int(os.getenv("LLM_STUB_PORT", "8900"))
+        self.llm_stub_latency_distribution = os.getenv("LLM_STUB_LATENCY", "lognormal")  # fixed | uniform | normal | lognormal
+        self.llm_stub_latency_mean_ms = float(os.getenv("LLM_STUB_LATENCY_MEAN_MS", "800"))
+        self.llm_stub_latency_stddev_ms = float(os.getenv("LLM_STUB_LATENCY_STDDEV_MS", "300"))
+        self.llm_stub_error_rate = float(os.getenv("LLM_STUB_ERROR_RATE", "0.0"))  # fraction answered with HTTP 500
+        self.llm_stub_rate_limit_rate = float(os.getenv("LLM_STUB_RATE_LIMIT_RATE", "0.0"))  # fraction answered with HTTP 429
+        self.llm_stub_retry_after_seconds = float(os.getenv("LLM_STUB_RETRY_AFTER", "1"))
+        self.llm_stub_responses_path = os.getenv("LLM_STUB_RESPONSES_PATH")  # optional canned responses JSON
+        self.llm_stub_seed = int(os.getenv("LLM_STUB_SEED", "42"))
+
+        if self.llm_stub_enabled:
+            self.llm_base_url = f"http://{self.llm_stub_host}:{self.llm_stub_port}/v1"
+            self.openai_api_key = self.openai_api_key or "sk-local-stub"
+
+        # Workers and agents save their LLM telemetry here on exit so /api/metrics/llm can show it
+        self.llm_telemetry_dir = os.getenv("LLM_TELEMETRY_DIR", "data/telemetry")
+
+        # LLM pricing for telemetry cost estimates (USD per 1M tokens)
+        self.llm_pricing = {
+            "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+            "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+        }
+
+        # Incremental extraction
+        self.extraction_concurrency = int(os.getenv("EXTRACTION_CONCURRENCY", "4"))
+
+        # Embeddings for deduplication: local (sentence-transformers) or openai.
+        # Vectors are cached as float16 in a SQLite file keyed by model + text hash.
+        self.embeddings_provider = os.getenv("EMBEDDINGS_PROVIDER", "local")
+        self.embeddings_model = os.getenv(
+            "EMBEDDINGS_MODEL", "all-MiniLM-L6-v2" if self.embeddings_provider == "local" else "text-embedding-3-large"
+        )
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+        self.embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", "data/cache/embedding_cache.sqlite")
+
+        # Dedup candidate generation (app/services/dedup_candidates.py): k nearest
+        # neighbours over name embeddings (hnswlib if installed and the table is
+        # large, else NumPy brute force), MinHash-LSH on name shingles, and equal
+        # registered website domains
+        self.dedup_ann_neighbors = int(os.getenv("DEDUP_ANN_NEIGHBORS", "10"))
+        self.dedup_ann_min_similarity = float(os.getenv("DEDUP_ANN_MIN_SIMILARITY", "0.8"))
+        self.dedup_hnsw_min_size = int(os.getenv("DEDUP_HNSW_MIN_SIZE", "20000"))
+        self.dedup_shingle_size = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))
+        self.dedup_minhash_bands = int(os.getenv("DEDUP_MINHASH_BANDS", "16"))
+        self.dedup_minhash_rows = int(os.getenv("DEDUP_MINHASH_ROWS", "4"))  # bands * rows permutations
+        self.dedup_lsh_max_bucket = int(os.getenv("DEDUP_LSH_MAX_BUCKET", "500"))
+        self.dedup_merge_batch_size = int(os.getenv("DEDUP_MERGE_BATCH_SIZE", "300"))  # merged orgs per UPDATE
+        self.dedup_max_cluster_size = int(os.getenv("DEDUP_MAX_CLUSTER_SIZE", "10"))  # larger clusters are not merged
 
         # GeoTIFF paths
         self.geotiff_susceptibility = "data/susceptibility.tif"
         self.geotiff_ignition = "data/ignition.tif"
 
+        # Raster access: windowed (GDAL block reads), memory (load into RAM)
+        # or mmap (memory-map an uncompressed .npy copy in raster_cache_dir)
+        self.raster_load_mode = os.getenv("RASTER_LOAD_MODE", "windowed")
+        self.raster_max_memory_mb = int(os.getenv("RASTER_MAX_MEMORY_MB", "2048"))  # per layer
+        self.raster_cache_dir = os.getenv("RASTER_CACHE_DIR", "data/raster_cache")
+
+        # Precomputed exposure raster (app/workers/build_exposure_raster.py).
+        # Used for overlays when its stamped weights match the ones below;
+        # with overlay_sample_components off, overlay is a single lookup.
+        self.geotiff_exposure = os.getenv("GEOTIFF_EXPOSURE", "data/exposure.tif")
+        self.overlay_sample_components = os.getenv("OVERLAY_SAMPLE_COMPONENTS", "true").lower() == "true"
+
+        # Zonal statistics (app/workers/refresh_zonal_stats.py): mean/max/percentile
+        # of each layer within these buffers around every org
+        self.zonal_buffers_km = [float(b) for b in os.getenv("ZONAL_BUFFERS_KM", "1,5,25").split(",") if b]
+        self.zonal_percentile = float(os.getenv("ZONAL_PERCENTILE", "90"))
+        self.zonal_tile_px = int(os.getenv("ZONAL_TILE_PX", "512"))
+
+        # Layer versioning (app/workers/refresh_risk_layers.py): rasters are
+        # fingerprinted per tile so a refresh only re-samples orgs in changed tiles
+        self.layer_tile_px = int(os.getenv("LAYER_TILE_PX", "512"))
+
+        # Geocoding cache (SQLite file shared by the API, agents and workers)
+        self.geocode_cache_path = os.getenv("GEOCODE_CACHE_PATH", "data/cache/geocode_cache.sqlite")
+        self.geocode_cache_hit_ttl_days = float(os.getenv("GEOCODE_CACHE_HIT_TTL_DAYS", "180"))
+        self.geocode_cache_miss_ttl_days = float(os.getenv("GEOCODE_CACHE_MISS_TTL_DAYS", "14"))
+
+        # Geocoder chain: resolvers tried in order until one is precise enough
+        # (precision: country < region < county < city < address)
+        self.geocode_resolvers = os.getenv("GEOCODE_RESOLVERS", "gazetteer,nominatim").split(",")
+        self.geocode_min_precision = os.getenv("GEOCODE_MIN_PRECISION", "region")
+        self.gazetteer_path = os.getenv("GAZETTEER_PATH", "data/gazetteer/gazetteer.csv")
+
+        # Geocoding worker: network providers (nominatim, photon, arcgis) are
+        # fanned out across threads, each held to its own requests/second
+        self.geocode_provider_rps = {"nominatim": 1.0, "photon": 1.0, "arcgis": 5.0}
+        self.geocode_worker_threads = int(os.getenv("GEOCODE_WORKER_THREADS", "4"))
+        self.overlay_batch_size = int(os.getenv("OVERLAY_BATCH_SIZE", "500"))
+
+        # Parallel overlay (app/workers/overlay_orgs.py --parallel): orgs are
+        # partitioned by raster tile and sampled in a process pool; use
+        # RASTER_LOAD_MODE=mmap so workers share raster pages
+        self.overlay_workers = int(os.getenv("OVERLAY_WORKERS", str(os.cpu_count() or 1)))
+        self.overlay_partition_px = int(os.getenv("OVERLAY_PARTITION_PX", "2048"))
+
+        # Spatial queries (/api/orgs/spatial/*): in-process grid index over org lat/lon
+        self.spatial_index_cell_deg = float(os.getenv("SPATIAL_INDEX_CELL_DEG", "0.5"))
+        self.spatial_index_refresh_seconds = int(os.getenv("SPATIAL_INDEX_REFRESH_SECONDS", "300"))
+
         # Scoring weights
         self.susceptibility_weight = 0.6
         self.ignition_weight = 0.4
 
+        # Risk layer stack. Layers with a path are opened on first use and
+        # sampled together; exposure is the weight-normalised sum of the
+        # layers with weight > 0. RISK_LAYER_WEIGHTS="hazard:0.2,fuel:0.1"
+        self.risk_layers = {
+            "susceptibility": {"path": self.geotiff_susceptibility, "weight": self.susceptibility_weight},
+            "ignition": {"path": self.geotiff_ignition, "weight": self.ignition_weight},
+            "hazard": {"path": os.getenv("GEOTIFF_HAZARD"), "weight": 0.0},
+            "fuel": {"path": os.getenv("GEOTIFF_FUEL"), "weight": 0.0},
+            "wui_density": {"path": os.getenv("GEOTIFF_WUI_DENSITY"), "weight": 0.0},
+            "burn_probability": {"path": os.getenv("GEOTIFF_BURN_PROBABILITY"), "weight": 0.0},
+        }
+        for item in filter(None, os.getenv("RISK_LAYER_WEIGHTS", "").split(",")):
+            name, weight = item.split(":")
+            self.risk_layers.setdefault(name.strip(), {"path": None, "weight": 0.0})["weight"] = float(weight)
+
         # Lead scoring settings
         self.sector_base_scores = {
             "Government": 70,
@@ -177,5 +299,36 @@ class Settings:
         self.tier_a_threshold = 70
         self.tier_b_threshold = 50
 
+        # Incremental rescoring (app/workers/rescoring_worker.py): changes to
+        # score inputs queue orgs in org_score_dirty
+        self.rescoring_batch_size = int(os.getenv("RESCORING_BATCH_SIZE", "1000"))
+        self.rescoring_poll_seconds = float(os.getenv("RESCORING_POLL_SECONDS", "30"))
+        self.what_if_snapshot_ttl_seconds = int(os.getenv("WHAT_IF_SNAPSHOT_TTL_SECONDS", "300"))
+
+        # Keyword matching (app/services/keywords.py): whole-word, case-insensitive,
+        # "*" suffix = prefix match. Weights scale the per-program bonus.
+        self.program_keywords = {
+            "wildfire*": 1.0,
+            "fire*": 1.0,
+            "wui": 1.0,
+            "mitigation": 1.0,
+            "psps": 1.0,
+            "underwriting": 1.0,
+            "hazard*": 1.0,
+            "risk assessment*": 1.0,
+            "emergency": 1.0,
+        }
+        self.agent_program_keywords = [
+            "fire risk", "fire management", "wildfire*", "hazard*", "satellite*", "detection",
+            "response", "preparedness", "mapping", "data", "analytics", "insurance", "climate",
+        ]
+
+        # Model-based propensity score (app/services/propensity_model.py), trained
+        # from reviewer decisions with app/workers/train_propensity_model.py and
+        # written to lead_scoring.model_score next to the rule score
+        self.propensity_model_enabled = os.getenv("PROPENSITY_MODEL_ENABLED", "true").lower() == "true"
+        self.propensity_model_path = os.getenv("PROPENSITY_MODEL_PATH", "data/models/propensity_model.npz")
+        self.propensity_model_min_labels = int(os.getenv("PROPENSITY_MODEL_MIN_LABELS", "20"))
+
 
 settings = Settings()
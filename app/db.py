@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import and_, create_engine, func, literal, select
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
@@ -29,3 +30,51 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def bulk_upsert(db, model, rows, index_elements, update_columns=None):
+    """INSERT ... ON CONFLICT DO UPDATE for many rows in one executemany.
+
+    db may be a Session or a Connection (e.g. inside flush events). On
+    databases without native upsert each row is written with a Core
+    UPDATE, then an INSERT if no row matched.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    if update_columns is None:
+        update_columns = [c for c in rows[0].keys() if c not in index_elements]
+    touch_updated_at = "updated_at" in table.c and "updated_at" not in update_columns
+
+    dialect = db.dialect.name if isinstance(db, Connection) else db.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        _update_then_insert(db, table, rows, index_elements, update_columns, touch_updated_at)
+        return
+
+    stmt = insert(table)
+    set_ = {c: stmt.excluded[c] for c in update_columns}
+    if touch_updated_at:
+        set_["updated_at"] = func.now()
+    if set_:
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    db.execute(stmt, rows)
+
+
+def _update_then_insert(db, table, rows, index_elements, update_columns, touch_updated_at):
+    """Portable upsert, one row at a time"""
+    for row in rows:
+        match = and_(*(table.c[c] == row[c] for c in index_elements))
+        values = {c: row[c] for c in update_columns}
+        if touch_updated_at:
+            values["updated_at"] = func.now()
+        if values:
+            if db.execute(table.update().where(match).values(values)).rowcount:
+                continue
+        elif db.execute(select(literal(1)).select_from(table).where(match)).first():
+            continue
+        db.execute(table.insert().values(row))
@@ -4,7 +4,7 @@ from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
-from app.routes import orgs, contacts, review, export
+from app.routes import orgs, contacts, review, export, metrics, scoring
 from app.ui import admin
 
 # Configure logging
@@ -32,6 +32,8 @@ app.include_router(orgs.router, prefix="/api/orgs", tags=["organizations"])
 app.include_router(contacts.router, prefix="/api/contacts", tags=["contacts"])
 app.include_router(review.router, prefix="/api/review", tags=["review"])
 app.include_router(export.router, prefix="/api/export", tags=["export"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+app.include_router(scoring.router, prefix="/api/scoring", tags=["scoring"])
 
 # Include UI routes
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
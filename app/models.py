@@ -1,9 +1,10 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Boolean, DateTime, Text, ForeignKey, Enum, JSON, UniqueConstraint, Index, event, inspect
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, Session
 from sqlalchemy.sql import func
 import uuid
-from app.db import Base
+from datetime import datetime, timezone
+from app.db import Base, bulk_upsert
 
 class Organization(Base):
     __tablename__ = "organizations"
@@ -18,6 +19,7 @@ class Organization(Base):
     size_band = Column(String(50), nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geocode_precision = Column(String(20), nullable=True)  # country/region/county/city/address; None if entered
     geom = Column(String(100), nullable=True)  # Simplified for now
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -67,6 +69,9 @@ class RiskOverlay(Base):
     susceptibility = Column(Float, nullable=True)
     ignition = Column(Float, nullable=True)
     exposure_score = Column(Float, nullable=True)
+    layer_values = Column(JSON, nullable=True)  # {layer name: sampled value} for the whole raster stack
+    zonal_stats = Column(JSON, nullable=True)  # {layer: {"5km": {"mean", "max", "p90"}}}
+    layer_versions = Column(JSON, nullable=True)  # {layer name: RiskLayerVersion.version} used for the values
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
@@ -87,6 +92,21 @@ class Source(Base):
     
     # Relationships
     organization = relationship("Organization", back_populates="sources")
+    extraction = relationship("ExtractionProvenance", back_populates="source", uselist=False, cascade="all, delete-orphan")
+
+class ExtractionProvenance(Base):
+    __tablename__ = "extraction_provenance"
+    
+    source_id = Column(UUID(as_uuid=True), ForeignKey("sources.source_id"), primary_key=True)
+    org_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    content_sha256 = Column(String(64), nullable=False)
+    prompt_version = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    success = Column(Boolean, nullable=False, default=True)
+    extracted_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    source = relationship("Source", back_populates="extraction")
 
 class LeadScoring(Base):
     __tablename__ = "lead_scoring"
@@ -97,8 +117,142 @@ class LeadScoring(Base):
     rationale = Column(Text, nullable=False)
     reviewer_status = Column(Enum("pending", "approved", "rejected", name="reviewer_status_enum"), default="pending")
     reviewer_notes = Column(Text, nullable=True)
+    config_version = Column(Integer, ForeignKey("scoring_config_versions.id"), nullable=True)
+    model_score = Column(Float, nullable=True)  # 0-100 from the propensity model, if one is trained
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     organization = relationship("Organization", back_populates="lead_scoring")
+
+class RiskLayerVersion(Base):
+    __tablename__ = "risk_layer_versions"
+    __table_args__ = (UniqueConstraint("layer", "version", name="uq_risk_layer_version"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    layer = Column(String(100), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    path = Column(String(1000), nullable=False)
+    file_size = Column(BigInteger, nullable=True)
+    file_mtime = Column(Float, nullable=True)
+    checksum = Column(String(64), nullable=False)
+    tile_size = Column(Integer, nullable=False)
+    grid = Column(JSON, nullable=False)  # {"transform": [...], "height": h, "width": w}
+    tile_hashes = Column(JSON, nullable=False)  # {"<tile row>_<tile col>": hash}
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ScoringConfigVersion(Base):
+    __tablename__ = "scoring_config_versions"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    config_hash = Column(String(64), nullable=False, unique=True)
+    config = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# 4-byte floats; BIGINT ids only autoincrement as INTEGER on SQLite
+CompactFloat = Float(precision=24)
+HistoryId = BigInteger().with_variant(Integer, "sqlite")
+
+class LeadScoringHistory(Base):
+    """Append-only record of every score written, with its component breakdown"""
+    __tablename__ = "lead_scoring_history"
+    __table_args__ = (Index("ix_lead_scoring_history_version_org", "config_version", "org_id"),)
+    
+    id = Column(HistoryId, primary_key=True, autoincrement=True)
+    org_id = Column(UUID(as_uuid=True), nullable=False, index=True)  # no FK: history outlives orgs
+    config_version = Column(Integer, ForeignKey("scoring_config_versions.id"), nullable=False)
+    score = Column(CompactFloat, nullable=False)
+    tier = Column(String(1), nullable=False)
+    base = Column(CompactFloat, nullable=False)
+    exposure_bonus = Column(CompactFloat, nullable=False)
+    program_bonus = Column(CompactFloat, nullable=False)
+    contact_bonus = Column(CompactFloat, nullable=False)
+    country_bonus = Column(CompactFloat, nullable=False)
+    scored_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class OrgScoreDirty(Base):
+    __tablename__ = "org_score_dirty"
+    
+    # No FK: marks must survive (and be cleaned up after) org deletes and merges
+    org_id = Column(UUID(as_uuid=True), primary_key=True)
+    marked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+class StatsSummary(Base):
+    __tablename__ = "stats_summaries"
+    
+    # One precomputed aggregate document per key (e.g. "organizations"), recomputed on read once marked stale
+    key = Column(String(50), primary_key=True)
+    data = Column(JSON, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    stale = Column(Boolean, nullable=False, default=False)  # set by writers; the next read recomputes
+
+
+# Score inputs: changes to these mark the org for rescoring
+_SCORED_COLUMNS = {
+    Organization: {"sector", "country"},
+    RiskOverlay: {"exposure_score"},
+    Program: {"org_id", "name", "description"},
+    Contact: {"org_id", "verified_bool"},
+}
+
+
+def mark_orgs_dirty(db, org_ids):
+    """Queue orgs for the rescoring worker (for bulk writes that bypass ORM events)"""
+    now = datetime.now(timezone.utc)
+    rows = [{"org_id": org_id, "marked_at": now} for org_id in {o for o in org_ids if o is not None}]
+    # Re-marking refreshes marked_at so a change made mid-rescore is not cleared by it
+    bulk_upsert(db, OrgScoreDirty, rows, index_elements=["org_id"], update_columns=["marked_at"])
+
+
+# Columns aggregated by the stats summary: changes to these mark it stale
+_SUMMARY_COLUMNS = {
+    Organization: {"sector", "country"},
+    LeadScoring: {"tier", "reviewer_status", "propensity_score", "model_score"},
+}
+
+
+def mark_stats_summary_stale(db):
+    """Flag the stored stats summary for recomputation on its next read (for writes that bypass ORM events)"""
+    table = StatsSummary.__table__
+    db.execute(table.update().where(table.c.stale.is_(False)).values(stale=True))
+
+
+def _changed_org_ids(obj, columns) -> set:
+    state = inspect(obj)
+    org_ids = set()
+    for column in columns:
+        history = state.attrs[column].history
+        if history.has_changes():
+            org_ids.add(obj.org_id)
+            if column == "org_id":
+                org_ids.update(history.deleted)  # re-parented: old owner changes too
+    return org_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_changed_orgs(session, flush_context):
+    # new/dirty/deleted and attribute history still show the pre-flush state here,
+    # while generated keys (org_id defaults, FK sync) are already populated
+    dirty = set()
+    for obj in list(session.new) + list(session.deleted):
+        if type(obj) in _SCORED_COLUMNS:
+            dirty.add(obj.org_id)
+    for obj in session.dirty:
+        columns = _SCORED_COLUMNS.get(type(obj))
+        if columns and session.is_modified(obj, include_collections=False):
+            dirty.update(_changed_org_ids(obj, columns))
+    if dirty:
+        mark_orgs_dirty(session.connection(), dirty)
+
+    if _summary_changed(session):
+        mark_stats_summary_stale(session.connection())
+
+
+def _summary_changed(session) -> bool:
+    if any(type(obj) in _SUMMARY_COLUMNS for obj in list(session.new) + list(session.deleted)):
+        return True
+    for obj in session.dirty:
+        columns = _SUMMARY_COLUMNS.get(type(obj))
+        if columns and session.is_modified(obj, include_collections=False) and _changed_org_ids(obj, columns):
+            return True
+    return False
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from app.services.llm_telemetry import clear_snapshots, load_snapshots, telemetry
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/llm")
+async def get_llm_metrics():
+    """LLM call latency, token, cost, retry and cache metrics for this process, plus the last run of each worker"""
+    return {**telemetry.summary(), "workers": load_snapshots()}
+
+@router.post("/llm/reset")
+async def reset_llm_metrics():
+    """Clear accumulated LLM metrics and saved worker snapshots"""
+    telemetry.reset()
+    clear_snapshots()
+    return {"message": "LLM metrics reset"}
+
+@router.get("/rasters")
+async def get_raster_metrics():
+    """Access mode and memory held by the risk rasters in this process"""
+    from app.services.geospatial import get_geospatial_service
+    return get_geospatial_service().raster_memory_report()
+
+@router.get("/geocoding")
+async def get_geocoding_metrics():
+    """Geocode cache hit/miss counters for this process"""
+    from app.services.geocode_cache import get_geocode_cache
+    return get_geocode_cache().summary()
@@ -3,7 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.db import get_db
 from app.models import Organization, RiskOverlay, LeadScoring
-from app.schemas import OrganizationResponse, OrganizationFilter, OrganizationSearch
+from app.schemas import OrganizationResponse, OrganizationFilter, OrganizationSearch, OrganizationSpatialResult
+from app.services.spatial_index import find_in_bbox, find_within_radius, find_nearest
+from app.services.stats_summary import get_stats_summary, refresh_stats_summary
 import logging
 
 logger = logging.getLogger(__name__)
@@ -52,19 +54,56 @@ async def search_organizations(
     organizations = query.limit(limit).all()
     return organizations
 
+def _spatial_results(db: Session, matches) -> List[dict]:
+    """Load matched orgs in one query, keeping match order"""
+    if not matches:
+        return []
+    orgs = {org.org_id: org for org in db.query(Organization).filter(
+        Organization.org_id.in_([org_id for org_id, _ in matches])
+    )}
+    return [
+        {"distance_km": distance, "organization": orgs[org_id]}
+        for org_id, distance in matches if org_id in orgs
+    ]
+
+@router.get("/spatial/bbox", response_model=List[OrganizationSpatialResult])
+async def organizations_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Organizations inside a bounding box (min_lon > max_lon crosses the antimeridian)"""
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must not exceed max_lat")
+    return _spatial_results(db, find_in_bbox(db, min_lat, min_lon, max_lat, max_lon, limit))
+
+@router.get("/spatial/radius", response_model=List[OrganizationSpatialResult])
+async def organizations_within_radius(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=20000),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Organizations within radius_km of a point, nearest first"""
+    return _spatial_results(db, find_within_radius(db, lat, lon, radius_km, limit))
+
+@router.get("/spatial/nearest", response_model=List[OrganizationSpatialResult])
+async def nearest_organizations(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """k nearest organizations to a point"""
+    return _spatial_results(db, find_nearest(db, lat, lon, k))
+
 @router.get("/stats/summary")
-async def get_organization_stats(db: Session = Depends(get_db)):
-    """Get summary statistics for organizations"""
-    total_orgs = db.query(Organization).count()
-    
-    # Count by sector
-    sector_counts = db.query(Organization.sector, db.func.count(Organization.org_id)).group_by(Organization.sector).all()
-    
-    # Count by tier
-    tier_counts = db.query(LeadScoring.tier, db.func.count(LeadScoring.org_id)).group_by(LeadScoring.tier).all()
-    
-    return {
-        "total_organizations": total_orgs,
-        "by_sector": dict(sector_counts),
-        "by_tier": dict(tier_counts)
-    }
+async def get_organization_stats(refresh: bool = False, db: Session = Depends(get_db)):
+    """Get summary statistics for organizations (precomputed after scoring/dedup runs)"""
+    if refresh:
+        return refresh_stats_summary(db)
+    return get_stats_summary(db)
@@ -24,7 +24,7 @@ async def approve_organization(
     if lead_scoring:
         lead_scoring.reviewer_status = "approved"
         lead_scoring.reviewer_notes = notes
-        db.commit()
+        db.commit()  # marks the stats summary stale; the next read recomputes it
         logger.info(f"Approved organization: {org.name}")
         return {"message": f"Approved {org.name}", "status": "approved"}
     else:
@@ -46,7 +46,7 @@ async def reject_organization(
     if lead_scoring:
         lead_scoring.reviewer_status = "rejected"
         lead_scoring.reviewer_notes = notes
-        db.commit()
+        db.commit()  # marks the stats summary stale; the next read recomputes it
         logger.info(f"Rejected organization: {org.name}")
         return {"message": f"Rejected {org.name}", "status": "rejected"}
     else:
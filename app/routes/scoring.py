@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db import get_db
+from typing import List
+from uuid import UUID
+from app.models import ScoringConfigVersion
+from app.schemas import (LeadScoringHistoryResponse, ScoringConfigVersionResponse, TierMigrationResponse,
+                         WhatIfRequest, WhatIfResponse)
+from app.services.scoring_engine import ScoringConfig, evaluate_what_if, get_scoring_snapshot
+from app.services.scoring_history import get_config_version, org_history, rollback_to_version, tier_migration
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.post("/what-if", response_model=WhatIfResponse)
+async def what_if_scoring(request: WhatIfRequest, db: Session = Depends(get_db)):
+    """Score every org under an alternative config in memory and compare with the current config (nothing is written)"""
+    overrides = request.model_dump(exclude={"top_n", "include_deltas", "refresh_snapshot"})
+    config = ScoringConfig.from_settings().with_overrides(**overrides)
+    if config.tier_b_threshold > config.tier_a_threshold:
+        raise HTTPException(status_code=400, detail="tier_b_threshold must not exceed tier_a_threshold")
+
+    snapshot = get_scoring_snapshot(db, refresh=request.refresh_snapshot)
+    return evaluate_what_if(snapshot, config, top_n=request.top_n, include_deltas=request.include_deltas)
+
+@router.post("/what-if/refresh")
+async def refresh_what_if_snapshot(db: Session = Depends(get_db)):
+    """Reload the cached scoring inputs from the database"""
+    snapshot = get_scoring_snapshot(db, refresh=True)
+    return {"message": "Scoring snapshot refreshed", "organizations": len(snapshot.inputs)}
+
+@router.get("/versions", response_model=List[ScoringConfigVersionResponse])
+async def list_config_versions(db: Session = Depends(get_db)):
+    """All scoring config versions, newest first"""
+    return db.query(ScoringConfigVersion).order_by(ScoringConfigVersion.id.desc()).all()
+
+@router.get("/versions/{version_id}", response_model=ScoringConfigVersionResponse)
+async def get_config_version_detail(version_id: int, db: Session = Depends(get_db)):
+    version = get_config_version(db, version_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Scoring config version not found")
+    return version
+
+@router.post("/versions/{version_id}/rollback")
+async def rollback_config_version(version_id: int, db: Session = Depends(get_db)):
+    """Restore current lead scores from the history recorded under a config version"""
+    if not get_config_version(db, version_id):
+        raise HTTPException(status_code=404, detail="Scoring config version not found")
+    restored = rollback_to_version(db, version_id)
+    return {"message": f"Restored {restored} lead scores from config version {version_id}", "restored": restored}
+
+@router.get("/migration", response_model=TierMigrationResponse)
+async def get_tier_migration(from_version: int, to_version: int, db: Session = Depends(get_db)):
+    """Tier transition counts between the latest scores of two config versions"""
+    for version_id in (from_version, to_version):
+        if not get_config_version(db, version_id):
+            raise HTTPException(status_code=404, detail=f"Scoring config version {version_id} not found")
+    return tier_migration(db, from_version, to_version)
+
+@router.get("/history/{org_id}", response_model=List[LeadScoringHistoryResponse])
+async def get_org_score_history(org_id: UUID, limit: int = 50, db: Session = Depends(get_db)):
+    """An org's score history across runs and config versions, newest first"""
+    return org_history(db, org_id, limit=limit)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, AnyUrl, Field
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Dict
 from datetime import datetime
 from uuid import UUID
 
@@ -64,6 +64,9 @@ class RiskOverlayResponse(BaseModel):
     susceptibility: Optional[float] = None
     ignition: Optional[float] = None
     exposure_score: Optional[float] = None
+    layer_values: Optional[dict] = None
+    zonal_stats: Optional[dict] = None
+    layer_versions: Optional[dict] = None
     updated_at: datetime
     
     class Config:
@@ -76,6 +79,7 @@ class LeadScoringResponse(BaseModel):
     rationale: str
     reviewer_status: Literal["pending", "approved", "rejected"]
     reviewer_notes: Optional[str] = None
+    model_score: Optional[float] = None
     created_at: datetime
     updated_at: datetime
     
@@ -94,6 +98,10 @@ class OrganizationResponse(OrganizationBase):
     class Config:
         from_attributes = True
 
+class OrganizationSpatialResult(BaseModel):
+    distance_km: Optional[float] = None
+    organization: OrganizationResponse
+
 # LLM Extraction schemas
 class ExtractedContact(BaseModel):
     name: Optional[str] = None
@@ -146,3 +154,71 @@ class ExportRequest(BaseModel):
         "contact_type", "contact_value", "contact_title", "contact_name",
         "verified", "exposure_score", "propensity_score", "tier", "notes"
     ])
+
+# What-if scoring schemas (fields left out keep their current value; sector scores are merged)
+class WhatIfRequest(BaseModel):
+    sector_base_scores: Optional[Dict[str, float]] = None
+    priority_countries: Optional[List[str]] = None
+    wildfire_program_bonus: Optional[float] = None
+    verified_email_bonus: Optional[float] = None
+    priority_country_bonus: Optional[float] = None
+    tier_a_threshold: Optional[float] = None
+    tier_b_threshold: Optional[float] = None
+    top_n: int = Field(20, ge=0, le=500)
+    include_deltas: bool = False
+    refresh_snapshot: bool = False
+
+class OrgScoreDelta(BaseModel):
+    org_id: UUID
+    name: str
+    baseline_score: float
+    score: float
+    delta: float
+    baseline_tier: str
+    tier: str
+
+class WhatIfResponse(BaseModel):
+    organizations: int
+    snapshot_age_seconds: float
+    config: dict
+    tier_distribution: Dict[str, Dict[str, int]]
+    tier_transitions: Dict[str, int]
+    changed_scores: int
+    changed_tiers: int
+    mean_score: Dict[str, Optional[float]]
+    top_increases: List[OrgScoreDelta]
+    top_decreases: List[OrgScoreDelta]
+    deltas: Optional[List[OrgScoreDelta]] = None
+
+class ScoringConfigVersionResponse(BaseModel):
+    id: int
+    config_hash: str
+    config: dict
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class LeadScoringHistoryResponse(BaseModel):
+    id: int
+    org_id: UUID
+    config_version: int
+    score: float
+    tier: str
+    base: float
+    exposure_bonus: float
+    program_bonus: float
+    contact_bonus: float
+    country_bonus: float
+    scored_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class TierMigrationResponse(BaseModel):
+    from_version: int
+    to_version: int
+    organizations: int
+    changed_tiers: int
+    matrix: Dict[str, Dict[str, int]]
+    mean_score_delta: Dict[str, float]
@@ -1,19 +1,63 @@
 import numpy as np
 from typing import List, Dict, Tuple
-from sentence_transformers import SentenceTransformer
+from sqlalchemy import case
 from app.config import settings
 from app.db import SessionLocal
-from app.models import Organization, Source
+from app.models import (Organization, Source, Contact, Program, RiskOverlay, LeadScoring, ExtractionProvenance,
+                        OrgScoreDirty, mark_orgs_dirty)
+from app.services.dedup_candidates import CandidateGenerator, registered_domain
+from app.services.embeddings import Embedder
+from app.services.spatial_index import track_removed_orgs
+from app.services.stats_summary import refresh_stats_summary
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Child tables whose rows all move to the survivor
+REPARENTED_MODELS = [Contact, Program, Source, ExtractionProvenance]
+# One row per org: the survivor keeps its own, else takes the oldest merged org's
+SINGLE_ROW_MODELS = [RiskOverlay, LeadScoring]
+MERGED_FIELDS = ["role", "website", "region_state", "size_band", "notes"]
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path halving and union by size"""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> int:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+    def clusters(self) -> List[List[int]]:
+        """Sets with more than one member, members in ascending order"""
+        groups: Dict[int, List[int]] = {}
+        for x in range(len(self.parent)):
+            groups.setdefault(self.find(x), []).append(x)
+        return [members for members in groups.values() if len(members) > 1]
+
+NAME_SIMILARITY_THRESHOLD = 0.92
+
 class WildfireDeduplicator:
     def __init__(self):
-        if settings.embeddings_provider == "local":
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        else:
-            self.model = None  # Will use OpenAI embeddings
+        # Embeddings are batched and cached (memory + SQLite), so each distinct string is encoded once
+        self.embedder = Embedder()
+        self.model = self.embedder.model
+        self.candidates = CandidateGenerator(self.embedder, self.normalize_name)
     
     def normalize_name(self, name: str) -> str:
         """Normalize organization name for comparison"""
@@ -40,147 +84,163 @@ class WildfireDeduplicator:
         
         return normalized
     
-    def blocking_key(self, org: Organization) -> str:
-        """Create blocking key for initial grouping"""
-        name = self.normalize_name(org.name)
-        country = org.country.lower().strip()
-        return f"{name}_{country}"
+    @staticmethod
+    def countries_compatible(org1: Organization, org2: Organization, strict: bool = False) -> bool:
+        """Same country; unknown on either side also passes unless strict"""
+        if not org1.country or not org2.country:
+            return not strict
+        return org1.country.lower().strip() == org2.country.lower().strip()
     
-    def calculate_similarity(self, text1: str, text2: str) -> float:
-        """Calculate similarity between two text strings"""
-        if not text1 or not text2:
-            return 0.0
+    def is_match(self, org1: Organization, org2: Organization, name_sim: float, same_domain: bool) -> bool:
+        """Merge on name evidence, or on the same registered domain alone within one known country.
         
-        if self.model:
-            # Use local sentence transformers
-            embeddings = self.model.encode([text1, text2])
-            similarity = np.dot(embeddings[0], embeddings[1]) / (
-                np.linalg.norm(embeddings[0]) * np.linalg.norm(embeddings[1])
-            )
-            return float(similarity)
-        else:
-            # Use OpenAI embeddings (would need to implement)
-            logger.warning("OpenAI embeddings not implemented for similarity")
-            return 0.0
+        A shared domain without similar names is weaker evidence (regional
+        offices, parent companies), so its country check is strict.
+        """
+        if name_sim > NAME_SIMILARITY_THRESHOLD:
+            return self.countries_compatible(org1, org2)
+        return same_domain and self.countries_compatible(org1, org2, strict=True)
     
     def should_merge(self, org1: Organization, org2: Organization) -> bool:
         """Determine if two organizations should be merged"""
-        # Check blocking key first
-        if self.blocking_key(org1) != self.blocking_key(org2):
-            return False
-        
-        # Calculate name similarity
-        name_sim = self.calculate_similarity(org1.name, org2.name)
-        
-        # Check website similarity if available
-        website_sim = 0.0
-        if org1.website and org2.website:
-            website_sim = self.calculate_similarity(org1.website, org2.website)
-        
-        # Merge if name similarity is high enough
-        if name_sim > 0.92:
-            return True
-        
-        # Merge if website similarity is very high
-        if website_sim > 0.95:
-            return True
-        
-        return False
+        return bool(self.match_pairs([org1, org2], {(0, 1)}))
     
-    def merge_organizations(self, primary: Organization, secondary: Organization) -> Organization:
-        """Merge secondary organization into primary"""
-        logger.info(f"Merging {secondary.name} into {primary.name}")
-        
-        # Merge contacts
-        for contact in secondary.contacts:
-            contact.org_id = primary.org_id
-        
-        # Merge programs
-        for program in secondary.programs:
-            program.org_id = primary.org_id
-        
-        # Merge sources
-        for source in secondary.sources:
-            source.org_id = primary.org_id
-        
-        # Merge risk overlay if primary doesn't have one
-        if not primary.risk_overlay and secondary.risk_overlay:
-            secondary.risk_overlay.org_id = primary.org_id
-        
-        # Merge lead scoring if primary doesn't have one
-        if not primary.lead_scoring and secondary.lead_scoring:
-            secondary.lead_scoring.org_id = primary.org_id
-        
-        # Update primary organization with any missing information
-        if not primary.role and secondary.role:
-            primary.role = secondary.role
-        
-        if not primary.website and secondary.website:
-            primary.website = secondary.website
-        
-        if not primary.region_state and secondary.region_state:
-            primary.region_state = secondary.region_state
-        
-        if not primary.size_band and secondary.size_band:
-            primary.size_band = secondary.size_band
+    def match_pairs(self, orgs: List[Organization], pairs) -> List[Tuple[int, int]]:
+        """Candidate pairs (indices into orgs) that should merge, name similarities in one vectorized pass"""
+        if not pairs:
+            return []
+        left, right = np.array(sorted(pairs)).T
+        names = self.embedder.encode([org.name for org in orgs])
+        name_sim = (names[left] * names[right]).sum(axis=1) if names.shape[1] else np.zeros(len(left))
+        domains = [registered_domain(org.website) for org in orgs]
+        return [
+            (int(i), int(j)) for i, j, sim in zip(left, right, name_sim)
+            if self.is_match(orgs[i], orgs[j], sim, domains[i] is not None and domains[i] == domains[j])
+        ]
+    
+    @staticmethod
+    def fill_missing_fields(primary: Organization, secondary: Organization):
+        """Copy fields the primary lacks from the secondary"""
+        for field in MERGED_FIELDS:
+            if not getattr(primary, field) and getattr(secondary, field):
+                setattr(primary, field, getattr(secondary, field))
         
         if not primary.latitude and secondary.latitude:
             primary.latitude = secondary.latitude
             primary.longitude = secondary.longitude
+            primary.geocode_precision = secondary.geocode_precision
+    
+    def cluster_matches(self, orgs: List[Organization], matches: List[Tuple[int, int]]) -> List[List[int]]:
+        """Transitive clusters of matched orgs (A~B and B~C puts A, B and C together).
+        
+        Clusters larger than settings.dedup_max_cluster_size are logged and
+        left unmerged: a chain of pairwise matches that long usually joins
+        records that are not duplicates of each other.
+        """
+        clusters = UnionFind(len(orgs))
+        for i, j in matches:
+            clusters.union(i, j)
+        kept = []
+        for members in clusters.clusters():
+            if len(members) > settings.dedup_max_cluster_size:
+                sample = ", ".join(orgs[i].name for i in members[:5])
+                logger.warning(f"Not merging cluster of {len(members)} organizations "
+                               f"(max {settings.dedup_max_cluster_size}): {sample}, ...")
+                continue
+            kept.append(members)
+        return kept
+    
+    @staticmethod
+    def _reparent(db, model, survivor_of: Dict, secondaries: List):
+        """UPDATE model SET org_id = <survivor> WHERE org_id IN (secondaries), one statement per batch"""
+        table = model.__table__
+        batch_size = settings.dedup_merge_batch_size
+        moved = 0
+        for start in range(0, len(secondaries), batch_size):
+            batch = secondaries[start:start + batch_size]
+            result = db.execute(
+                table.update().where(table.c.org_id.in_(batch)).values(
+                    org_id=case({org_id: survivor_of[org_id] for org_id in batch}, value=table.c.org_id)
+                )
+            )
+            moved += result.rowcount or 0
+        return moved
+    
+    @staticmethod
+    def _delete_rows(db, model, org_ids: List):
+        table = model.__table__
+        batch_size = settings.dedup_merge_batch_size
+        for start in range(0, len(org_ids), batch_size):
+            db.execute(table.delete().where(table.c.org_id.in_(org_ids[start:start + batch_size])))
+    
+    def apply_merges(self, db, clusters: List[List[Organization]]) -> Dict[str, int]:
+        """Fold every cluster into its first (survivor) org with set-based statements.
         
-        if not primary.notes and secondary.notes:
-            primary.notes = secondary.notes
+        Contacts, programs, sources and provenance move to the survivor.
+        The survivor keeps its own risk overlay / lead score, or takes the
+        one from the oldest merged org that has one; the rest are deleted
+        along with the merged orgs. Survivors are queued for rescoring.
+        """
+        survivor_of = {}
+        for cluster in clusters:
+            survivor = cluster[0]
+            for secondary in cluster[1:]:
+                self.fill_missing_fields(survivor, secondary)
+                survivor_of[secondary.org_id] = survivor.org_id
+        secondaries = list(survivor_of)
+        survivors = list({cluster[0].org_id for cluster in clusters})
+        db.flush()
         
-        return primary
+        counts = {"organizations": len(secondaries)}
+        for model in REPARENTED_MODELS:
+            counts[model.__tablename__] = self._reparent(db, model, survivor_of, secondaries)
+        
+        for model in SINGLE_ROW_MODELS:
+            member_ids = survivors + secondaries
+            has_row = set()
+            for start in range(0, len(member_ids), settings.dedup_merge_batch_size):
+                batch = member_ids[start:start + settings.dedup_merge_batch_size]
+                has_row.update(org_id for (org_id,) in db.query(model.org_id).filter(model.org_id.in_(batch)))
+            donors = {}
+            for cluster in clusters:
+                if cluster[0].org_id in has_row:
+                    continue
+                donor = next((org.org_id for org in cluster[1:] if org.org_id in has_row), None)
+                if donor is not None:
+                    donors[donor] = cluster[0].org_id
+            counts[model.__tablename__] = self._reparent(db, model, donors, list(donors))
+            self._delete_rows(db, model, [org_id for org_id in secondaries if org_id not in donors])
+        
+        self._delete_rows(db, OrgScoreDirty, secondaries)
+        self._delete_rows(db, Organization, secondaries)
+        track_removed_orgs(db, secondaries)
+        mark_orgs_dirty(db, survivors)
+        return counts
     
     def deduplicate_organizations(self) -> Dict[str, List[str]]:
         """Deduplicate all organizations in the database"""
         db = SessionLocal()
         try:
-            # Get all organizations
+            # Get all organizations, oldest first (the oldest org of a cluster survives)
             organizations = db.query(Organization).all()
+            organizations.sort(key=lambda x: x.created_at)
             
-            # Group by blocking key
-            groups = {}
-            for org in organizations:
-                key = self.blocking_key(org)
-                if key not in groups:
-                    groups[key] = []
-                groups[key].append(org)
-            
-            # Process each group for potential merges
-            merged_groups = {}
-            processed_orgs = set()
-            
-            for key, orgs in groups.items():
-                if len(orgs) <= 1:
-                    continue
-                
-                # Sort by creation date (keep oldest)
-                orgs.sort(key=lambda x: x.created_at)
-                
-                primary = orgs[0]
-                merged_orgs = [primary]
-                
-                for secondary in orgs[1:]:
-                    if self.should_merge(primary, secondary):
-                        primary = self.merge_organizations(primary, secondary)
-                        merged_orgs.append(secondary)
-                        processed_orgs.add(secondary.org_id)
-                
-                if len(merged_orgs) > 1:
-                    merged_groups[primary.org_id] = [org.org_id for org in merged_orgs]
-            
-            # Save merged organizations
-            db.commit()
-            
-            # Delete merged organizations
-            for org_id in processed_orgs:
-                db.query(Organization).filter(Organization.org_id == org_id).delete()
+            # Candidate pairs from embedding kNN + MinHash-LSH instead of exact blocking keys
+            pairs = self.candidates.candidate_pairs(
+                [org.name for org in organizations], [org.website for org in organizations]
+            )
+            matches = self.match_pairs(organizations, pairs)
+            clusters = [[organizations[i] for i in members]
+                        for members in self.cluster_matches(organizations, matches)]
             
+            merged_groups = {cluster[0].org_id: [org.org_id for org in cluster] for cluster in clusters}
+            counts = self.apply_merges(db, clusters) if clusters else {}
             db.commit()
+            refresh_stats_summary(db)
             
-            logger.info(f"Deduplication completed. Merged {len(merged_groups)} groups.")
+            logger.info(f"Deduplication completed. Merged {len(merged_groups)} clusters from "
+                        f"{len(matches)} matches in {len(pairs)} candidate pairs: {counts}. "
+                        f"Embeddings: {self.embedder.stats}")
             return merged_groups
             
         except Exception as e:
@@ -0,0 +1,237 @@
+import hashlib
+import time
+from urllib.parse import urlsplit
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import numpy as np
+from app.config import settings
+import logging
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+BRUTE_FORCE_CELLS = 1 << 24  # similarity matrix cells per chunk (~64MB float32)
+
+Pair = Tuple[int, int]
+
+# Second-level labels under which registrations happen one level deeper (example.co.uk, example.gov.au)
+SECOND_LEVEL_LABELS = {"co", "com", "org", "net", "gov", "ac", "edu", "govt", "nic", "mil"}
+# Public-sector suffixes where each subdomain is its own agency (fire.ca.gov vs water.ca.gov, fs.usda.gov)
+INSTITUTIONAL_LABELS = {"gov", "govt", "mil", "edu", "ac"}
+# Hosts shared by unrelated organizations: equal domains there are no evidence of a duplicate
+SHARED_HOST_DOMAINS = {
+    "facebook.com", "linkedin.com", "twitter.com", "x.com", "instagram.com", "youtube.com",
+    "google.com", "sites.google.com", "wordpress.com", "blogspot.com", "wixsite.com", "github.io",
+}
+
+
+def _ordered(i: int, j: int) -> Pair:
+    return (i, j) if i < j else (j, i)
+
+
+# -----------------------------------------------------------
+# Registered domains
+# -----------------------------------------------------------
+def registered_domain(url: Optional[str]) -> Optional[str]:
+    """example.org for "https://www.fire.example.org/about"; None if missing or a shared host.
+
+    Two-letter country TLDs with a generic second level (co.uk, com.au,
+    ...) keep three labels. Under government and academic suffixes the
+    whole host (minus "www.") is kept, since sibling subdomains are
+    separate agencies.
+    """
+    if not url or not url.strip():
+        return None
+    url = url.strip().lower()
+    host = urlsplit(url if "//" in url else f"//{url}").hostname
+    if not host or "." not in host:
+        return None
+    labels = host.rstrip(".").split(".")
+    if labels[0] == "www" and len(labels) > 2:
+        labels = labels[1:]
+    if labels[-1] in INSTITUTIONAL_LABELS or (len(labels[-1]) == 2 and labels[-2] in INSTITUTIONAL_LABELS):
+        domain = ".".join(labels)
+    elif len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        domain = ".".join(labels[-3:])
+    else:
+        domain = ".".join(labels[-2:])
+    return None if domain in SHARED_HOST_DOMAINS or host in SHARED_HOST_DOMAINS else domain
+
+
+def domain_pairs(domains: List[Optional[str]], max_bucket: int) -> Set[Pair]:
+    """Pairs of records with the same registered domain (buckets larger than max_bucket are skipped)"""
+    buckets: Dict[str, List[int]] = {}
+    for i, domain in enumerate(domains):
+        if domain:
+            buckets.setdefault(domain, []).append(i)
+    pairs = set()
+    for domain, members in buckets.items():
+        if len(members) > max_bucket:
+            logger.warning(f"Skipped {len(members)} records sharing {domain}")
+            continue
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                pairs.add(_ordered(members[x], members[y]))
+    return pairs
+
+
+# -----------------------------------------------------------
+# Nearest neighbours over embeddings
+# -----------------------------------------------------------
+def knn_pairs(vectors: np.ndarray, k: int, min_similarity: float) -> Set[Pair]:
+    """Pairs (i, j), i < j, where j is among i's k most similar rows with cosine >= min_similarity.
+
+    Rows must be unit vectors; zero rows (missing text) are skipped. Uses
+    an HNSW index when hnswlib is installed and there are at least
+    settings.dedup_hnsw_min_size rows, else chunked brute force.
+    """
+    rows = np.flatnonzero(np.linalg.norm(vectors, axis=1) > 0) if len(vectors) else np.zeros(0, dtype=np.int64)
+    if len(rows) < 2:
+        return set()
+    points = np.ascontiguousarray(vectors[rows], dtype=np.float32)
+    k = min(k, len(rows) - 1)
+
+    if hnswlib is not None and len(rows) >= settings.dedup_hnsw_min_size:
+        neighbours, similarities = _hnsw_neighbours(points, k)
+    else:
+        neighbours, similarities = _brute_force_neighbours(points, k)
+
+    pairs = set()
+    for i, j in zip(*np.nonzero(similarities >= min_similarity)):
+        other = neighbours[i, j]
+        if other != i:
+            pairs.add(_ordered(int(rows[i]), int(rows[other])))
+    return pairs
+
+
+def _brute_force_neighbours(points: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    n = len(points)
+    chunk = max(1, BRUTE_FORCE_CELLS // n)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    similarities = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, chunk):
+        sims = points[start:start + chunk] @ points.T
+        block = np.arange(sims.shape[0])
+        sims[block, start + block] = -np.inf  # never pair a row with itself
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        neighbours[start:start + chunk] = top
+        similarities[start:start + chunk] = np.take_along_axis(sims, top, axis=1)
+    return neighbours, similarities
+
+
+def _hnsw_neighbours(points: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    index = hnswlib.Index(space="cosine", dim=points.shape[1])
+    index.init_index(max_elements=len(points), ef_construction=200, M=16)
+    index.add_items(points, np.arange(len(points)))
+    index.set_ef(max(50, 2 * k))
+    # k + 1 because each point usually finds itself first
+    labels, distances = index.knn_query(points, k=k + 1)
+    return labels.astype(np.int64), (1.0 - distances).astype(np.float32)
+
+
+# -----------------------------------------------------------
+# MinHash-LSH over character shingles
+# -----------------------------------------------------------
+def shingles(text: str, size: int) -> Set[str]:
+    padded = f" {text} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+class MinHashLSH:
+    """Banded MinHash buckets: texts sharing any band signature become candidates.
+
+    With b bands of r rows, two texts with Jaccard similarity s collide
+    with probability 1 - (1 - s^r)^b (about 0.5 at s = (1/b)^(1/r)).
+    """
+
+    def __init__(self, bands: Optional[int] = None, rows: Optional[int] = None, shingle_size: Optional[int] = None,
+                 max_bucket: Optional[int] = None, seed: int = 42):
+        self.bands = bands or settings.dedup_minhash_bands
+        self.rows = rows or settings.dedup_minhash_rows
+        self.shingle_size = shingle_size or settings.dedup_shingle_size
+        self.max_bucket = max_bucket or settings.dedup_lsh_max_bucket
+        rng = np.random.default_rng(seed)
+        perms = self.bands * self.rows
+        self.a = rng.integers(1, 1 << 32, size=perms, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=perms, dtype=np.uint64)
+
+    @staticmethod
+    def _hash(shingle: str) -> int:
+        return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+    def signature(self, text: str) -> np.ndarray:
+        values = np.fromiter((self._hash(s) for s in shingles(text, self.shingle_size)), dtype=np.uint64)
+        # a * x fits in uint64 because both are below 2**32
+        hashed = (self.a[:, None] * values[None, :] % MERSENNE_PRIME + self.b[:, None]) % MERSENNE_PRIME
+        return hashed.min(axis=1)
+
+    def candidate_pairs(self, texts: List[str]) -> Set[Pair]:
+        buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            bands = self.signature(text).reshape(self.bands, self.rows)
+            for band, values in enumerate(bands):
+                buckets.setdefault((band, values.tobytes()), []).append(i)
+
+        pairs = set()
+        skipped = 0
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) > self.max_bucket:
+                skipped += 1
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add(_ordered(members[x], members[y]))
+        if skipped:
+            logger.warning(f"Skipped {skipped} LSH buckets larger than {self.max_bucket}")
+        return pairs
+
+
+# -----------------------------------------------------------
+# Candidate generation
+# -----------------------------------------------------------
+class CandidateGenerator:
+    """Candidate duplicate pairs from name embedding kNN, MinHash-LSH on names and equal registered domains.
+
+    Replaces exact blocking keys so near-duplicates with different spellings
+    get compared, while keeping the number of comparisons near-linear.
+    """
+
+    def __init__(self, embedder, normalize: Callable[[str], str], k: Optional[int] = None,
+                 min_similarity: Optional[float] = None, lsh: Optional[MinHashLSH] = None):
+        self.embedder = embedder
+        self.normalize = normalize
+        self.k = k or settings.dedup_ann_neighbors
+        self.min_similarity = min_similarity if min_similarity is not None else settings.dedup_ann_min_similarity
+        self.lsh = lsh or MinHashLSH()
+        self.stats: Dict[str, float] = {}
+
+    def candidate_pairs(self, names: List[Optional[str]], websites: List[Optional[str]]) -> Set[Pair]:
+        started = time.perf_counter()
+        name_pairs = knn_pairs(self.embedder.encode(names), self.k, self.min_similarity)
+        ann_done = time.perf_counter()
+        lsh_pairs = self.lsh.candidate_pairs([self.normalize(name) for name in names])
+        website_pairs = domain_pairs([registered_domain(url) for url in websites], self.lsh.max_bucket)
+        done = time.perf_counter()
+
+        pairs = name_pairs | website_pairs | lsh_pairs
+        self.stats = {
+            "records": len(names),
+            "name_ann_pairs": len(name_pairs),
+            "domain_pairs": len(website_pairs),
+            "lsh_pairs": len(lsh_pairs),
+            "candidate_pairs": len(pairs),
+            "ann_ms": round((ann_done - started) * 1000, 2),
+            "lsh_ms": round((done - ann_done) * 1000, 2),
+        }
+        logger.info(f"Dedup candidate generation: {self.stats}")
+        return pairs
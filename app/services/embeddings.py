@@ -0,0 +1,183 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+SQLITE_MAX_PARAMS = 500  # keys per IN (...) lookup
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Whitespace-folded text; identical strings share one embedding"""
+    return " ".join(text.split()) if text else ""
+
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent SQLite cache of embedding vectors stored as float16 blobs.
+
+    Rows are keyed by a hash of model name + text, so switching models never
+    returns stale vectors. WAL mode lets several workers share one file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.embedding_cache_path
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """{text: float32 vector} for the texts that are cached"""
+        by_key = {embedding_key(model, text): text for text in texts}
+        keys = list(by_key)
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+            chunk = keys[start:start + SQLITE_MAX_PARAMS]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embedding_cache WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, blob in rows:
+                found[by_key[key]] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        with self._stats_lock:
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        now = time.time()
+        rows = [
+            (embedding_key(model, text), model, int(vector.shape[0]), vector.astype(np.float16).tobytes(), now)
+            for text, vector in vectors.items()
+        ]
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, model, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._stats_lock:
+            self.stats["writes"] += len(rows)
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide embedding cache backed by the shared SQLite file"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+    return _cache
+
+
+class Embedder:
+    """Batched, cached text encoder returning L2-normalised vectors.
+
+    Each distinct string is looked up in memory, then in the persistent
+    cache, and only the remaining misses are sent to the model, in batches
+    of settings.embedding_batch_size. Cosine similarity is then a plain
+    matrix product of the returned rows.
+    """
+
+    def __init__(self, provider: Optional[str] = None, model_name: Optional[str] = None,
+                 cache: Optional[EmbeddingCache] = None, batch_size: Optional[int] = None):
+        self.provider = provider or settings.embeddings_provider
+        self.model_name = model_name or settings.embeddings_model
+        self.cache = cache or get_embedding_cache()
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self._memory: Dict[str, np.ndarray] = {}
+        self.stats = {"requested": 0, "memory_hits": 0, "cache_hits": 0, "encoded": 0}
+        self.model = None
+        if self.provider == "local":
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_name)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        if self.model is not None:
+            return np.asarray(self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True),
+                              dtype=np.float32)
+        from app.services.llm_client import get_llm_client
+        response = get_llm_client().embeddings.create(model=self.model_name, input=texts)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+    def _fill(self, texts: List[str]):
+        """Make sure every (normalized, non-empty) text has a vector in memory"""
+        missing = [text for text in texts if text not in self._memory]
+        self.stats["memory_hits"] += len(texts) - len(missing)
+        if not missing:
+            return
+        cached = self.cache.get_many(self.model_name, missing)
+        self._memory.update(cached)
+        self.stats["cache_hits"] += len(cached)
+
+        to_encode = [text for text in missing if text not in cached]
+        for start in range(0, len(to_encode), self.batch_size):
+            batch = to_encode[start:start + self.batch_size]
+            vectors = self._encode_batch(batch)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+            encoded = dict(zip(batch, vectors))
+            self.cache.put_many(self.model_name, encoded)
+            self._memory.update(encoded)
+            self.stats["encoded"] += len(batch)
+        if to_encode:
+            logger.info(f"Encoded {len(to_encode)} new strings with {self.model_name}")
+
+    def encode(self, texts: Iterable[Optional[str]]) -> np.ndarray:
+        """(n, dim) float32 matrix of unit vectors; empty texts get a zero row"""
+        normalized = [normalize_text(text) for text in texts]
+        distinct = list(dict.fromkeys(text for text in normalized if text))
+        self.stats["requested"] += len(normalized)
+        self._fill(distinct)
+        if not self._memory:
+            return np.zeros((len(normalized), 0), dtype=np.float32)
+        dim = next(iter(self._memory.values())).shape[0]
+        zero = np.zeros(dim, dtype=np.float32)
+        return np.stack([self._memory[text] if text else zero for text in normalized]) if normalized \
+            else np.zeros((0, dim), dtype=np.float32)
+
+    def similarity_matrix(self, texts_a: Iterable[Optional[str]],
+                          texts_b: Optional[Iterable[Optional[str]]] = None) -> np.ndarray:
+        """Cosine similarity of every text in a against every text in b (or a against itself)"""
+        a = self.encode(texts_a)
+        b = a if texts_b is None else self.encode(texts_b)
+        if a.shape[1] == 0 or b.shape[1] == 0:
+            return np.zeros((a.shape[0], b.shape[0]), dtype=np.float32)
+        return a @ b.T
@@ -0,0 +1,150 @@
+import csv
+import re
+from typing import Dict, Iterable, List, Optional
+from app.config import settings
+from app.services.geocode_cache import normalize_query
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Higher is more precise; "address" is what a network geocoder returns
+PRECISION_RANK = {"country": 1, "region": 2, "county": 3, "city": 4, "address": 5}
+
+_END = "$"
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", normalize_query(text))
+
+
+class Place:
+    def __init__(self, name: str, kind: str, country: str, region: Optional[str], lat: float, lon: float):
+        self.name = name
+        self.kind = kind
+        self.country = country
+        self.region = region or None
+        self.lat = lat
+        self.lon = lon
+
+    @property
+    def precision(self) -> int:
+        return PRECISION_RANK[self.kind]
+
+    def __repr__(self):
+        return f"Place({self.name!r}, {self.kind}, {self.country})"
+
+
+class TokenTrie:
+    """Trie over token sequences for longest-match place scanning in free text"""
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def insert(self, tokens: List[str], place: Place):
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_END, []).append(place)
+
+    def scan(self, tokens: List[str]) -> List[Place]:
+        """Places whose names occur in the token stream (longest match at each position)"""
+        found = []
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            match, match_end = None, i
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if _END in node:
+                    match, match_end = node[_END], j + 1
+            if match:
+                found.extend(match)
+                i = match_end
+            else:
+                i += 1
+        return found
+
+
+class Gazetteer:
+    """Bundled table of countries, states/provinces, counties and major cities.
+
+    Full names and long aliases go into a token trie so they can be found
+    inside org names and region strings; short codes ("CA", "WA", "NT")
+    only match when they are the whole field, and are disambiguated by
+    country.
+    """
+
+    def __init__(self, places: Iterable[Place] = ()):
+        self.places: List[Place] = []
+        self.exact: Dict[str, List[Place]] = {}
+        self.trie = TokenTrie()
+        for place in places:
+            self.add(place)
+
+    def add(self, place: Place, aliases: Iterable[str] = ()):
+        self.places.append(place)
+        for label in [place.name, *aliases]:
+            key = normalize_query(label)
+            if not key:
+                continue
+            self.exact.setdefault(key, []).append(place)
+            tokens = tokenize(label)
+            is_code = len(key.replace(" ", "")) <= 3 or "." in label
+            if tokens and not is_code:
+                self.trie.insert(tokens, place)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "Gazetteer":
+        path = path or settings.gazetteer_path
+        gazetteer = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                place = Place(row["name"], row["kind"], row["country"], row["region"],
+                              float(row["lat"]), float(row["lon"]))
+                aliases = [a for a in (row.get("aliases") or "").split("|") if a]
+                gazetteer.add(place, aliases)
+        logger.info(f"Loaded gazetteer with {len(gazetteer.places)} places from {path}")
+        return gazetteer
+
+    def lookup(self, text: str, kinds: Optional[Iterable[str]] = None) -> List[Place]:
+        """Places whose name or alias equals the whole string"""
+        places = self.exact.get(normalize_query(text or ""), [])
+        if kinds:
+            places = [p for p in places if p.kind in kinds]
+        return places
+
+    def resolve(self, name: Optional[str] = None, region_state: Optional[str] = None,
+                country: Optional[str] = None) -> Optional[Place]:
+        """Most precise place consistent with the org's name, region and country"""
+        country_matches = self.lookup(country, kinds={"country"}) if country else []
+        country_place = country_matches[0] if country_matches else None
+
+        candidates: List[Place] = []
+        if region_state:
+            candidates += self.lookup(region_state) or self.trie.scan(tokenize(region_state))
+        if name:
+            candidates += self.trie.scan(tokenize(name))
+        candidates = [p for p in candidates if p.kind != "country"]
+
+        if country_place:
+            candidates = [p for p in candidates if p.country == country_place.country]
+
+        regions = {p.name for p in candidates if p.kind == "region"}
+        if regions:
+            candidates = [p for p in candidates if p.kind == "region" or not p.region or p.region in regions]
+
+        if candidates:
+            return max(candidates, key=lambda p: p.precision)
+        return country_place
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.load()
+    return _gazetteer
@@ -0,0 +1,132 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional, Tuple
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a geocoding query: accents, case, punctuation and spacing folded"""
+    if not query:
+        return ""
+    text = unicodedata.normalize("NFKD", query)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    parts = []
+    for part in text.split(","):
+        part = re.sub(r"[^\w\s]", " ", part)
+        part = " ".join(part.split())
+        if part:
+            parts.append(part)
+    return ", ".join(parts)
+
+
+class GeocodeCacheEntry:
+    def __init__(self, found: bool, lat: Optional[float], lon: Optional[float], provider: Optional[str]):
+        self.found = found
+        self.lat = lat
+        self.lon = lon
+        self.provider = provider
+
+    @property
+    def coords(self) -> Optional[Tuple[float, float]]:
+        return (self.lat, self.lon) if self.found else None
+
+
+class GeocodeCache:
+    """Persistent SQLite cache of geocoding hits and misses, keyed by normalized query.
+
+    Misses are cached with a shorter TTL so failed lookups are not retried
+    on every run. WAL mode lets the API, agents and workers share one file.
+    """
+
+    def __init__(self, path: Optional[str] = None, hit_ttl_days: Optional[float] = None,
+                 miss_ttl_days: Optional[float] = None):
+        self.path = path or settings.geocode_cache_path
+        self.hit_ttl = (hit_ttl_days if hit_ttl_days is not None else settings.geocode_cache_hit_ttl_days) * 86400
+        self.miss_ttl = (miss_ttl_days if miss_ttl_days is not None else settings.geocode_cache_miss_ttl_days) * 86400
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "writes": 0}
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connection().execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                query TEXT PRIMARY KEY,
+                found INTEGER NOT NULL,
+                lat REAL,
+                lon REAL,
+                provider TEXT,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get(self, query: str) -> Optional[GeocodeCacheEntry]:
+        """Cached entry for a query, or None when unknown or expired"""
+        key = normalize_query(query)
+        row = self._connection().execute(
+            "SELECT found, lat, lon, provider FROM geocode_cache WHERE query = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        entry = GeocodeCacheEntry(bool(row[0]), row[1], row[2], row[3])
+        self._count("hits" if entry.found else "negative_hits")
+        return entry
+
+    def put(self, query: str, coords: Optional[Tuple[float, float]], provider: Optional[str] = None):
+        """Store a hit (coords) or a miss (None)"""
+        key = normalize_query(query)
+        now = time.time()
+        found = coords is not None
+        lat, lon = coords if found else (None, None)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO geocode_cache (query, found, lat, lon, provider, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, int(found), lat, lon, provider, now, now + (self.hit_ttl if found else self.miss_ttl)),
+        )
+        self._count("writes")
+
+    def purge_expired(self) -> int:
+        cursor = self._connection().execute("DELETE FROM geocode_cache WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def summary(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 4) if lookups else None
+        return stats
+
+
+_cache: Optional[GeocodeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_geocode_cache() -> GeocodeCache:
+    """Process-wide geocode cache backed by the shared SQLite file"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeocodeCache()
+    return _cache
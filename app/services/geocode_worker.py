@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from app.config import settings
+from app.services.geocode_cache import normalize_query
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe fixed-interval limiter (e.g. 1 request/second for Nominatim)"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    @property
+    def next_available(self) -> float:
+        return self._next
+
+    def acquire(self):
+        """Block until the caller may issue its request"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """One limiter per provider per process, shared by every resolver instance"""
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = RateLimiter(settings.geocode_provider_rps.get(provider, 1.0))
+        return _rate_limiters[provider]
+
+
+class LocationQuery:
+    """Plain, thread-safe copy of the org fields the resolvers read"""
+
+    def __init__(self, org_id, name: str, region_state: Optional[str], country: Optional[str]):
+        self.org_id = org_id
+        self.name = name
+        self.region_state = region_state
+        self.country = country
+
+    @classmethod
+    def from_org(cls, org) -> "LocationQuery":
+        return cls(org.org_id, org.name, org.region_state, org.country)
+
+    @property
+    def key(self) -> str:
+        return normalize_query(", ".join(p for p in (self.name, self.region_state, self.country) if p))
+
+
+class GeocodingWorker:
+    """Threaded geocoding with request coalescing and per-provider rate limits.
+
+    Offline resolvers (the gazetteer) run inline. Queries that need the
+    network go to a thread pool and are sent to whichever configured
+    provider has the earliest free rate-limit slot, so several providers
+    add up their throughput. Identical queries share one lookup.
+    Results are yielded as they complete so callers can pipeline raster
+    sampling and DB writes behind geocoding.
+    """
+
+    def __init__(self, chain, max_workers: Optional[int] = None):
+        self.offline = [r for r in chain.resolvers if not getattr(r, "network", False)]
+        self.network = [r for r in chain.resolvers if getattr(r, "network", False)]
+        self.min_rank = chain.min_rank
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or settings.geocode_worker_threads)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"queries": 0, "coalesced": 0, "offline": 0, "network": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _resolve_offline(self, query: LocationQuery):
+        best = None
+        for resolver in self.offline:
+            result = resolver.resolve(query)
+            if result and (best is None or result.rank > best.rank):
+                best = result
+        return best
+
+    def _resolve_network(self, query: LocationQuery, fallback):
+        for resolver in sorted(self.network, key=lambda r: r.rate_limiter.next_available):
+            try:
+                result = resolver.resolve(query)
+            except Exception as e:
+                logger.warning(f"{resolver.name} failed for {query.name}: {e}")
+                continue
+            if result:
+                return result
+        return fallback
+
+    def submit(self, query: LocationQuery) -> Future:
+        key = query.key
+        with self._lock:
+            self.stats["queries"] += 1
+            if key in self._inflight:
+                self.stats["coalesced"] += 1
+                return self._inflight[key]
+
+            best = self._resolve_offline(query)
+            if (best and best.rank >= self.min_rank) or not self.network:
+                future = Future()
+                future.set_result(best)
+                self.stats["offline"] += 1
+            else:
+                future = self.executor.submit(self._resolve_network, query, best)
+                self.stats["network"] += 1
+            self._inflight[key] = future
+        # Finished lookups leave the table; the geocode cache serves later repeats
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: str, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def geocode_stream(self, queries: Iterable[LocationQuery]) -> Iterator[Tuple[object, Optional[object]]]:
+        """Yield (org_id, GeocodeResult or None) in completion order"""
+        waiting: Dict[Future, List] = {}
+        for query in queries:
+            waiting.setdefault(self.submit(query), []).append(query.org_id)
+
+        for future in as_completed(waiting):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Geocoding task failed: {e}")
+                result = None
+            for org_id in waiting[future]:
+                yield org_id, result
+
+        logger.info(f"Geocoding worker stats: {self.stats}")
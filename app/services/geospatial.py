@@ -244,12 +244,14 @@
 
 
 import sys, os
-from typing import Optional, Tuple, Dict
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Tuple, Dict, List
 import logging
 import numpy as np
-import rasterio
-from sqlalchemy import text
-from geopy.geocoders import Nominatim
+from sqlalchemy import bindparam, func, text, update
+from geopy.geocoders import Nominatim, Photon, ArcGIS
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 
 # ---------------------------------------------------------------
@@ -264,8 +266,15 @@ if project_root not in sys.path:
 # ✅ Local imports (will now work)
 # ---------------------------------------------------------------
 from app.config import settings
-from app.db import SessionLocal
-from app.models import Organization, RiskOverlay
+from app.db import SessionLocal, bulk_upsert
+from app.models import Organization, RiskOverlay, mark_orgs_dirty
+from app.services.geocode_cache import get_geocode_cache
+from app.services.gazetteer import get_gazetteer, PRECISION_RANK
+from app.services.geocode_worker import GeocodingWorker, LocationQuery, get_rate_limiter
+from app.services.layer_versions import changed_tiles, ensure_layer_versions, get_version
+from app.services.raster_registry import RasterRegistry
+from app.services.rasters import (sample_points, open_risk_raster, raster_memory_usage, exposure_weights_match,
+                                  zonal_stats, points_to_pixels, tile_key, weighted_exposure)
 
 # ---------------------------------------------------------------
 # ✅ Logger setup
@@ -274,30 +283,268 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
+# -----------------------------------------------------------
+# 🧭 Geocoder Chain
+# -----------------------------------------------------------
+class GeocodeResult:
+    def __init__(self, lat: float, lon: float, precision: str, provider: str):
+        self.lat = lat
+        self.lon = lon
+        self.precision = precision
+        self.provider = provider
+
+    @property
+    def coords(self) -> Tuple[float, float]:
+        return self.lat, self.lon
+
+    @property
+    def rank(self) -> int:
+        return PRECISION_RANK[self.precision]
+
+
+def build_geocode_query(org) -> str:
+    search_parts = [org.name]
+    if org.region_state:
+        search_parts.append(org.region_state)
+    if org.country:
+        search_parts.append(org.country)
+    return ", ".join(search_parts)
+
+
+class GazetteerResolver:
+    """Offline resolver: country / state / county / city centroids from the bundled gazetteer"""
+    name = "gazetteer"
+    network = False
+
+    def __init__(self):
+        self.gazetteer = get_gazetteer()
+
+    def resolve(self, org) -> Optional[GeocodeResult]:
+        place = self.gazetteer.resolve(org.name, org.region_state, org.country)
+        if not place:
+            return None
+        return GeocodeResult(place.lat, place.lon, place.kind, self.name)
+
+
+class NetworkResolver(ABC):
+    """Rate-limited network geocoder backed by the persistent geocode cache"""
+    name = "network"
+    network = True
+
+    def __init__(self):
+        self.geocoder = self.create_geocoder()
+        self.geocode_cache = get_geocode_cache()
+        self.rate_limiter = get_rate_limiter(self.name)
+
+    @abstractmethod
+    def create_geocoder(self):
+        """The geopy geocoder this resolver queries"""
+
+    def resolve(self, org) -> Optional[GeocodeResult]:
+        search_query = build_geocode_query(org)
+        cached = self.geocode_cache.get(f"{self.name}: {search_query}")
+        if cached:
+            return GeocodeResult(cached.lat, cached.lon, "address", self.name) if cached.found else None
+
+        self.rate_limiter.acquire()
+        try:
+            location = self.geocoder.geocode(search_query, timeout=10)
+        except (GeocoderTimedOut, GeocoderUnavailable) as e:
+            logger.warning(f"Geocoding timeout for {org.name}: {e}")
+            return None
+
+        if location:
+            self.geocode_cache.put(f"{self.name}: {search_query}", (location.latitude, location.longitude), self.name)
+            return GeocodeResult(location.latitude, location.longitude, "address", self.name)
+        self.geocode_cache.put(f"{self.name}: {search_query}", None, self.name)
+        return None
+
+
+class NominatimResolver(NetworkResolver):
+    name = "nominatim"
+
+    def create_geocoder(self):
+        return Nominatim(user_agent="wildfire_mapper")
+
+
+class PhotonResolver(NetworkResolver):
+    name = "photon"
+
+    def create_geocoder(self):
+        return Photon(user_agent="wildfire_mapper")
+
+
+class ArcGISResolver(NetworkResolver):
+    name = "arcgis"
+
+    def create_geocoder(self):
+        return ArcGIS(user_agent="wildfire_mapper")
+
+
+RESOLVERS = {
+    "gazetteer": GazetteerResolver,
+    "nominatim": NominatimResolver,
+    "photon": PhotonResolver,
+    "arcgis": ArcGISResolver,
+}
+
+
+class GeocoderChain:
+    """Try resolvers in order; stop at the first result that is precise enough.
+
+    If none is, the most precise result seen is returned, so an offline
+    chain still places orgs at their region or country centroid.
+    """
+
+    def __init__(self, resolvers: List, min_precision: str = "region"):
+        self.resolvers = resolvers
+        self.min_rank = PRECISION_RANK[min_precision]
+
+    def is_precise(self, precision: Optional[str]) -> bool:
+        return precision is not None and PRECISION_RANK.get(precision, 0) >= self.min_rank
+
+    @classmethod
+    def from_settings(cls) -> "GeocoderChain":
+        resolvers = [RESOLVERS[name.strip()]() for name in settings.geocode_resolvers if name.strip()]
+        return cls(resolvers, settings.geocode_min_precision)
+
+    def resolve(self, org) -> Optional[GeocodeResult]:
+        best = None
+        for resolver in self.resolvers:
+            try:
+                result = resolver.resolve(org)
+            except Exception as e:
+                logger.error(f"{resolver.name} geocoding error for {org.name}: {e}")
+                continue
+            if not result:
+                continue
+            if result.rank >= self.min_rank:
+                return result
+            if best is None or result.rank > best.rank:
+                best = result
+        return best
+
+
+# -----------------------------------------------------------
+# 🗺️ Raster-only Overlay Sampling
+# -----------------------------------------------------------
+def sample_raster_batch(raster, lats, lons) -> np.ndarray:
+    """Sample many points at once; NaN where a point has no value"""
+    try:
+        return sample_points(raster, lats, lons)
+    except Exception as e:
+        logger.warning(f"Error batch sampling raster: {e}")
+        return np.full(np.shape(lats), np.nan)
+
+
+def compute_overlay_values(registry: RasterRegistry, exposure_raster, lats, lons
+                           ) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Per-layer values (one batched stack pass) and exposure for many points, NaN where missing"""
+    count = len(lats)
+    if exposure_raster is None or settings.overlay_sample_components:
+        values = registry.sample_stack(lats, lons)
+    else:
+        values = {}
+
+    if exposure_raster is not None:
+        exposure = sample_raster_batch(exposure_raster, lats, lons)
+    else:
+        exposure = registry.combine_exposure(values, count)
+    return values, exposure
+
+
+def overlay_rows(registry: RasterRegistry, exposure_raster, layer_versions: Dict[str, int], org_ids: List,
+                 lats, lons) -> List[Dict]:
+    """risk_overlay rows (plain dicts, for bulk writes) for many organizations"""
+    values, exposure = compute_overlay_values(registry, exposure_raster, lats, lons)
+    missing = np.full(len(org_ids), np.nan)
+    susceptibility = values.get("susceptibility", missing)
+    ignition = values.get("ignition", missing)
+
+    def _value(x):
+        return None if np.isnan(x) else float(x)
+
+    return [
+        {
+            "org_id": org_id,
+            "susceptibility": _value(susceptibility[i]),
+            "ignition": _value(ignition[i]),
+            "exposure_score": _value(exposure[i]),
+            "layer_values": {name: _value(layer[i]) for name, layer in values.items()},
+            "layer_versions": dict(layer_versions) or None,
+        }
+        for i, org_id in enumerate(org_ids)
+    ]
+
+
+# Columns a re-sampled overlay replaces on an existing risk_overlay row
+OVERLAY_VALUE_COLUMNS = ("susceptibility", "ignition", "exposure_score", "layer_values", "layer_versions")
+
+
+def copy_overlay_values(source: RiskOverlay, target: RiskOverlay):
+    for column in OVERLAY_VALUE_COLUMNS:
+        setattr(target, column, getattr(source, column))
+
+
 class WildfireGeospatialService:
     def __init__(self):
-        self.susceptibility_raster = None
-        self.ignition_raster = None
-        self.geocoder = Nominatim(user_agent="wildfire_mapper")
+        self.registry = RasterRegistry.from_settings()
+        self.exposure_raster = None
+        self.layer_versions: Dict[str, int] = {}  # stamped on overlays once known
+        self.geocoder_chain = GeocoderChain.from_settings()
 
-        # Load risk rasters at initialization
+        # Layers open lazily; only the precomputed exposure raster is checked here
         self._load_risk_rasters()
 
+    @property
+    def susceptibility_raster(self):
+        return self.registry.get("susceptibility")
+
+    @property
+    def ignition_raster(self):
+        return self.registry.get("ignition")
+
     # -----------------------------------------------------------
     # 🌍 Load GeoTIFF Rasters
     # -----------------------------------------------------------
     def _load_risk_rasters(self):
-        try:
-            if getattr(settings, "geotiff_susceptibility", None):
-                self.susceptibility_raster = rasterio.open(settings.geotiff_susceptibility)
-                logger.info("Loaded susceptibility risk raster")
-
-            if getattr(settings, "geotiff_ignition", None):
-                self.ignition_raster = rasterio.open(settings.geotiff_ignition)
-                logger.info("Loaded ignition risk raster")
+        available = self.registry.available()
+        logger.info(f"Risk layers available: {', '.join(available) or 'none'} ({settings.raster_load_mode} mode)")
+        self._load_exposure_raster()
 
+    def _load_exposure_raster(self):
+        path = getattr(settings, "geotiff_exposure", None)
+        if not path or not os.path.exists(path):
+            return
+        weights = self.registry.weighted()
+        if not set(weights) <= {"susceptibility", "ignition"}:
+            logger.info(f"Extra weighted layers {sorted(weights)}; computing exposure from the layer stack")
+            return
+        if not all(self.registry.specs[name].configured for name in weights):
+            logger.info("A weighted layer is unavailable; exposure is left empty rather than read from the raster")
+            return
+        inputs = [self.registry.specs[name].path for name in weights]
+        if any(os.path.getmtime(p) > os.path.getmtime(path) for p in inputs):
+            logger.warning(f"{path} is older than its input layers; computing exposure from the layer stack")
+            return
+        try:
+            raster = open_risk_raster(path)
+            if exposure_weights_match(raster, weights.get("susceptibility", 0.0), weights.get("ignition", 0.0)):
+                self.exposure_raster = raster
+                logger.info("Loaded precomputed exposure raster")
+            else:
+                logger.warning(f"{path} was built with different weights; computing exposure per organization")
+                raster.close()
         except Exception as e:
-            logger.warning(f"Could not load risk rasters: {e}")
+            logger.warning(f"Could not load exposure raster: {e}")
+
+    def raster_memory_report(self) -> Dict:
+        layers = self.registry.memory_report()
+        layers["exposure"] = raster_memory_usage(self.exposure_raster)
+        return {
+            "layers": layers,
+            "total_mb": round(sum(layer["bytes"] for layer in layers.values()) / (1024 * 1024), 1),
+        }
 
     # -----------------------------------------------------------
     # 📍 Geocoding Function
@@ -306,29 +553,21 @@ class WildfireGeospatialService:
         if org.latitude and org.longitude:
             return org.latitude, org.longitude
 
-        try:
-            search_parts = [org.name]
-            if org.region_state:
-                search_parts.append(org.region_state)
-            if org.country:
-                search_parts.append(org.country)
+        result = self.resolve_location(org)
+        return result.coords if result else None
 
-            search_query = ", ".join(search_parts)
-            location = self.geocoder.geocode(search_query, timeout=10)
+    def resolve_location(self, org) -> Optional[GeocodeResult]:
+        """Run the geocoder chain; the result carries the precision to store with the coordinates"""
+        result = self.geocoder_chain.resolve(org)
+        if result:
+            logger.info(f"Geocoded {org.name} via {result.provider} ({result.precision}): {result.lat}, {result.lon}")
+            if not self.geocoder_chain.is_precise(result.precision):
+                logger.warning(f"Only a {result.precision} centroid found for {org.name}; "
+                               f"it will be retried by geocode_pending_organizations")
+            return result
 
-            if location:
-                logger.info(f"Geocoded {org.name}: {location.latitude}, {location.longitude}")
-                return location.latitude, location.longitude
-            else:
-                logger.warning(f"Could not geocode {org.name}")
-                return None
-
-        except (GeocoderTimedOut, GeocoderUnavailable) as e:
-            logger.warning(f"Geocoding timeout for {org.name}: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Geocoding error for {org.name}: {e}")
-            return None
+        logger.warning(f"Could not geocode {org.name}")
+        return None
 
     # -----------------------------------------------------------
     # 🧭 Sample Raster Values
@@ -353,22 +592,22 @@ class WildfireGeospatialService:
         if susceptibility is None or ignition is None:
             return None
 
-        exposure = (
-            settings.susceptibility_weight * susceptibility +
-            settings.ignition_weight * ignition
-        )
-        return max(0, min(100, exposure * 100))
+        return float(weighted_exposure(
+            {"susceptibility": susceptibility, "ignition": ignition},
+            {"susceptibility": settings.susceptibility_weight, "ignition": settings.ignition_weight},
+        ))
 
     # -----------------------------------------------------------
     # 🧭 Update Organization Location
     # -----------------------------------------------------------
-    def update_organization_location(self, org_id: str, lat: float, lon: float):
+    def update_organization_location(self, org_id: str, lat: float, lon: float, precision: Optional[str] = None):
         db = SessionLocal()
         try:
             org = db.query(Organization).filter(Organization.org_id == org_id).first()
             if org:
                 org.latitude = lat
                 org.longitude = lon
+                org.geocode_precision = precision
                 geom_query = text("""
                     UPDATE organizations 
                     SET geom = ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
@@ -386,28 +625,40 @@ class WildfireGeospatialService:
     # -----------------------------------------------------------
     # 🗺️ Create Risk Overlay
     # -----------------------------------------------------------
+    def register_layer_versions(self, db):
+        """Stamp overlays written from here on with the current risk layer versions"""
+        try:
+            self.layer_versions = {name: v.version for name, v in ensure_layer_versions(db, self.registry).items()}
+        except Exception as e:
+            logger.warning(f"Could not register risk layer versions: {e}")
+            db.rollback()
+
     def create_risk_overlay(self, org_id: str, lat: float, lon: float) -> Optional[RiskOverlay]:
         try:
-            susceptibility = self.sample_risk_raster(lat, lon, self.susceptibility_raster)
-            ignition = self.sample_risk_raster(lat, lon, self.ignition_raster)
-            exposure_score = self.calculate_exposure_score(susceptibility, ignition)
-
-            return RiskOverlay(
-                org_id=org_id,
-                susceptibility=susceptibility,
-                ignition=ignition,
-                exposure_score=exposure_score
-            )
+            return self.create_risk_overlays([org_id], np.array([lat]), np.array([lon]))[0]
         except Exception as e:
             logger.error(f"Error creating risk overlay for {org_id}: {e}")
             return None
 
+    def compute_overlay_values(self, lats, lons) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Per-layer values (one batched stack pass) and exposure for many points, NaN where missing"""
+        return compute_overlay_values(self.registry, self.exposure_raster, lats, lons)
+
+    def overlay_rows(self, org_ids: List, lats, lons) -> List[Dict]:
+        """risk_overlay rows (plain dicts, for bulk writes) for many organizations"""
+        return overlay_rows(self.registry, self.exposure_raster, self.layer_versions, org_ids, lats, lons)
+
+    def create_risk_overlays(self, org_ids: List, lats, lons) -> List[RiskOverlay]:
+        """Create risk overlays for many organizations with one batched pass per raster"""
+        return [RiskOverlay(**row) for row in self.overlay_rows(org_ids, lats, lons)]
+
     # -----------------------------------------------------------
     # 🏢 Process One Organization
     # -----------------------------------------------------------
     def process_organization_geospatial(self, org_id: str) -> bool:
         db = SessionLocal()
         try:
+            self.register_layer_versions(db)
             org = db.query(Organization).filter(Organization.org_id == org_id).first()
             if not org:
                 return False
@@ -415,19 +666,17 @@ class WildfireGeospatialService:
             if org.latitude and org.longitude:
                 lat, lon = org.latitude, org.longitude
             else:
-                coords = self.geocode_organization(org)
-                if not coords:
+                result = self.resolve_location(org)
+                if not result:
                     return False
-                lat, lon = coords
-                self.update_organization_location(org_id, lat, lon)
+                lat, lon = result.coords
+                self.update_organization_location(org_id, lat, lon, result.precision)
 
             risk_overlay = self.create_risk_overlay(org_id, lat, lon)
             if risk_overlay:
                 existing = db.query(RiskOverlay).filter(RiskOverlay.org_id == org_id).first()
                 if existing:
-                    existing.susceptibility = risk_overlay.susceptibility
-                    existing.ignition = risk_overlay.ignition
-                    existing.exposure_score = risk_overlay.exposure_score
+                    copy_overlay_values(risk_overlay, existing)
                 else:
                     db.add(risk_overlay)
                 db.commit()
@@ -441,31 +690,546 @@ class WildfireGeospatialService:
         finally:
             db.close()
 
+    # -----------------------------------------------------------
+    # 📦 Batched Location + Overlay Writes
+    # -----------------------------------------------------------
+    def _set_location(self, db, org: Organization, lat: float, lon: float, precision: Optional[str] = None):
+        org.latitude = lat
+        org.longitude = lon
+        org.geocode_precision = precision
+        if db.bind.dialect.name == "postgresql":
+            db.execute(text("""
+                UPDATE organizations
+                SET geom = ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
+                WHERE org_id = :org_id
+            """), {"lon": lon, "lat": lat, "org_id": org.org_id})
+
+    def _write_overlay_batch(self, db, batch: List) -> List:
+        """Store geocoded locations and batch-sampled overlays for (org, lat, lon, precision) rows.
+
+        precision is None for orgs that already had coordinates.
+        """
+        if not batch:
+            return []
+        for org, lat, lon, precision in batch:
+            if precision:
+                self._set_location(db, org, lat, lon, precision)
+
+        org_ids = [org.org_id for org, _, _, _ in batch]
+        overlays = self.create_risk_overlays(
+            org_ids,
+            np.array([lat for _, lat, _, _ in batch], dtype=np.float64),
+            np.array([lon for _, _, lon, _ in batch], dtype=np.float64),
+        )
+        existing = {o.org_id: o for o in db.query(RiskOverlay).filter(RiskOverlay.org_id.in_(org_ids))}
+        for overlay in overlays:
+            current = existing.get(overlay.org_id)
+            if current:
+                copy_overlay_values(overlay, current)
+            else:
+                db.add(overlay)
+        db.commit()
+        return org_ids
+
     # -----------------------------------------------------------
     # 🌍 Process All Organizations
     # -----------------------------------------------------------
     def process_all_organizations(self) -> Dict[str, bool]:
+        """Overlay every org; geocoding runs on worker threads while finished batches are sampled and written"""
         db = SessionLocal()
         try:
+            self.register_layer_versions(db)
             orgs = db.query(Organization).all()
+            by_id = {org.org_id: org for org in orgs}
             results = {}
+            batch = []
+
+            def flush():
+                for org_id in self._write_overlay_batch(db, batch):
+                    results[org_id] = True
+                batch.clear()
+
             for org in orgs:
-                success = self.process_organization_geospatial(org.org_id)
-                results[org.org_id] = success
+                if org.latitude and org.longitude:
+                    batch.append((org, org.latitude, org.longitude, None))
+                    if len(batch) >= settings.overlay_batch_size:
+                        flush()
+
+            pending = [LocationQuery.from_org(org) for org in orgs if not (org.latitude and org.longitude)]
+            with GeocodingWorker(self.geocoder_chain) as worker:
+                for org_id, result in worker.geocode_stream(pending):
+                    if not result:
+                        results[org_id] = False
+                        continue
+                    batch.append((by_id[org_id], result.lat, result.lon, result.precision))
+                    if len(batch) >= settings.overlay_batch_size:
+                        flush()
+            flush()
+
+            logger.info(f"Created risk overlays for {sum(results.values())} of {len(orgs)} organizations")
             return results
         except Exception as e:
             logger.error(f"Error processing all organizations: {e}")
+            db.rollback()
+            return {}
+        finally:
+            db.close()
+
+    # -----------------------------------------------------------
+    # 🚚 Bulk Pipeline (streamed chunks, one transaction each)
+    # -----------------------------------------------------------
+    def _stream_rows(self, db, query, chunk_size: int):
+        """Yield lists of query rows; server-side cursor on PostgreSQL"""
+        if db.bind.dialect.name == "postgresql":
+            rows = query.execution_options(stream_results=True, max_row_buffer=chunk_size).yield_per(chunk_size)
+        else:
+            # No server-side cursors; an open read cursor would also block the writer on SQLite
+            rows = query.all()
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _stream_location_rows(self, db, chunk_size: int, located_only: bool = False):
+        """Yield lists of lightweight org rows; server-side cursor on PostgreSQL.
+
+        located_only streams orgs with coordinates in latitude/longitude
+        order, so each chunk covers a compact area.
+        """
+        query = db.query(
+            Organization.org_id,
+            Organization.name,
+            Organization.region_state,
+            Organization.country,
+            Organization.latitude,
+            Organization.longitude,
+        )
+        if located_only:
+            query = query.filter(
+                Organization.latitude.isnot(None), Organization.longitude.isnot(None)
+            ).order_by(Organization.latitude, Organization.longitude)
+        else:
+            query = query.order_by(Organization.org_id)
+        return self._stream_rows(db, query, chunk_size)
+
+    def _write_bulk_chunk(self, db, overlays: List[Dict], locations: List[Dict]):
+        """Upsert overlays and store geocoded locations for one chunk in a single transaction"""
+        try:
+            if locations:
+                db.execute(
+                    update(Organization.__table__)
+                    .where(Organization.__table__.c.org_id == bindparam("b_org_id"))
+                    .values(latitude=bindparam("b_lat"), longitude=bindparam("b_lon"),
+                            geocode_precision=bindparam("b_precision"), updated_at=func.now()),
+                    locations,
+                )
+                if db.bind.dialect.name == "postgresql":
+                    db.execute(text("""
+                        UPDATE organizations
+                        SET geom = ST_SetSRID(ST_MakePoint(:b_lon, :b_lat), 4326)
+                        WHERE org_id = :b_org_id
+                    """), locations)
+            bulk_upsert(db, RiskOverlay, overlays, index_elements=["org_id"])
+            mark_orgs_dirty(db, [row["org_id"] for row in overlays])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    def process_all_organizations_bulk(self, chunk_size: Optional[int] = None) -> Dict[str, bool]:
+        """Overlay every org in streamed chunks with no per-org sessions or queries.
+
+        Each chunk is geocoded (threaded, rate-limited), sampled in one
+        batched pass per raster, and written with executemany location
+        updates plus a risk_overlay upsert in one transaction.
+        """
+        chunk_size = chunk_size or settings.overlay_batch_size
+        read_db = SessionLocal()
+        write_db = SessionLocal()
+        results = {}
+        total = 0
+        self.register_layer_versions(write_db)
+        try:
+            with GeocodingWorker(self.geocoder_chain) as worker:
+                for chunk in self._stream_location_rows(read_db, chunk_size):
+                    total += len(chunk)
+                    coords = {row.org_id: (row.latitude, row.longitude)
+                              for row in chunk if row.latitude and row.longitude}
+                    pending = [LocationQuery(row.org_id, row.name, row.region_state, row.country)
+                               for row in chunk if row.org_id not in coords]
+
+                    locations = []
+                    for org_id, result in worker.geocode_stream(pending):
+                        if result:
+                            coords[org_id] = result.coords
+                            locations.append({"b_org_id": org_id, "b_lat": result.lat, "b_lon": result.lon,
+                                              "b_precision": result.precision})
+                        else:
+                            results[org_id] = False
+
+                    org_ids = list(coords)
+                    overlays = self.overlay_rows(
+                        org_ids,
+                        np.array([coords[o][0] for o in org_ids], dtype=np.float64),
+                        np.array([coords[o][1] for o in org_ids], dtype=np.float64),
+                    )
+                    try:
+                        self._write_bulk_chunk(write_db, overlays, locations)
+                    except Exception as e:
+                        logger.error(f"Error writing chunk of {len(chunk)} organizations: {e}")
+                        results.update({org_id: False for org_id in org_ids})
+                        continue
+                    results.update({org_id: True for org_id in org_ids})
+
+            logger.info(f"Bulk-created risk overlays for {sum(results.values())} of {total} organizations")
+            return results
+        except Exception as e:
+            logger.error(f"Error in bulk geospatial processing: {e}")
+            return results
+        finally:
+            read_db.close()
+            write_db.close()
+
+    # -----------------------------------------------------------
+    # 🎯 Zonal Statistics
+    # -----------------------------------------------------------
+    def compute_zonal_stats(self, lats, lons, buffers_km: Optional[List[float]] = None) -> List[Dict]:
+        """Per-org {layer: {"<b>km": {"mean", "max", "p90"}}} for every available risk layer"""
+        buffers_km = buffers_km or settings.zonal_buffers_km
+        layers = {name: self.registry.get(name) for name in self.registry.available()}
+        results = [{} for _ in range(len(lats))]
+        for layer, raster in layers.items():
+            if raster is None:
+                continue
+            try:
+                stats = zonal_stats(raster, lats, lons, buffers_km,
+                                    percentile=settings.zonal_percentile, tile=settings.zonal_tile_px)
+            except Exception as e:
+                logger.warning(f"Error computing zonal stats for {layer}: {e}")
+                continue
+            for i, result in enumerate(results):
+                result[layer] = {
+                    f"{buffer_km:g}km": {
+                        name: None if np.isnan(values[i]) else round(float(values[i]), 6)
+                        for name, values in stats[buffer_km].items()
+                    }
+                    for buffer_km in buffers_km
+                }
+        return results
+
+    def refresh_zonal_stats(self, chunk_size: Optional[int] = None) -> int:
+        """Recompute zonal stats for every located org and upsert them onto risk_overlay"""
+        chunk_size = chunk_size or settings.overlay_batch_size
+        read_db = SessionLocal()
+        write_db = SessionLocal()
+        updated = 0
+        try:
+            for chunk in self._stream_location_rows(read_db, chunk_size, located_only=True):
+                stats = self.compute_zonal_stats(
+                    np.array([row.latitude for row in chunk], dtype=np.float64),
+                    np.array([row.longitude for row in chunk], dtype=np.float64),
+                )
+                rows = [{"org_id": row.org_id, "zonal_stats": stats[i]} for i, row in enumerate(chunk)]
+                try:
+                    bulk_upsert(write_db, RiskOverlay, rows, index_elements=["org_id"], update_columns=["zonal_stats"])
+                    write_db.commit()
+                    updated += len(rows)
+                except Exception as e:
+                    logger.error(f"Error writing zonal stats for {len(rows)} organizations: {e}")
+                    write_db.rollback()
+            logger.info(f"Refreshed zonal stats for {updated} organizations (buffers {settings.zonal_buffers_km} km)")
+            return updated
+        finally:
+            read_db.close()
+            write_db.close()
+
+    # -----------------------------------------------------------
+    # 🔄 Incremental Re-overlay on Layer Refresh
+    # -----------------------------------------------------------
+    def _stale_mask(self, db, chunk, lats, lons, current: Dict, diffs: Dict) -> np.ndarray:
+        """Orgs whose overlay must be re-sampled: missing/unstamped, or inside a tile changed since their stamp"""
+        stale = np.array([
+            row.overlay_id is None or not row.layer_versions or set(row.layer_versions) != set(current)
+            for row in chunk
+        ], dtype=bool)
+
+        for name, version in current.items():
+            raster = self.registry.get(name)
+            by_old = {}
+            for i, row in enumerate(chunk):
+                if stale[i]:
+                    continue
+                old = row.layer_versions.get(name)
+                if old != version.version:
+                    by_old.setdefault(old, []).append(i)
+
+            for old, members in by_old.items():
+                if (name, old) not in diffs:
+                    previous = get_version(db, name, old) if old is not None else None
+                    diffs[(name, old)] = changed_tiles(previous, version) if previous else None
+                changed = diffs[(name, old)]
+                members = np.array(members)
+                if changed is None or raster is None:
+                    stale[members] = True
+                    continue
+                rows, cols = points_to_pixels(raster.transform, lats[members], lons[members])
+                keys = tile_key(rows, cols, version.tile_size)
+                stale[members] = [key in changed for key in keys]
+        return stale
+
+    def refresh_risk_layers(self, full: bool = False, chunk_size: Optional[int] = None) -> Dict[str, int]:
+        """Register new layer versions and re-overlay only the orgs whose pixels changed.
+
+        Orgs in unchanged tiles keep their values and are just re-stamped
+        with the current layer versions. full=True re-samples everything.
+        """
+        chunk_size = chunk_size or settings.overlay_batch_size
+        read_db = SessionLocal()
+        write_db = SessionLocal()
+        counts = {"resampled": 0, "restamped": 0, "unchanged": 0}
+        try:
+            current = ensure_layer_versions(write_db, self.registry)
+            self.layer_versions = {name: v.version for name, v in current.items()}
+            logger.info(f"Current risk layer versions: {self.layer_versions}")
+
+            query = read_db.query(
+                Organization.org_id,
+                Organization.latitude,
+                Organization.longitude,
+                RiskOverlay.org_id.label("overlay_id"),
+                RiskOverlay.layer_versions,
+            ).outerjoin(RiskOverlay, RiskOverlay.org_id == Organization.org_id).filter(
+                Organization.latitude.isnot(None), Organization.longitude.isnot(None)
+            ).order_by(Organization.latitude, Organization.longitude)
+
+            diffs = {}
+            for chunk in self._stream_rows(read_db, query, chunk_size):
+                lats = np.array([row.latitude for row in chunk], dtype=np.float64)
+                lons = np.array([row.longitude for row in chunk], dtype=np.float64)
+                if full:
+                    stale = np.ones(len(chunk), dtype=bool)
+                else:
+                    stale = self._stale_mask(write_db, chunk, lats, lons, current, diffs)
+
+                idx = np.flatnonzero(stale)
+                overlays = self.overlay_rows([chunk[i].org_id for i in idx], lats[idx], lons[idx])
+                restamp = [
+                    {"org_id": row.org_id, "layer_versions": dict(self.layer_versions)}
+                    for i, row in enumerate(chunk)
+                    if not stale[i] and row.layer_versions != self.layer_versions
+                ]
+                try:
+                    bulk_upsert(write_db, RiskOverlay, overlays, index_elements=["org_id"])
+                    bulk_upsert(write_db, RiskOverlay, restamp, index_elements=["org_id"],
+                                update_columns=["layer_versions"])
+                    mark_orgs_dirty(write_db, [row["org_id"] for row in overlays])
+                    write_db.commit()
+                except Exception as e:
+                    logger.error(f"Error writing refreshed overlays for {len(chunk)} organizations: {e}")
+                    write_db.rollback()
+                    continue
+                counts["resampled"] += len(overlays)
+                counts["restamped"] += len(restamp)
+                counts["unchanged"] += len(chunk) - len(overlays) - len(restamp)
+
+            logger.info(f"Risk layer refresh: {counts}")
+            return counts
+        finally:
+            read_db.close()
+            write_db.close()
+
+    # -----------------------------------------------------------
+    # 🧵 Process-Pool Parallel Overlay
+    # -----------------------------------------------------------
+    def _partition_by_tile(self, lats: np.ndarray, lons: np.ndarray, task_size: int) -> List[np.ndarray]:
+        """Index groups of orgs sharing a partition tile, packed into tasks of about task_size"""
+        reference = next((self.registry.get(name) for name in self.registry.available()), None)
+        if reference is None:
+            return [np.arange(i, min(i + task_size, lats.size)) for i in range(0, lats.size, task_size)]
+
+        rows, cols = points_to_pixels(reference.transform, lats, lons)
+        size = settings.overlay_partition_px
+        keys = np.stack([rows // size, cols // size], axis=1)
+        _, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        groups = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+
+        # Neighbouring tiles share a task until it is big enough to be worth a round trip
+        tasks, current = [], []
+        for group in groups:
+            current.append(group)
+            if sum(len(g) for g in current) >= task_size:
+                tasks.append(np.concatenate(current))
+                current = []
+        if current:
+            tasks.append(np.concatenate(current))
+        return tasks
+
+    def process_overlays_parallel(self, workers: Optional[int] = None, task_size: Optional[int] = None) -> Dict[str, bool]:
+        """Overlay every located org in a process pool, then write all rows in one transaction.
+
+        Orgs are partitioned by raster tile so each worker decodes a compact
+        set of blocks with its own dataset handles. Orgs without
+        coordinates are left to geocode_pending_organizations.
+        """
+        workers = workers or settings.overlay_workers
+        task_size = task_size or settings.overlay_batch_size
+        db = SessionLocal()
+        try:
+            self.register_layer_versions(db)
+
+            located = db.query(Organization.org_id, Organization.latitude, Organization.longitude).filter(
+                Organization.latitude.isnot(None), Organization.longitude.isnot(None)
+            ).all()
+            if not located:
+                return {}
+            org_ids = [row.org_id for row in located]
+            lats = np.array([row.latitude for row in located], dtype=np.float64)
+            lons = np.array([row.longitude for row in located], dtype=np.float64)
+            tasks = self._partition_by_tile(lats, lons, task_size)
+            logger.info(f"Overlaying {len(org_ids)} organizations in {len(tasks)} tile tasks on {workers} processes")
+
+            rows = []
+            context = multiprocessing.get_context("spawn")  # no GDAL handles inherited across fork
+            exposure_path = settings.geotiff_exposure if self.exposure_raster is not None else None
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_overlay_worker_init,
+                                     initargs=(exposure_path,)) as pool:
+                futures = [
+                    pool.submit(_overlay_worker_task, [org_ids[i] for i in idx], lats[idx], lons[idx],
+                                self.layer_versions)
+                    for idx in tasks
+                ]
+                for future in as_completed(futures):
+                    try:
+                        rows.extend(future.result())
+                    except Exception as e:
+                        logger.error(f"Overlay task failed: {e}")
+
+            for start in range(0, len(rows), task_size):
+                bulk_upsert(db, RiskOverlay, rows[start:start + task_size], index_elements=["org_id"])
+            mark_orgs_dirty(db, [row["org_id"] for row in rows])
+            db.commit()
+
+            results = {org_id: False for org_id in org_ids}
+            results.update({row["org_id"]: True for row in rows})
+            logger.info(f"Created risk overlays for {len(rows)} of {len(org_ids)} organizations")
+            return results
+        except Exception as e:
+            logger.error(f"Error in parallel overlay: {e}")
+            db.rollback()
             return {}
         finally:
             db.close()
 
+    def geocode_pending_organizations(self) -> Dict[str, bool]:
+        """Geocode every org without coordinates, or placed only at a centroid coarser than
+        settings.geocode_min_precision, and store locations in batches.
+
+        A re-geocoded org keeps its old location unless the new result is
+        more precise; when it moves, its overlay stamp is cleared so the next
+        refresh_risk_layers re-samples it.
+        """
+        coarse = [p for p in PRECISION_RANK if not self.geocoder_chain.is_precise(p)]
+        db = SessionLocal()
+        try:
+            orgs = db.query(Organization).filter(
+                (Organization.latitude.is_(None)) | (Organization.longitude.is_(None))
+                | Organization.geocode_precision.in_(coarse)
+            ).all()
+            by_id = {org.org_id: org for org in orgs}
+            results = {}
+            moved = []
+            written = 0
+            with GeocodingWorker(self.geocoder_chain) as worker:
+                for org_id, result in worker.geocode_stream(LocationQuery.from_org(org) for org in orgs):
+                    org = by_id[org_id]
+                    located = org.latitude is not None and org.longitude is not None
+                    if located and (not result or result.rank <= PRECISION_RANK.get(org.geocode_precision, 0)):
+                        results[org_id] = False
+                        continue
+                    results[org_id] = result is not None
+                    if result:
+                        self._set_location(db, org, result.lat, result.lon, result.precision)
+                        if located:
+                            moved.append(org_id)
+                        written += 1
+                        if written % settings.overlay_batch_size == 0:
+                            db.commit()
+            for start in range(0, len(moved), settings.overlay_batch_size):
+                db.query(RiskOverlay).filter(
+                    RiskOverlay.org_id.in_(moved[start:start + settings.overlay_batch_size])
+                ).update({RiskOverlay.layer_versions: None}, synchronize_session=False)
+            db.commit()
+            logger.info(f"Geocoded {written} of {len(orgs)} organizations")
+            return results
+        except Exception as e:
+            logger.error(f"Error geocoding organizations: {e}")
+            db.rollback()
+            return {}
+        finally:
+            db.close()
+
+
+# -----------------------------------------------------------
+# 🧵 Process-Pool Worker Entry Points
+# -----------------------------------------------------------
+_worker_registry: Optional[RasterRegistry] = None
+_worker_exposure_raster = None
+
+
+def _overlay_worker_init(exposure_path: Optional[str] = None):
+    """Give each pool process its own raster handles (layers open lazily on first task).
+
+    Only the rasters are set up: no geocoder chain or geocode cache. The
+    parent passes the exposure raster path only if it validated and loaded it.
+    """
+    global _worker_registry, _worker_exposure_raster
+    _worker_registry = RasterRegistry.from_settings()
+    _worker_exposure_raster = open_risk_raster(exposure_path) if exposure_path else None
+
+
+def _overlay_worker_task(org_ids: List, lats: np.ndarray, lons: np.ndarray, layer_versions: Dict[str, int]) -> List[Dict]:
+    return overlay_rows(_worker_registry, _worker_exposure_raster, layer_versions, org_ids, lats, lons)
+
 
 # -----------------------------------------------------------
 # 🧩 Utility Functions for Script Use
 # -----------------------------------------------------------
+_shared_service: Optional[WildfireGeospatialService] = None
+
+
+def get_geospatial_service() -> WildfireGeospatialService:
+    """Process-wide service so rasters are loaded once (e.g. by the API)"""
+    global _shared_service
+    if _shared_service is None:
+        _shared_service = WildfireGeospatialService()
+    return _shared_service
+
+
 def process_organization_geospatial(org_id: str) -> bool:
     return WildfireGeospatialService().process_organization_geospatial(org_id)
 
 
-def process_all_organizations_geospatial() -> Dict[str, bool]:
-    return WildfireGeospatialService().process_all_organizations()
+def refresh_zonal_stats() -> int:
+    return WildfireGeospatialService().refresh_zonal_stats()
+
+
+def refresh_risk_layers(full: bool = False) -> Dict[str, int]:
+    return WildfireGeospatialService().refresh_risk_layers(full=full)
+
+
+def process_overlays_parallel(workers: Optional[int] = None) -> Dict[str, bool]:
+    return WildfireGeospatialService().process_overlays_parallel(workers=workers)
+
+
+def process_all_organizations_geospatial(bulk: bool = True) -> Dict[str, bool]:
+    service = WildfireGeospatialService()
+    if bulk:
+        return service.process_all_organizations_bulk()
+    return service.process_all_organizations()
@@ -0,0 +1,71 @@
+import re
+from typing import Dict, Iterable, List, Optional, Union
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """Many keywords compiled into one alternation regex, so each text is scanned once.
+
+    Keywords match whole words, case-insensitively. A trailing "*" makes a
+    prefix match ("mitigat*" finds "mitigation", "mitigating"); spaces in
+    a phrase match any run of whitespace. Each keyword carries a weight.
+    """
+
+    def __init__(self, keywords: Union[Dict[str, float], Iterable[str]]):
+        if not isinstance(keywords, dict):
+            keywords = {keyword: 1.0 for keyword in keywords}
+        self.weights: Dict[str, float] = dict(keywords)
+        # Longest first so a phrase wins over a keyword it starts with
+        self.keywords: List[str] = sorted(self.weights, key=len, reverse=True)
+        alternatives = "|".join(f"({self._pattern(keyword)})" for keyword in self.keywords)
+        self.regex = re.compile(rf"(?<!\w)(?:{alternatives})", re.IGNORECASE) if self.keywords else None
+
+    @staticmethod
+    def _pattern(keyword: str) -> str:
+        prefix = keyword.endswith("*")
+        words = keyword.rstrip("*").split()
+        pattern = r"\s+".join(re.escape(word) for word in words)
+        return pattern + (r"\w*" if prefix else r"(?!\w)")
+
+    def find(self, text: Optional[str]) -> List[str]:
+        """Distinct keywords found in the text, in order of first occurrence"""
+        if not text or self.regex is None:
+            return []
+        found = {}
+        for match in self.regex.finditer(text):
+            found.setdefault(self.keywords[match.lastindex - 1], None)
+        return list(found)
+
+    def matches(self, text: Optional[str]) -> bool:
+        return bool(text) and self.regex is not None and self.regex.search(text) is not None
+
+    def max_weight(self, text: Optional[str]) -> float:
+        """Weight of the strongest keyword in the text (0 if none)"""
+        return max((self.weights[keyword] for keyword in self.find(text)), default=0.0)
+
+    def total_weight(self, text: Optional[str]) -> float:
+        """Sum of the weights of the distinct keywords in the text"""
+        return sum(self.weights[keyword] for keyword in self.find(text))
+
+
+_program_matcher: Optional[KeywordMatcher] = None
+_agent_matcher: Optional[KeywordMatcher] = None
+
+
+def get_program_matcher() -> KeywordMatcher:
+    """Matcher for wildfire program detection in scoring"""
+    global _program_matcher
+    if _program_matcher is None:
+        _program_matcher = KeywordMatcher(settings.program_keywords)
+    return _program_matcher
+
+
+def get_agent_matcher() -> KeywordMatcher:
+    """Matcher the agents use to spot program/resource links and tag programs"""
+    global _agent_matcher
+    if _agent_matcher is None:
+        _agent_matcher = KeywordMatcher(settings.agent_program_keywords)
+    return _agent_matcher
@@ -0,0 +1,74 @@
+import os
+from typing import Dict, Optional, Set
+from app.config import settings
+from app.models import RiskLayerVersion
+from app.services.rasters import tile_fingerprint
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def latest_version(db, layer: str) -> Optional[RiskLayerVersion]:
+    return db.query(RiskLayerVersion).filter(
+        RiskLayerVersion.layer == layer
+    ).order_by(RiskLayerVersion.version.desc()).first()
+
+
+def get_version(db, layer: str, version: int) -> Optional[RiskLayerVersion]:
+    return db.query(RiskLayerVersion).filter(
+        RiskLayerVersion.layer == layer, RiskLayerVersion.version == version
+    ).first()
+
+
+def ensure_layer_versions(db, registry, tile_size: Optional[int] = None) -> Dict[str, RiskLayerVersion]:
+    """Current version of every available layer, registering a new one when a file's content changed.
+
+    Files whose path, size and mtime match the latest version are not
+    re-read. Otherwise the raster is fingerprinted tile by tile; a new
+    version is only created if the checksum differs.
+    """
+    tile_size = tile_size or settings.layer_tile_px
+    current = {}
+    for name in registry.available():
+        path = registry.specs[name].path
+        stat = os.stat(path)
+        latest = latest_version(db, name)
+        if (latest and latest.path == path and latest.file_size == stat.st_size
+                and latest.file_mtime == stat.st_mtime and latest.tile_size == tile_size):
+            current[name] = latest
+            continue
+
+        raster = registry.get(name)
+        if raster is None:
+            continue
+        checksum, hashes = tile_fingerprint(raster, tile_size)
+        if latest and latest.checksum == checksum and latest.tile_size == tile_size:
+            # Same content (e.g. file copied again); remember the new file signature
+            latest.path, latest.file_size, latest.file_mtime = path, stat.st_size, stat.st_mtime
+            current[name] = latest
+            continue
+
+        version = RiskLayerVersion(
+            layer=name,
+            version=latest.version + 1 if latest else 1,
+            path=path,
+            file_size=stat.st_size,
+            file_mtime=stat.st_mtime,
+            checksum=checksum,
+            tile_size=tile_size,
+            grid={"transform": list(raster.transform)[:6], "height": raster.height, "width": raster.width},
+            tile_hashes=hashes,
+        )
+        db.add(version)
+        current[name] = version
+        logger.info(f"Registered {name} layer version {version.version} ({len(hashes)} tiles)")
+    db.commit()
+    return current
+
+
+def changed_tiles(old: RiskLayerVersion, new: RiskLayerVersion) -> Optional[Set[str]]:
+    """Tile keys whose content differs between two versions; None if the grids differ (everything changed)"""
+    if old.tile_size != new.tile_size or old.grid != new.grid:
+        return None
+    keys = set(old.tile_hashes) | set(new.tile_hashes)
+    return {key for key in keys if old.tile_hashes.get(key) != new.tile_hashes.get(key)}
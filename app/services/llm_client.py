@@ -0,0 +1,84 @@
+import random
+import time
+from typing import Optional
+from openai import OpenAI, APIConnectionError, InternalServerError, RateLimitError
+from app.config import settings
+from app.services.llm_telemetry import telemetry
+import logging
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[OpenAI] = None
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+def get_llm_client() -> OpenAI:
+    """Return the shared OpenAI client, pointed at the local stub when enabled.
+
+    One client is reused per process so the HTTP connection pool is shared
+    between the extractor and the agents. Retries are handled by
+    create_chat_completion so they can be counted.
+    """
+    global _client
+    if _client is None:
+        _client = OpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.llm_base_url,
+            max_retries=0,
+            timeout=settings.llm_request_timeout,
+        )
+        if settings.llm_base_url:
+            logger.info(f"LLM client using base URL {settings.llm_base_url}")
+    return _client
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Honour Retry-After (capped at settings.llm_max_retry_after_seconds), else exponential backoff with jitter"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(max(0.0, float(retry_after)), settings.llm_max_retry_after_seconds)
+            except ValueError:
+                pass
+    return min(8.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random())
+
+
+def create_chat_completion(component: str, **kwargs):
+    """Chat completion with retries and per-call telemetry (latency, tokens, cost)"""
+    client = get_llm_client()
+    model = kwargs.get("model", settings.llm_model)
+    retries = 0
+    start = time.perf_counter()
+    while True:
+        try:
+            response = client.chat.completions.create(**kwargs)
+            break
+        except RETRYABLE_ERRORS as e:
+            if retries >= settings.llm_max_retries:
+                telemetry.record_call(component, model, time.perf_counter() - start,
+                                      retries=retries, error=type(e).__name__)
+                raise
+            retries += 1
+            delay = _retry_delay(e, retries)
+            logger.warning(f"{component}: {type(e).__name__}, retry {retries} in {delay:.1f}s")
+            time.sleep(delay)
+        except Exception as e:
+            telemetry.record_call(component, model, time.perf_counter() - start,
+                                  retries=retries, error=type(e).__name__)
+            raise
+
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None) if usage else None
+    telemetry.record_call(
+        component,
+        model,
+        time.perf_counter() - start,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+        retries=retries,
+    )
+    return response
@@ -1,8 +1,13 @@
+import asyncio
+import hashlib
 import json
 import re
-from typing import List, Dict, Optional
-from openai import OpenAI
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
 from app.config import settings
+from app.services.llm_client import create_chat_completion
+from app.models import Organization, Contact, Program, Source, ExtractionProvenance
 from app.schemas import ExtractedOrganization, ExtractedContact, ExtractedProgram
 import logging
 
@@ -14,9 +19,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever create_extraction_prompt changes so incremental extraction
+# re-runs every source against the new prompt.
+PROMPT_VERSION = "v1"
+
 class WildfireLLMExtractor:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
         self.model = settings.llm_model
         
     def extract_emails_and_phones(self, text: str) -> List[Dict]:
@@ -99,7 +107,11 @@ Output only valid JSON:
         try:
             prompt = self.create_extraction_prompt(url, text)
             
-            response = self.client.chat.completions.create(
+            # Run the blocking SDK call off the event loop so concurrent
+            # extractions actually overlap
+            response = await asyncio.to_thread(
+                create_chat_completion,
+                "extractor",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a precise data extraction specialist. Output only valid JSON."},
@@ -140,7 +152,7 @@ Output only valid JSON:
             )
             
             # Add extracted contacts
-            org.contacts = self.extract_emails_and_phones(text)
+            org.contacts = [ExtractedContact(**contact) for contact in self.extract_emails_and_phones(text)]
             
             return org
             
@@ -183,6 +195,119 @@ Output only valid JSON:
             logger.warning(f"Failed to extract valid organization data from {url}")
             return None
 
+def source_content_hash(source: Source) -> str:
+    """Content hash of a source, computed from the text if the crawler didn't store one"""
+    if source.content_sha256:
+        return source.content_sha256
+    return hashlib.sha256((source.content_text or "").encode()).hexdigest()
+
+def backfill_content_hashes(db: Session, batch_size: int = 500) -> int:
+    """Store source_content_hash on sources the crawler saved without one, so hashes compare in SQL"""
+    filled = 0
+    while True:
+        batch = db.query(Source).filter(
+            Source.content_text.isnot(None), Source.content_sha256.is_(None)
+        ).limit(batch_size).all()
+        if not batch:
+            return filled
+        for source in batch:
+            source.content_sha256 = source_content_hash(source)
+        db.commit()
+        filled += len(batch)
+
+def _current_extraction_join():
+    """ON clause matching a source to a successful extraction of its current content and prompt"""
+    return and_(
+        ExtractionProvenance.source_id == Source.source_id,
+        ExtractionProvenance.content_sha256 == Source.content_sha256,
+        ExtractionProvenance.prompt_version == PROMPT_VERSION,
+        ExtractionProvenance.success.is_(True),
+    )
+
+def count_unchanged_sources(db: Session) -> int:
+    """Sources whose last extraction is current (skipped without an LLM call).
+
+    Counts every such source in the table; no limit applies, since a limit
+    only caps how many changed sources one run extracts.
+    """
+    return db.query(Source).join(ExtractionProvenance, _current_extraction_join()).filter(
+        Source.content_text.isnot(None)
+    ).count()
+
+def partition_sources_for_extraction(db: Session, force: bool = False,
+                                     limit: Optional[int] = None) -> Tuple[List[Source], int]:
+    """(up to `limit` sources to extract, number of all sources skipped because their extraction is current)"""
+    if force:
+        return select_sources_for_extraction(db, force=True, limit=limit), 0
+    selected = select_sources_for_extraction(db, limit=limit)
+    return selected, count_unchanged_sources(db)
+
+def select_sources_for_extraction(db: Session, force: bool = False, limit: Optional[int] = None) -> List[Source]:
+    """Sources whose content hash or prompt version differs from their last extraction.
+
+    The changed/unchanged filter is an anti-join in SQL, applied before
+    the limit, so every batch of `limit` sources is all work to do.
+    """
+    query = db.query(Source).filter(Source.content_text.isnot(None))
+    if not force:
+        backfill_content_hashes(db)
+        query = query.outerjoin(ExtractionProvenance, _current_extraction_join()).filter(
+            ExtractionProvenance.source_id.is_(None)
+        )
+    if limit:
+        query = query.order_by(Source.fetched_at, Source.source_id).limit(limit)
+    return query.all()
+
+def save_extraction(db: Session, source: Source, extracted: Optional[ExtractedOrganization], model: str):
+    """Write extracted organization data for a source and stamp its provenance"""
+    if extracted:
+        org = db.query(Organization).filter(Organization.org_id == source.org_id).first()
+        if not org:
+            org = Organization(org_id=source.org_id, name=extracted.name, sector=extracted.sector, country=extracted.country)
+            db.add(org)
+        
+        org.name = extracted.name
+        org.sector = extracted.sector
+        org.country = extracted.country
+        org.role = extracted.role or org.role
+        org.region_state = extracted.region_state or org.region_state
+        org.website = extracted.website or org.website or source.url
+        org.notes = extracted.notes or org.notes
+        
+        # Replace whatever this source contributed last time
+        db.query(Program).filter(Program.org_id == source.org_id, Program.source_url == source.url).delete()
+        db.query(Contact).filter(Contact.org_id == source.org_id, Contact.source_url == source.url).delete()
+        
+        for program in extracted.programs:
+            db.add(Program(
+                org_id=source.org_id,
+                name=program.name,
+                url=program.url,
+                description=program.description,
+                source_url=source.url
+            ))
+        for contact in extracted.contacts:
+            db.add(Contact(
+                org_id=source.org_id,
+                name=contact.name,
+                title=contact.title,
+                channel_type=contact.channel_type,
+                value=contact.value,
+                verified_bool=contact.verified_bool,
+                source_url=source.url
+            ))
+    
+    provenance = source.extraction
+    if not provenance:
+        provenance = ExtractionProvenance(source_id=source.source_id)
+        db.add(provenance)
+    provenance.org_id = source.org_id
+    provenance.content_sha256 = source_content_hash(source)
+    provenance.prompt_version = PROMPT_VERSION
+    provenance.model = model
+    provenance.success = extracted is not None
+    provenance.extracted_at = func.now()
+
 # Utility function for standalone extraction
 async def extract_from_source(source_id: str, url: str, text: str) -> Optional[ExtractedOrganization]:
     """Extract organization data from a single source"""
@@ -0,0 +1,200 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2000, 5000, 10000, 30000, 60000]
+TOKEN_BUCKETS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+
+
+class Histogram:
+    """Fixed-bucket histogram with a bounded sample window for percentiles"""
+
+    def __init__(self, buckets: List[float], window: int = 10000):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self) -> Dict:
+        labels = [f"<={b:g}" for b in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class _ComponentStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.prompt_cache_hits = 0
+        self.skipped_calls = 0
+        self.cost_usd = 0.0
+        self.error_types: Dict[str, int] = {}
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.prompt_token_hist = Histogram(TOKEN_BUCKETS)
+        self.completion_token_hist = Histogram(TOKEN_BUCKETS)
+
+
+class LLMTelemetry:
+    """Thread-safe in-process aggregation of per-call LLM metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, _ComponentStats] = {}
+
+    def _stats(self, component: str) -> _ComponentStats:
+        if component not in self._components:
+            self._components[component] = _ComponentStats()
+        return self._components[component]
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        """Estimated USD cost from the per-million-token prices in settings"""
+        pricing = settings.llm_pricing.get(model)
+        if not pricing:
+            return 0.0
+        uncached = max(0, prompt_tokens - cached_tokens)
+        cached_price = pricing.get("cached_input", pricing["input"])
+        return (uncached * pricing["input"] + cached_tokens * cached_price
+                + completion_tokens * pricing["output"]) / 1_000_000
+
+    def record_call(self, component: str, model: str, latency_s: float, prompt_tokens: int = 0,
+                    completion_tokens: int = 0, cached_tokens: int = 0, retries: int = 0,
+                    error: Optional[str] = None):
+        """Record one LLM call (including its retries)"""
+        cost = self.estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+        with self._lock:
+            stats = self._stats(component)
+            stats.calls += 1
+            stats.retries += retries
+            stats.latency_ms.observe(latency_s * 1000.0)
+            if error:
+                stats.errors += 1
+                stats.error_types[error] = stats.error_types.get(error, 0) + 1
+                return
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cached_prompt_tokens += cached_tokens
+            if cached_tokens:
+                stats.prompt_cache_hits += 1
+            stats.cost_usd += cost
+            stats.prompt_token_hist.observe(prompt_tokens)
+            stats.completion_token_hist.observe(completion_tokens)
+
+    def record_cache_hit(self, component: str, count: int = 1):
+        """Record LLM calls avoided because a cached result was still valid"""
+        with self._lock:
+            self._stats(component).skipped_calls += count
+
+    def summary(self) -> Dict:
+        with self._lock:
+            components = {}
+            for name, stats in self._components.items():
+                lookups = stats.calls + stats.skipped_calls
+                components[name] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "error_types": dict(stats.error_types),
+                    "retries": stats.retries,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                    "estimated_cost_usd": round(stats.cost_usd, 6),
+                    "cache": {
+                        "skipped_calls": stats.skipped_calls,
+                        "hit_rate": round(stats.skipped_calls / lookups, 4) if lookups else None,
+                        "prompt_cache_hits": stats.prompt_cache_hits,
+                        "cached_prompt_tokens": stats.cached_prompt_tokens,
+                    },
+                    "latency_ms": stats.latency_ms.to_dict(),
+                    "prompt_tokens_hist": stats.prompt_token_hist.to_dict(),
+                    "completion_tokens_hist": stats.completion_token_hist.to_dict(),
+                }
+            return {
+                "components": components,
+                "total_calls": sum(c["calls"] for c in components.values()),
+                "total_cost_usd": round(sum(c["estimated_cost_usd"] for c in components.values()), 6),
+            }
+
+    def format_summary(self) -> str:
+        """One line per component, for logging at the end of a run"""
+        lines = []
+        for name, c in self.summary()["components"].items():
+            latency = c["latency_ms"]
+            lines.append(
+                f"{name}: calls={c['calls']} errors={c['errors']} retries={c['retries']} "
+                f"skipped={c['cache']['skipped_calls']} "
+                f"latency_ms p50={latency['p50']} p95={latency['p95']} "
+                f"tokens={c['prompt_tokens']}+{c['completion_tokens']} "
+                f"cost=${c['estimated_cost_usd']:.4f}"
+            )
+        return "\n".join(lines) if lines else "no LLM calls recorded"
+
+    def reset(self):
+        with self._lock:
+            self._components = {}
+
+    def save_snapshot(self, name: str, directory: Optional[str] = None) -> str:
+        """Write this process's summary to <directory>/<name>.json (replacing the previous run's)"""
+        directory = directory or settings.llm_telemetry_dir
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"name": name, "pid": os.getpid(), "saved_at": time.time(), "summary": self.summary()}, f)
+        os.replace(tmp_path, path)
+        return path
+
+
+def load_snapshots(directory: Optional[str] = None) -> Dict[str, Dict]:
+    """Summaries saved by other processes (workers, agents), keyed by name"""
+    snapshots = {}
+    for path in sorted(glob.glob(os.path.join(directory or settings.llm_telemetry_dir, "*.json"))):
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+            snapshots[snapshot["name"]] = snapshot
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read telemetry snapshot {path}: {e}")
+    return snapshots
+
+
+def clear_snapshots(directory: Optional[str] = None) -> int:
+    paths = glob.glob(os.path.join(directory or settings.llm_telemetry_dir, "*.json"))
+    for path in paths:
+        os.remove(path)
+    return len(paths)
+
+
+telemetry = LLMTelemetry()
@@ -0,0 +1,225 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import bindparam
+from app.config import settings
+from app.models import LeadScoring
+from app.services.scoring_engine import WRITE_BATCH_SIZE, ScoringInputs, load_scoring_inputs
+from app.services.stats_summary import refresh_stats_summary
+import logging
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_FEATURES = [
+    "exposure", "exposure_missing", "program_weight", "program_count", "contact_count",
+    "has_verified_contact", "keyword_hits",
+]
+LABELS = {"approved": 1.0, "rejected": 0.0}
+UNKNOWN = "__other__"
+
+
+def build_features(inputs: ScoringInputs, sectors: List[str], countries: List[str]) -> np.ndarray:
+    """Float32 feature matrix (one row per org): numeric columns, then one-hot sector and country.
+
+    Sectors/countries outside the training vocabulary fall into an
+    "other" column so the matrix shape always matches the model.
+    """
+    n = len(inputs)
+    exposure = inputs.exposure
+    numeric = np.column_stack([
+        np.nan_to_num(exposure, nan=0.0) / 100.0,
+        np.isnan(exposure),
+        inputs.program_weight,
+        np.log1p(inputs.program_count),
+        np.log1p(inputs.contact_count),
+        inputs.has_verified_contact,
+        np.log1p(inputs.keyword_hits),
+    ]) if n else np.zeros((0, len(NUMERIC_FEATURES)))
+
+    def _one_hot(values: np.ndarray, vocabulary: List[str]) -> np.ndarray:
+        lookup = {value: i for i, value in enumerate(vocabulary)}
+        other = len(vocabulary)
+        columns = np.array([lookup.get(value, other) for value in values], dtype=np.int64)
+        encoded = np.zeros((n, len(vocabulary) + 1), dtype=np.float32)
+        encoded[np.arange(n), columns] = 1.0
+        return encoded
+
+    return np.hstack([
+        numeric.astype(np.float32),
+        _one_hot(inputs.sectors, sectors),
+        _one_hot(inputs.countries, countries),
+    ])
+
+
+class PropensityModel:
+    """Logistic regression over standardised org features; scores are 0-100"""
+
+    def __init__(self, weights: np.ndarray, bias: float, mean: np.ndarray, std: np.ndarray,
+                 sectors: List[str], countries: List[str], metadata: Optional[Dict] = None):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+        self.sectors = list(sectors)
+        self.countries = list(countries)
+        self.metadata = metadata or {}
+
+    @property
+    def feature_names(self) -> List[str]:
+        return (NUMERIC_FEATURES + [f"sector={s}" for s in self.sectors + [UNKNOWN]]
+                + [f"country={c}" for c in self.countries + [UNKNOWN]])
+
+    def features(self, inputs: ScoringInputs) -> np.ndarray:
+        return build_features(inputs, self.sectors, self.countries)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Approval probability * 100 for every row, in one matrix-vector product"""
+        logits = ((features - self.mean) / self.std) @ self.weights + self.bias
+        return 100.0 / (1.0 + np.exp(-np.clip(logits, -30, 30)))
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            weights=self.weights, bias=np.float32(self.bias), mean=self.mean, std=self.std,
+            sectors=np.array(self.sectors, dtype=str), countries=np.array(self.countries, dtype=str),
+            metadata_keys=np.array(list(self.metadata.keys()), dtype=str),
+            metadata_values=np.array([float(v) for v in self.metadata.values()], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PropensityModel":
+        with np.load(path, allow_pickle=False) as artifact:
+            return cls(
+                weights=artifact["weights"], bias=float(artifact["bias"]),
+                mean=artifact["mean"], std=artifact["std"],
+                sectors=artifact["sectors"].tolist(), countries=artifact["countries"].tolist(),
+                metadata=dict(zip(artifact["metadata_keys"].tolist(), artifact["metadata_values"].tolist())),
+            )
+
+
+def load_training_data(db) -> Tuple[ScoringInputs, np.ndarray]:
+    """Scoring inputs and 0/1 labels for every org a reviewer approved or rejected"""
+    reviewed = db.query(LeadScoring.org_id, LeadScoring.reviewer_status).filter(
+        LeadScoring.reviewer_status.in_(list(LABELS))
+    ).all()
+    status = {row.org_id: row.reviewer_status for row in reviewed}
+    inputs = load_scoring_inputs(db, list(status))
+    labels = np.array([LABELS[status[org_id]] for org_id in inputs.org_ids], dtype=np.float32)
+    return inputs, labels
+
+
+def fit_logistic_regression(features: np.ndarray, labels: np.ndarray, l2: float = 1.0, epochs: int = 500,
+                            learning_rate: float = 0.5) -> Tuple[np.ndarray, float]:
+    """Full-batch gradient descent with L2 on standardised features"""
+    n, k = features.shape
+    weights = np.zeros(k, dtype=np.float64)
+    bias = float(np.log((labels.mean() + 1e-6) / (1 - labels.mean() + 1e-6)))
+    for _ in range(epochs):
+        probs = 1.0 / (1.0 + np.exp(-np.clip(features @ weights + bias, -30, 30)))
+        error = probs - labels
+        weights -= learning_rate * (features.T @ error / n + l2 * weights / n)
+        bias -= learning_rate * float(error.mean())
+    return weights, bias
+
+
+def train_propensity_model(db, l2: float = 1.0, epochs: int = 500) -> PropensityModel:
+    """Train on reviewer approve/reject decisions; raises ValueError if there are too few labels"""
+    inputs, labels = load_training_data(db)
+    if len(labels) < settings.propensity_model_min_labels:
+        raise ValueError(f"Only {len(labels)} reviewed leads, need {settings.propensity_model_min_labels}")
+    if labels.min() == labels.max():
+        raise ValueError("Reviewed leads are all approved or all rejected")
+
+    sectors = sorted({s for s in inputs.sectors if s})
+    countries = sorted({c for c in inputs.countries if c})
+    features = build_features(inputs, sectors, countries).astype(np.float64)
+    mean = features.mean(axis=0)
+    std = features.std(axis=0)
+    std[std == 0] = 1.0
+    weights, bias = fit_logistic_regression((features - mean) / std, labels, l2=l2, epochs=epochs)
+
+    model = PropensityModel(weights, bias, mean, std, sectors, countries)
+    probs = model.predict(features.astype(np.float32)) / 100.0
+    model.metadata = {
+        "trained_at": time.time(),
+        "samples": float(len(labels)),
+        "positive_rate": float(labels.mean()),
+        "accuracy": float(((probs >= 0.5) == (labels == 1)).mean()),
+        "log_loss": float(-np.mean(labels * np.log(probs + 1e-9) + (1 - labels) * np.log(1 - probs + 1e-9))),
+    }
+    logger.info(f"Trained propensity model on {len(labels)} reviewed leads: {model.metadata}")
+    return model
+
+
+_model: Optional[PropensityModel] = None
+_model_mtime: Optional[float] = None
+_model_lock = threading.Lock()
+
+
+def get_propensity_model() -> Optional[PropensityModel]:
+    """Process-wide model loaded once from settings.propensity_model_path (reloaded if the file changes)"""
+    global _model, _model_mtime
+    path = settings.propensity_model_path
+    if not settings.propensity_model_enabled or not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    with _model_lock:
+        if _model is None or _model_mtime != mtime:
+            try:
+                _model = PropensityModel.load(path)
+                _model_mtime = mtime
+                logger.info(f"Loaded propensity model from {path}")
+            except Exception as e:
+                logger.warning(f"Could not load propensity model: {e}")
+                return None
+        return _model
+
+
+def predict_model_scores(inputs: ScoringInputs, model: Optional[PropensityModel] = None
+                         ) -> Tuple[Optional[np.ndarray], Dict[str, float]]:
+    """Model scores for every org in inputs plus feature-build/inference timings (ms); None without a model"""
+    model = model or get_propensity_model()
+    if model is None:
+        return None, {}
+    started = time.perf_counter()
+    features = model.features(inputs)
+    built = time.perf_counter()
+    scores = model.predict(features)
+    done = time.perf_counter()
+    timings = {
+        "organizations": len(inputs),
+        "feature_ms": round((built - started) * 1000, 2),
+        "inference_ms": round((done - built) * 1000, 2),
+    }
+    logger.info(f"Propensity model inference: {timings}")
+    return scores, timings
+
+
+def score_all_with_model(db, model: Optional[PropensityModel] = None) -> Dict[str, float]:
+    """Model-score every org that has a lead score in one vectorized pass, leaving rule scores alone"""
+    model = model or get_propensity_model()
+    if model is None:
+        raise ValueError("No propensity model available")
+    started = time.perf_counter()
+    inputs = load_scoring_inputs(db)
+    loaded = time.perf_counter()
+    scores, timings = predict_model_scores(inputs, model)
+    predicted = time.perf_counter()
+
+    table = LeadScoring.__table__
+    rows = [{"b_org_id": org_id, "b_model_score": float(score)} for org_id, score in zip(inputs.org_ids, scores)]
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        db.execute(
+            table.update().where(table.c.org_id == bindparam("b_org_id")).values(
+                model_score=bindparam("b_model_score")
+            ),
+            rows[start:start + WRITE_BATCH_SIZE],
+        )
+    db.commit()
+    refresh_stats_summary(db)
+    timings["load_ms"] = round((loaded - started) * 1000, 2)
+    timings["write_ms"] = round((time.perf_counter() - predicted) * 1000, 2)
+    return timings
@@ -0,0 +1,112 @@
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from app.config import settings
+from app.services.rasters import open_risk_raster, points_to_pixels, raster_memory_usage, sample_pixels, weighted_exposure
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LayerSpec:
+    def __init__(self, name: str, path: Optional[str], weight: float = 0.0):
+        self.name = name
+        self.path = path
+        self.weight = weight
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.path) and os.path.exists(self.path)
+
+    def __repr__(self):
+        return f"LayerSpec({self.name!r}, {self.path!r}, weight={self.weight})"
+
+
+class RasterRegistry:
+    """Named risk layers, each opened on first use and sampled as one stack.
+
+    Layers on the same grid share one lon/lat -> pixel conversion, and each
+    layer is read with block-grouped batch sampling, so an extra layer
+    costs one more pass over already-computed pixel indices rather than
+    extra per-org reads.
+    """
+
+    def __init__(self, specs: List[LayerSpec]):
+        self.specs: Dict[str, LayerSpec] = {spec.name: spec for spec in specs}
+        self._rasters: Dict[str, object] = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "RasterRegistry":
+        return cls([
+            LayerSpec(name, layer.get("path"), float(layer.get("weight") or 0.0))
+            for name, layer in settings.risk_layers.items()
+        ])
+
+    def available(self) -> List[str]:
+        """Layers with a raster file present (opened or not)"""
+        return [name for name, spec in self.specs.items() if spec.configured and name not in self._failed]
+
+    def weighted(self) -> Dict[str, float]:
+        """Every layer configured to feed exposure, with its weight (available or not)"""
+        return {name: spec.weight for name, spec in self.specs.items() if spec.weight > 0}
+
+    def get(self, name: str):
+        """Open handle for a layer, opening it on first use; None if unavailable"""
+        raster = self._rasters.get(name)
+        if raster is not None:
+            return raster
+        spec = self.specs.get(name)
+        if spec is None or not spec.configured or name in self._failed:
+            return None
+        with self._lock:
+            if name not in self._rasters:
+                try:
+                    self._rasters[name] = open_risk_raster(spec.path)
+                    logger.info(f"Loaded {name} risk raster from {spec.path}")
+                except Exception as e:
+                    logger.warning(f"Could not load {name} raster: {e}")
+                    self._failed.add(name)
+                    return None
+            return self._rasters[name]
+
+    def sample_stack(self, lats, lons, names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """{layer: values} for many points in one batched pass (NaN where missing)"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        pixels = {}
+        values = {}
+        for name in names or self.available():
+            raster = self.get(name)
+            if raster is None:
+                values[name] = np.full(lats.shape, np.nan)
+                continue
+            grid = tuple(raster.transform)[:6]
+            if grid not in pixels:
+                pixels[grid] = points_to_pixels(raster.transform, lats, lons)
+            try:
+                values[name] = sample_pixels(raster, *pixels[grid])
+            except Exception as e:
+                logger.warning(f"Error sampling {name} raster: {e}")
+                values[name] = np.full(lats.shape, np.nan)
+        return values
+
+    def combine_exposure(self, values: Dict[str, np.ndarray], count: int) -> np.ndarray:
+        """0-100 exposure from the weighted layers (rasters.weighted_exposure); NaN if any of them is unavailable"""
+        weights = self.weighted()
+        if not weights:
+            return np.full(count, np.nan)
+        missing = np.full(count, np.nan)
+        return weighted_exposure({name: values.get(name, missing) for name in weights}, weights)
+
+    def memory_report(self) -> Dict[str, Dict]:
+        """Memory per layer; layers not opened yet are listed with mode None"""
+        return {name: raster_memory_usage(self._rasters.get(name)) for name in self.available()}
+
+    def close(self):
+        with self._lock:
+            for raster in self._rasters.values():
+                raster.close()
+            self._rasters = {}
@@ -0,0 +1,431 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+import logging
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.windows import Window
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONVERT_STRIP_BYTES = 64 * 1024 * 1024
+KM_PER_DEGREE = 111.32
+ZONAL_GATHER_CELLS = 1 << 22  # disk pixels gathered per batch of points (~32MB float64)
+
+
+class ArrayRaster:
+    """Read-only NumPy-backed raster (in RAM or memory-mapped).
+
+    Exposes the part of the rasterio dataset API the geospatial service
+    uses (transform, index, read, nodata, block_shapes) so it can stand in
+    for an open dataset. The array is never written, so pages are shared
+    between worker processes: memory-mapped files through the OS page
+    cache, in-RAM arrays through copy-on-write when loaded before forking.
+    """
+
+    def __init__(self, array: np.ndarray, transform, nodata, name: str, mode: str,
+                 tags: Optional[Dict[str, str]] = None, crs=None):
+        if array.flags.writeable:
+            array.setflags(write=False)
+        self.array = array
+        self.transform = transform
+        self.crs = crs
+        self.nodata = nodata
+        self.name = name
+        self.mode = mode
+        self.height, self.width = array.shape
+        self.block_shapes = [(self.height, self.width)]
+        self._tags = dict(tags or {})
+
+    def tags(self) -> Dict[str, str]:
+        return dict(self._tags)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.array.nbytes)
+
+    def index(self, x: float, y: float) -> Tuple[int, int]:
+        rows, cols = points_to_pixels(self.transform, [y], [x])
+        return int(rows[0]), int(cols[0])
+
+    def read(self, band: int = 1, window=None) -> np.ndarray:
+        if window is None:
+            return self.array
+        if isinstance(window, Window):
+            (row_start, row_stop), (col_start, col_stop) = window.toranges()
+        else:
+            (row_start, row_stop), (col_start, col_stop) = window
+        if row_start < 0 or col_start < 0 or row_start >= self.height or col_start >= self.width:
+            return np.empty((0, 0), dtype=self.array.dtype)
+        return self.array[row_start:row_stop, col_start:col_stop]
+
+    def close(self):
+        pass
+
+
+def _mmap_paths(path: str) -> Tuple[str, str]:
+    base = os.path.join(settings.raster_cache_dir, os.path.basename(path))
+    return f"{base}.npy", f"{base}.json"
+
+
+def convert_to_npy(path: str) -> str:
+    """Write an uncompressed .npy copy of band 1 (plus georeferencing sidecar) in bounded-memory strips"""
+    npy_path, meta_path = _mmap_paths(path)
+    os.makedirs(os.path.dirname(npy_path) or ".", exist_ok=True)
+    tmp_path = f"{npy_path}.tmp"
+
+    with rasterio.open(path) as src:
+        dtype = np.dtype(src.dtypes[0])
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(src.height, src.width))
+        strip_rows = max(1, CONVERT_STRIP_BYTES // max(1, src.width * dtype.itemsize))
+        for row_off in range(0, src.height, strip_rows):
+            rows = min(strip_rows, src.height - row_off)
+            out[row_off:row_off + rows] = src.read(1, window=Window(0, row_off, src.width, rows))
+        out.flush()
+        del out
+        meta = {
+            "transform": list(src.transform)[:6],
+            "crs": src.crs.to_string() if src.crs else None,
+            "nodata": src.nodata,
+            "tags": src.tags(),
+            "source_size": os.path.getsize(path),
+            "source_mtime": os.path.getmtime(path),
+        }
+
+    os.replace(tmp_path, npy_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    logger.info(f"Converted {path} to memory-mappable copy {npy_path}")
+    return npy_path
+
+
+def _load_mmap(path: str) -> ArrayRaster:
+    npy_path, meta_path = _mmap_paths(path)
+    meta = None
+    if os.path.exists(npy_path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("source_size") != os.path.getsize(path) or meta.get("source_mtime") != os.path.getmtime(path):
+            meta = None  # stale copy
+    if meta is None:
+        convert_to_npy(path)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    array = np.load(npy_path, mmap_mode="r")
+    crs = CRS.from_string(meta["crs"]) if meta.get("crs") else None
+    return ArrayRaster(array, Affine(*meta["transform"]), meta["nodata"], os.path.basename(path), "mmap",
+                       tags=meta.get("tags"), crs=crs)
+
+
+def open_risk_raster(path: str, mode: Optional[str] = None):
+    """Open a risk raster as a windowed rasterio dataset, an in-RAM array or a memory-mapped array.
+
+    Rasters bigger than raster_max_memory_mb fall back to windowed reads in
+    "memory" mode.
+    """
+    mode = mode or settings.raster_load_mode
+    if mode == "mmap":
+        return _load_mmap(path)
+
+    dataset = rasterio.open(path)
+    if mode != "memory":
+        return dataset
+
+    size = dataset.height * dataset.width * np.dtype(dataset.dtypes[0]).itemsize
+    if size > settings.raster_max_memory_mb * 1024 * 1024:
+        logger.warning(f"{path} needs {size / 1e6:.0f} MB, above raster_max_memory_mb; using windowed reads")
+        return dataset
+
+    array = dataset.read(1)
+    raster = ArrayRaster(array, dataset.transform, dataset.nodata, os.path.basename(path), "memory",
+                         tags=dataset.tags(), crs=dataset.crs)
+    dataset.close()
+    return raster
+
+
+def raster_memory_usage(raster) -> Dict:
+    """Access mode and bytes held for a raster handle"""
+    if raster is None:
+        return {"mode": None, "bytes": 0}
+    if isinstance(raster, ArrayRaster):
+        return {"mode": raster.mode, "bytes": raster.nbytes, "shape": [raster.height, raster.width]}
+    return {"mode": "windowed", "bytes": 0, "shape": [raster.height, raster.width]}
+
+
+def points_to_pixels(transform, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized lon/lat -> row/col using the inverse affine transform (same flooring as raster.index)"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    cols_f, rows_f = ~transform * (lons, lats)
+    with np.errstate(invalid="ignore"):
+        rows = np.floor(rows_f)
+        cols = np.floor(cols_f)
+    # NaN coordinates become -1 so the bounds check below drops them
+    rows = np.where(np.isfinite(rows), rows, -1).astype(np.int64)
+    cols = np.where(np.isfinite(cols), cols, -1).astype(np.int64)
+    return rows, cols
+
+
+def sample_points(raster, lats, lons, band: int = 1) -> np.ndarray:
+    """Sample a raster at many points, reading each needed block once.
+
+    Points are grouped by the raster's internal block (tile/strip) so every
+    block is decoded a single time, then values are gathered with NumPy
+    fancy indexing. Points outside the raster or on nodata come back as NaN.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    if raster is None or lats.size == 0:
+        return np.full(lats.shape, np.nan, dtype=np.float64)
+    rows, cols = points_to_pixels(raster.transform, lats, lons)
+    return sample_pixels(raster, rows, cols, band)
+
+
+def sample_pixels(raster, rows: np.ndarray, cols: np.ndarray, band: int = 1) -> np.ndarray:
+    """sample_points for precomputed pixel coordinates (shared by layers on the same grid)"""
+    values = np.full(rows.shape, np.nan, dtype=np.float64)
+    if raster is None or rows.size == 0:
+        return values
+
+    inside = np.flatnonzero((rows >= 0) & (rows < raster.height) & (cols >= 0) & (cols < raster.width))
+    if inside.size == 0:
+        return values
+
+    nodata = raster.nodata
+    if isinstance(raster, ArrayRaster):
+        # Whole layer is addressable: pure fancy indexing, no I/O
+        sampled = raster.array[rows[inside], cols[inside]].astype(np.float64)
+        if nodata is not None:
+            sampled[sampled == nodata] = np.nan
+        values[inside] = sampled
+        return values
+
+    block_h, block_w = raster.block_shapes[band - 1]
+    n_block_cols = (raster.width + block_w - 1) // block_w
+    block_ids = (rows[inside] // block_h) * n_block_cols + (cols[inside] // block_w)
+
+    unique_blocks, inverse = np.unique(block_ids, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    groups = np.split(inside[order], np.cumsum(np.bincount(inverse))[:-1])
+
+    for block_id, members in zip(unique_blocks, groups):
+        row_off = int(block_id // n_block_cols) * block_h
+        col_off = int(block_id % n_block_cols) * block_w
+        window = Window(col_off, row_off,
+                        min(block_w, raster.width - col_off),
+                        min(block_h, raster.height - row_off))
+        block = raster.read(band, window=window)
+        sampled = block[rows[members] - row_off, cols[members] - col_off].astype(np.float64)
+        if nodata is not None:
+            sampled[sampled == nodata] = np.nan
+        values[members] = sampled
+
+    logger.debug(f"Sampled {inside.size} points from {len(unique_blocks)} blocks")
+    return values
+
+
+def _pixel_size_km(raster, lats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pixel width/height in km at each latitude (projected CRSs are assumed to be in metres)"""
+    a, e = abs(raster.transform.a), abs(raster.transform.e)
+    crs = getattr(raster, "crs", None)
+    if crs is not None and crs.is_projected:
+        return np.full(lats.shape, a / 1000.0), np.full(lats.shape, e / 1000.0)
+    return a * KM_PER_DEGREE * np.cos(np.radians(lats)), np.full(lats.shape, e * KM_PER_DEGREE)
+
+
+def _disk_offsets(radius_km: float, px_w: float, px_h: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Row/col offsets of the pixels within radius_km of a centre pixel, and their squared distances"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rx = int(np.nan_to_num(np.ceil(radius_km / px_w), nan=0, posinf=0))
+        ry = int(np.nan_to_num(np.ceil(radius_km / px_h), nan=0, posinf=0))
+    dr, dc = np.mgrid[-ry:ry + 1, -rx:rx + 1]
+    dist2 = (dr * px_h) ** 2 + (dc * px_w) ** 2
+    inside = dist2 <= radius_km * radius_km
+    return dr[inside], dc[inside], dist2[inside]
+
+
+def zonal_stats(raster, lats, lons, buffers_km, percentile: float = 90.0, tile: int = 512,
+                band: int = 1) -> Dict[float, Dict[str, np.ndarray]]:
+    """Mean, max and percentile of the pixels within each buffer around many points.
+
+    Points are grouped by tile (tile x tile pixels around their location);
+    each group reads the window covering all its buffers once, builds one
+    disk mask for the largest buffer (pixel size taken at the group's mean
+    latitude; smaller buffers are subsets of it) and gathers every point's
+    disk from the window in a single fancy-indexing pass. Result is
+    {buffer_km: {"mean": arr, "max": arr, "p90": arr}}, NaN where a buffer
+    has no valid pixels.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    pct_key = f"p{percentile:g}"
+    out = {b: {stat: np.full(lats.shape, np.nan) for stat in ("mean", "max", pct_key)} for b in buffers_km}
+    if raster is None or lats.size == 0 or not buffers_km:
+        return out
+
+    rows, cols = points_to_pixels(raster.transform, lats, lons)
+    px_w, px_h = _pixel_size_km(raster, lats)
+    largest = max(buffers_km)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rx = np.nan_to_num(np.ceil(largest / px_w), nan=0, posinf=0).astype(np.int64)
+        ry = np.nan_to_num(np.ceil(largest / px_h), nan=0, posinf=0).astype(np.int64)
+
+    valid = (np.isfinite(lats) & np.isfinite(lons)
+             & (rows + ry >= 0) & (rows - ry < raster.height)
+             & (cols + rx >= 0) & (cols - rx < raster.width))
+    points = np.flatnonzero(valid)
+    if points.size == 0:
+        return out
+
+    keys = np.stack([rows[points] // tile, cols[points] // tile], axis=1)
+    _, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind="stable")
+    groups = np.split(points[order], np.cumsum(np.bincount(inverse))[:-1])
+
+    nodata = raster.nodata
+    masks = {}  # one disk per pixel size: a single entry for projected rasters
+    for members in groups:
+        group_w, group_h = (float(v[0]) for v in _pixel_size_km(raster, lats[members].mean(keepdims=True)))
+        mask_key = (round(group_w, 9), round(group_h, 9))
+        if mask_key not in masks:
+            masks[mask_key] = _disk_offsets(largest, group_w, group_h)
+        dr, dc, dist2 = masks[mask_key]
+        gry, grx = int(np.abs(dr).max()), int(np.abs(dc).max())
+
+        # Window padded with NaN past the raster edge so every disk can be gathered whole
+        pr0, pr1 = int(rows[members].min()) - gry, int(rows[members].max()) + gry + 1
+        pc0, pc1 = int(cols[members].min()) - grx, int(cols[members].max()) + grx + 1
+        r0, r1 = max(0, pr0), min(raster.height, pr1)
+        c0, c1 = max(0, pc0), min(raster.width, pc1)
+        window = np.full((pr1 - pr0, pc1 - pc0), np.nan)
+        block = raster.read(band, window=Window(c0, r0, c1 - c0, r1 - r0)).astype(np.float64)
+        if nodata is not None:
+            block[block == nodata] = np.nan
+        window[r0 - pr0:r1 - pr0, c0 - pc0:c1 - pc0] = block
+
+        selections = {b: dist2 <= b * b for b in buffers_km}
+        step = max(1, ZONAL_GATHER_CELLS // max(1, dr.size))
+        for start in range(0, members.size, step):
+            chunk = members[start:start + step]
+            disks = window[(rows[chunk] - pr0)[:, None] + dr[None, :], (cols[chunk] - pc0)[:, None] + dc[None, :]]
+            for buffer_km, selected in selections.items():
+                values = disks[:, selected]
+                has_data = ~np.isnan(values).all(axis=1)
+                if not has_data.any():
+                    continue
+                values, rows_out = values[has_data], chunk[has_data]
+                stats = out[buffer_km]
+                stats["mean"][rows_out] = np.nanmean(values, axis=1)
+                stats["max"][rows_out] = np.nanmax(values, axis=1)
+                stats[pct_key][rows_out] = np.nanpercentile(values, percentile, axis=1)
+
+    logger.debug(f"Zonal stats for {points.size} points from {len(groups)} windows, {len(masks)} disk masks")
+    return out
+
+
+def tile_key(rows: np.ndarray, cols: np.ndarray, tile: int) -> List[str]:
+    """"<tile row>_<tile col>" keys for pixel coordinates"""
+    return [f"{r}_{c}" for r, c in zip((rows // tile).tolist(), (cols // tile).tolist())]
+
+
+def tile_fingerprint(raster, tile: int, band: int = 1) -> Tuple[str, Dict[str, str]]:
+    """Whole-raster checksum plus a content hash per tile x tile block"""
+    hashes = {}
+    overall = hashlib.sha256(repr((tuple(raster.transform)[:6], raster.height, raster.width)).encode())
+    for window in iter_windows(raster.height, raster.width, tile):
+        block = np.ascontiguousarray(raster.read(band, window=window))
+        digest = hashlib.blake2b(block.tobytes(), digest_size=16).hexdigest()
+        hashes[f"{int(window.row_off) // tile}_{int(window.col_off) // tile}"] = digest
+        overall.update(digest.encode())
+    return overall.hexdigest(), hashes
+
+
+def iter_windows(height: int, width: int, chunk: int):
+    """Row-major chunk windows covering a raster"""
+    for row_off in range(0, height, chunk):
+        for col_off in range(0, width, chunk):
+            yield Window(col_off, row_off, min(chunk, width - col_off), min(chunk, height - row_off))
+
+
+def weighted_exposure(values: Dict[str, np.ndarray], weights: Dict[str, float]) -> np.ndarray:
+    """0-100 exposure: weighted sum of layer values * 100, clipped, NaN where any input is NaN.
+
+    The one exposure formula for every path (precomputed raster, layer
+    stack, single org). Weights are used as configured, never rescaled.
+    """
+    exposure = sum(weight * np.asarray(values[name], dtype=np.float64) for name, weight in weights.items())
+    return np.clip(exposure * 100, 0, 100)
+
+
+def build_exposure_raster(susceptibility_path: str, ignition_path: str, output_path: str,
+                          susceptibility_weight: float, ignition_weight: float,
+                          chunk: int = 1024, cog_path: Optional[str] = None) -> Dict:
+    """Combine the two input layers into a 0-100 exposure raster in chunked, windowed passes.
+
+    Memory stays bounded by the chunk size. The output is stamped with the
+    weights used so the service can tell whether it still matches settings.
+    Both inputs must share the same grid.
+    """
+    nodata_out = -9999.0
+    with rasterio.open(susceptibility_path) as sus, rasterio.open(ignition_path) as ign:
+        if (sus.height, sus.width) != (ign.height, ign.width) or sus.transform != ign.transform:
+            raise ValueError("Susceptibility and ignition rasters must share the same grid")
+
+        profile = sus.profile.copy()
+        profile.update(driver="GTiff", dtype="float32", count=1, nodata=nodata_out,
+                       tiled=True, blockxsize=512, blockysize=512, compress="deflate")
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with rasterio.open(output_path, "w", **profile) as dst:
+            for window in iter_windows(sus.height, sus.width, chunk):
+                s = sus.read(1, window=window).astype(np.float32)
+                i = ign.read(1, window=window).astype(np.float32)
+                invalid = ~(np.isfinite(s) & np.isfinite(i))
+                if sus.nodata is not None:
+                    invalid |= s == sus.nodata
+                if ign.nodata is not None:
+                    invalid |= i == ign.nodata
+                exposure = weighted_exposure({"susceptibility": s, "ignition": i},
+                                             {"susceptibility": susceptibility_weight, "ignition": ignition_weight})
+                exposure[invalid] = nodata_out
+                dst.write(exposure.astype(np.float32), 1, window=window)
+
+            dst.update_tags(
+                susceptibility_weight=str(susceptibility_weight),
+                ignition_weight=str(ignition_weight),
+                susceptibility_source=os.path.basename(susceptibility_path),
+                ignition_source=os.path.basename(ignition_path),
+            )
+            if cog_path:
+                factors = [f for f in (2, 4, 8, 16, 32) if min(sus.height, sus.width) // f >= 256]
+                if factors:
+                    dst.build_overviews(factors, Resampling.average)
+
+    if cog_path:
+        from rasterio.shutil import copy as raster_copy
+        try:
+            raster_copy(output_path, cog_path, driver="COG", compress="deflate")
+        except Exception as e:
+            # GDAL < 3.1 has no COG driver; a tiled GTiff with copied overviews is equivalent
+            logger.warning(f"COG driver unavailable ({e}); writing tiled GeoTIFF with overviews")
+            raster_copy(output_path, cog_path, driver="GTiff", tiled=True, compress="deflate",
+                        copy_src_overviews=True)
+
+    logger.info(f"Built exposure raster {output_path} (weights {susceptibility_weight}/{ignition_weight})")
+    return {"output": output_path, "cog": cog_path,
+            "susceptibility_weight": susceptibility_weight, "ignition_weight": ignition_weight}
+
+
+def exposure_weights_match(raster, susceptibility_weight: float, ignition_weight: float) -> bool:
+    """Whether an exposure raster was built with the given weights"""
+    tags = raster.tags()
+    try:
+        return (abs(float(tags["susceptibility_weight"]) - susceptibility_weight) < 1e-9
+                and abs(float(tags["ignition_weight"]) - ignition_weight) < 1e-9)
+    except (KeyError, ValueError):
+        return False
@@ -0,0 +1,368 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import and_, bindparam, case, func
+import numpy as np
+from app.config import settings
+from app.db import bulk_upsert
+from app.models import Organization, LeadScoring, RiskOverlay, Program, Contact, OrgScoreDirty
+from app.services.keywords import get_program_matcher
+from app.services.stats_summary import refresh_stats_summary
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_SCORE = 10.0
+EXPOSURE_MULTIPLIER = 0.4
+PROGRAM_BONUS_CAP = 3  # multiples of wildfire_program_bonus
+WRITE_BATCH_SIZE = 1000
+
+
+def program_weight(name: Optional[str], description: Optional[str]) -> float:
+    """How much a program counts towards the wildfire program bonus (strongest keyword weight, 0 if none)"""
+    return get_program_matcher().max_weight(f"{name} {description or ''}")
+
+
+class ScoringConfig:
+    """Weights and thresholds used by the scoring engine"""
+
+    def __init__(self, sector_base_scores: Dict[str, float], priority_countries: List[str],
+                 wildfire_program_bonus: float, verified_email_bonus: float, priority_country_bonus: float,
+                 tier_a_threshold: float, tier_b_threshold: float):
+        self.sector_base_scores = sector_base_scores
+        self.priority_countries = priority_countries
+        self.wildfire_program_bonus = wildfire_program_bonus
+        self.verified_email_bonus = verified_email_bonus
+        self.priority_country_bonus = priority_country_bonus
+        self.tier_a_threshold = tier_a_threshold
+        self.tier_b_threshold = tier_b_threshold
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+    def with_overrides(self, **overrides) -> "ScoringConfig":
+        """Copy with the given (non-None) fields replaced; dicts (sector scores) are merged"""
+        values = self.to_dict()
+        for key, value in overrides.items():
+            if value is None:
+                continue
+            if isinstance(value, dict) and isinstance(values.get(key), dict):
+                value = {**values[key], **value}
+            values[key] = value
+        return ScoringConfig(**values)
+
+    @classmethod
+    def from_settings(cls) -> "ScoringConfig":
+        return cls(
+            sector_base_scores=dict(settings.sector_base_scores),
+            priority_countries=list(settings.priority_countries),
+            wildfire_program_bonus=settings.wildfire_program_bonus,
+            verified_email_bonus=settings.verified_email_bonus,
+            priority_country_bonus=settings.priority_country_bonus,
+            tier_a_threshold=settings.tier_a_threshold,
+            tier_b_threshold=settings.tier_b_threshold,
+        )
+
+
+class ScoringInputs:
+    """Column arrays with everything the score depends on, one row per org"""
+
+    def __init__(self, org_ids: List, names: List[str], sectors: np.ndarray, countries: np.ndarray,
+                 exposure: np.ndarray, program_weight: np.ndarray, has_verified_contact: np.ndarray,
+                 program_count: Optional[np.ndarray] = None, contact_count: Optional[np.ndarray] = None,
+                 keyword_hits: Optional[np.ndarray] = None):
+        self.org_ids = org_ids
+        self.names = names
+        self.sectors = sectors
+        self.countries = countries
+        self.exposure = exposure  # NaN where the org has no overlay / exposure
+        self.program_weight = program_weight  # sum over the org's programs
+        self.has_verified_contact = has_verified_contact
+        # Not used by the rule score; features for the propensity model
+        self.program_count = program_count if program_count is not None else np.zeros(len(org_ids))
+        self.contact_count = contact_count if contact_count is not None else np.zeros(len(org_ids))
+        self.keyword_hits = keyword_hits if keyword_hits is not None else np.zeros(len(org_ids))
+
+    def __len__(self):
+        return len(self.org_ids)
+
+
+def load_scoring_inputs(db, org_ids: Optional[Iterable] = None) -> ScoringInputs:
+    """Pull scoring columns with three set-based queries instead of per-org relationship loads"""
+    org_query = db.query(
+        Organization.org_id, Organization.name, Organization.sector, Organization.country,
+        RiskOverlay.exposure_score,
+    ).outerjoin(RiskOverlay, RiskOverlay.org_id == Organization.org_id)
+    program_query = db.query(Program.org_id, Program.name, Program.description)
+    contact_query = db.query(
+        Contact.org_id, func.count(Contact.contact_id),
+        func.sum(case((Contact.verified_bool.is_(True), 1), else_=0)),
+    ).group_by(Contact.org_id)
+
+    if org_ids is not None:
+        org_ids = list(org_ids)
+        org_query = org_query.filter(Organization.org_id.in_(org_ids))
+        program_query = program_query.filter(Program.org_id.in_(org_ids))
+        contact_query = contact_query.filter(Contact.org_id.in_(org_ids))
+
+    rows = org_query.all()
+    index = {row.org_id: i for i, row in enumerate(rows)}
+
+    matcher = get_program_matcher()
+    weights = np.zeros(len(rows), dtype=np.float64)
+    programs = np.zeros(len(rows), dtype=np.float64)
+    hits = np.zeros(len(rows), dtype=np.float64)
+    for org_id, name, description in program_query:
+        i = index.get(org_id)
+        if i is not None:
+            found = matcher.find(f"{name} {description or ''}")
+            weights[i] += max((matcher.weights[keyword] for keyword in found), default=0.0)
+            programs[i] += 1
+            hits[i] += len(found)
+
+    verified = np.zeros(len(rows), dtype=bool)
+    contacts = np.zeros(len(rows), dtype=np.float64)
+    for org_id, count, verified_count in contact_query:
+        i = index.get(org_id)
+        if i is not None:
+            contacts[i] = count
+            verified[i] = bool(verified_count)
+
+    return ScoringInputs(
+        org_ids=[row.org_id for row in rows],
+        names=[row.name for row in rows],
+        sectors=np.array([row.sector for row in rows], dtype=object),
+        countries=np.array([row.country for row in rows], dtype=object),
+        exposure=np.array([np.nan if row.exposure_score is None else row.exposure_score for row in rows],
+                          dtype=np.float64),
+        program_weight=weights,
+        has_verified_contact=verified,
+        program_count=programs,
+        contact_count=contacts,
+        keyword_hits=hits,
+    )
+
+
+def compute_scores(inputs: ScoringInputs, config: ScoringConfig) -> Dict[str, np.ndarray]:
+    """Score components, total and tier for every org, vectorized"""
+    base = np.array([float(config.sector_base_scores.get(sector, DEFAULT_BASE_SCORE)) for sector in inputs.sectors],
+                    dtype=np.float64)
+
+    # Missing or zero exposure earns no bonus (and no rationale line)
+    exposure = np.nan_to_num(inputs.exposure, nan=0.0)
+    exposure_bonus = exposure * EXPOSURE_MULTIPLIER
+
+    program_bonus = np.minimum(inputs.program_weight * float(config.wildfire_program_bonus),
+                               float(config.wildfire_program_bonus) * PROGRAM_BONUS_CAP)
+    contact_bonus = np.where(inputs.has_verified_contact, float(config.verified_email_bonus), 0.0)
+    country_bonus = np.where(np.isin(inputs.countries, config.priority_countries),
+                             float(config.priority_country_bonus), 0.0)
+
+    total = np.clip(base + exposure_bonus + program_bonus + contact_bonus + country_bonus, 0.0, 100.0)
+    tier = np.where(total >= config.tier_a_threshold, "A", np.where(total >= config.tier_b_threshold, "B", "C"))
+
+    return {
+        "base": base,
+        "exposure": exposure,
+        "exposure_bonus": exposure_bonus,
+        "program_bonus": program_bonus,
+        "contact_bonus": contact_bonus,
+        "country_bonus": country_bonus,
+        "total": total,
+        "tier": tier,
+    }
+
+
+def format_rationale(base: float, sector: str, exposure_bonus: float, program_bonus: float,
+                     contact_bonus: float, country_bonus: float) -> str:
+    """Rationale text for one org's score components (exposure line only when there was exposure)"""
+    parts = [f"Base sector score: {base} ({sector})"]
+    if exposure_bonus:
+        parts.append(f"Exposure bonus: {exposure_bonus:.1f}")
+    if program_bonus > 0:
+        parts.append(f"Wildfire program bonus: {program_bonus}")
+    if contact_bonus > 0:
+        parts.append(f"Verified contact bonus: {contact_bonus}")
+    if country_bonus > 0:
+        parts.append(f"Priority country bonus: {country_bonus}")
+    return "; ".join(parts)
+
+
+def build_rationales(inputs: ScoringInputs, components: Dict[str, np.ndarray]) -> List[str]:
+    """Human-readable rationale per org from the computed component arrays"""
+    return [
+        format_rationale(
+            components["base"][i],
+            inputs.sectors[i],
+            components["exposure_bonus"][i] if components["exposure"][i] else 0.0,
+            components["program_bonus"][i],
+            components["contact_bonus"][i],
+            components["country_bonus"][i],
+        )
+        for i in range(len(inputs))
+    ]
+
+
+def write_scores(db, inputs: ScoringInputs, components: Dict[str, np.ndarray], rationales: List[str],
+                 config_version: Optional[int] = None, model_scores: Optional[np.ndarray] = None):
+    """Bulk-upsert lead_scoring; reviewer_status/notes of existing rows are left alone"""
+    update_columns = ["propensity_score", "tier", "rationale", "config_version"]
+    rows = [
+        {
+            "org_id": org_id,
+            "propensity_score": float(components["total"][i]),
+            "tier": str(components["tier"][i]),
+            "rationale": rationales[i],
+            "reviewer_status": "pending",
+            "config_version": config_version,
+        }
+        for i, org_id in enumerate(inputs.org_ids)
+    ]
+    if model_scores is not None:
+        update_columns.append("model_score")
+        for row, score in zip(rows, model_scores):
+            row["model_score"] = float(score)
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        bulk_upsert(db, LeadScoring, rows[start:start + WRITE_BATCH_SIZE], index_elements=["org_id"],
+                    update_columns=update_columns)
+
+
+def score_organizations(db, org_ids: Optional[Iterable] = None, config: Optional[ScoringConfig] = None,
+                        commit: bool = True) -> Dict:
+    """Load, score and write lead scores for all (or the given) orgs in one transaction.
+
+    The config is stored as a ScoringConfigVersion and every score is also
+    appended to lead_scoring_history. If a propensity model is available,
+    its score is written to model_score from the same inputs.
+    """
+    from app.services.propensity_model import predict_model_scores
+    from app.services.scoring_history import get_or_create_config_version, record_history
+
+    config = config or ScoringConfig.from_settings()
+    version = get_or_create_config_version(db, config)
+    inputs = load_scoring_inputs(db, org_ids)
+    components = compute_scores(inputs, config)
+    rationales = build_rationales(inputs, components)
+    model_scores, _ = predict_model_scores(inputs)
+    write_scores(db, inputs, components, rationales, config_version=version.id, model_scores=model_scores)
+    record_history(db, inputs.org_ids, components, version.id)
+    if commit:
+        db.commit()
+        refresh_stats_summary(db)
+    invalidate_scoring_snapshot()
+
+    tiers, counts = np.unique(components["tier"], return_counts=True)
+    logger.info(f"Scored {len(inputs)} organizations: {dict(zip(tiers.tolist(), counts.tolist()))}")
+    return {org_id: True for org_id in inputs.org_ids}
+
+
+def rescore_dirty_batch(db, batch_size: Optional[int] = None, config: Optional[ScoringConfig] = None) -> int:
+    """Rescore the oldest batch of dirty orgs and clear their marks; returns how many were claimed.
+
+    A mark is only cleared if marked_at is unchanged, so orgs touched
+    again while the batch was being scored stay queued.
+    """
+    batch_size = batch_size or settings.rescoring_batch_size
+    claimed = db.query(OrgScoreDirty.org_id, OrgScoreDirty.marked_at).order_by(
+        OrgScoreDirty.marked_at
+    ).limit(batch_size).all()
+    if not claimed:
+        return 0
+
+    score_organizations(db, [row.org_id for row in claimed], config=config, commit=False)
+    table = OrgScoreDirty.__table__
+    db.execute(
+        table.delete().where(and_(table.c.org_id == bindparam("b_org_id"),
+                                  table.c.marked_at == bindparam("b_marked_at"))),
+        [{"b_org_id": row.org_id, "b_marked_at": row.marked_at} for row in claimed],
+    )
+    db.commit()
+    return len(claimed)
+
+
+# -----------------------------------------------------------
+# What-if evaluation over a cached snapshot
+# -----------------------------------------------------------
+class ScoringSnapshot:
+    """Scoring inputs plus the scores under the current config, held in memory"""
+
+    def __init__(self, inputs: ScoringInputs, baseline: Dict[str, np.ndarray]):
+        self.inputs = inputs
+        self.baseline = baseline
+        self.loaded_at = time.time()
+
+
+_snapshot: Optional[ScoringSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def invalidate_scoring_snapshot():
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
+def get_scoring_snapshot(db, refresh: bool = False) -> ScoringSnapshot:
+    """Process-wide snapshot, reloaded after settings.what_if_snapshot_ttl_seconds"""
+    global _snapshot
+    with _snapshot_lock:
+        expired = _snapshot is None or time.time() - _snapshot.loaded_at > settings.what_if_snapshot_ttl_seconds
+        if refresh or expired:
+            inputs = load_scoring_inputs(db)
+            _snapshot = ScoringSnapshot(inputs, compute_scores(inputs, ScoringConfig.from_settings()))
+            logger.info(f"Loaded scoring snapshot with {len(inputs)} organizations")
+        return _snapshot
+
+
+def _tier_counts(tiers: np.ndarray) -> Dict[str, int]:
+    return {tier: int(np.count_nonzero(tiers == tier)) for tier in ("A", "B", "C")}
+
+
+def evaluate_what_if(snapshot: ScoringSnapshot, config: ScoringConfig, top_n: int = 20,
+                     include_deltas: bool = False) -> Dict:
+    """Compare an alternative config against the current one without writing anything"""
+    inputs, baseline = snapshot.inputs, snapshot.baseline
+    proposed = compute_scores(inputs, config)
+    delta = proposed["total"] - baseline["total"]
+    tier_changed = proposed["tier"] != baseline["tier"]
+
+    def _row(i: int) -> Dict:
+        return {
+            "org_id": inputs.org_ids[i],
+            "name": inputs.names[i],
+            "baseline_score": round(float(baseline["total"][i]), 2),
+            "score": round(float(proposed["total"][i]), 2),
+            "delta": round(float(delta[i]), 2),
+            "baseline_tier": str(baseline["tier"][i]),
+            "tier": str(proposed["tier"][i]),
+        }
+
+    transitions = {}
+    for i in np.flatnonzero(tier_changed):
+        key = f"{baseline['tier'][i]}->{proposed['tier'][i]}"
+        transitions[key] = transitions.get(key, 0) + 1
+
+    order = np.argsort(delta, kind="stable")
+    increases = [i for i in order[::-1][:top_n] if delta[i] > 0]
+    decreases = [i for i in order[:top_n] if delta[i] < 0]
+    changed = np.flatnonzero(np.abs(delta) > 1e-9)
+
+    return {
+        "organizations": len(inputs),
+        "snapshot_age_seconds": round(time.time() - snapshot.loaded_at, 1),
+        "config": config.to_dict(),
+        "tier_distribution": {
+            "baseline": _tier_counts(baseline["tier"]),
+            "proposed": _tier_counts(proposed["tier"]),
+        },
+        "tier_transitions": transitions,
+        "changed_scores": int(changed.size),
+        "changed_tiers": int(np.count_nonzero(tier_changed)),
+        "mean_score": {
+            "baseline": round(float(baseline["total"].mean()), 2) if len(inputs) else None,
+            "proposed": round(float(proposed["total"].mean()), 2) if len(inputs) else None,
+        },
+        "top_increases": [_row(i) for i in increases],
+        "top_decreases": [_row(i) for i in decreases],
+        "deltas": [_row(i) for i in changed] if include_deltas else None,
+    }
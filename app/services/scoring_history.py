@@ -0,0 +1,127 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import func
+from app.db import bulk_upsert
+from app.models import LeadScoring, LeadScoringHistory, Organization, ScoringConfigVersion
+from app.services.scoring_engine import (ScoringConfig, WRITE_BATCH_SIZE, format_rationale,
+                                         invalidate_scoring_snapshot)
+from app.services.stats_summary import refresh_stats_summary
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Score components stored on each history row (component name == column name)
+COMPONENT_COLUMNS = ("base", "exposure_bonus", "program_bonus", "contact_bonus", "country_bonus")
+
+
+def config_hash(config: ScoringConfig) -> str:
+    return hashlib.sha256(json.dumps(config.to_dict(), sort_keys=True).encode()).hexdigest()
+
+
+def get_or_create_config_version(db, config: ScoringConfig) -> ScoringConfigVersion:
+    """Version row for a config; identical configs share one version"""
+    digest = config_hash(config)
+    version = db.query(ScoringConfigVersion).filter(ScoringConfigVersion.config_hash == digest).first()
+    if version is None:
+        version = ScoringConfigVersion(config_hash=digest, config=config.to_dict())
+        db.add(version)
+        db.flush()
+        logger.info(f"Registered scoring config version {version.id}")
+    return version
+
+
+def record_history(db, org_ids: List, components: Dict[str, np.ndarray], config_version: int):
+    """Append one history row per scored org"""
+    table = LeadScoringHistory.__table__
+    rows = [
+        {
+            "org_id": org_id,
+            "config_version": config_version,
+            "score": float(components["total"][i]),
+            "tier": str(components["tier"][i]),
+            **{column: float(components[column][i]) for column in COMPONENT_COLUMNS},
+        }
+        for i, org_id in enumerate(org_ids)
+    ]
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        db.execute(table.insert(), rows[start:start + WRITE_BATCH_SIZE])
+
+
+def _latest_per_org(db, config_version: int):
+    """Subquery: each org's most recent history row for a config version"""
+    rank = func.row_number().over(
+        partition_by=LeadScoringHistory.org_id, order_by=LeadScoringHistory.id.desc()
+    ).label("rank")
+    ranked = db.query(LeadScoringHistory, rank).filter(
+        LeadScoringHistory.config_version == config_version
+    ).subquery()
+    return ranked
+
+
+def tier_migration(db, from_version: int, to_version: int) -> Dict:
+    """How orgs moved between tiers from one config version's scores to another's"""
+    old = _latest_per_org(db, from_version)
+    new = _latest_per_org(db, to_version)
+    rows = db.query(old.c.tier, new.c.tier, func.count(), func.avg(new.c.score - old.c.score)).join(
+        new, new.c.org_id == old.c.org_id
+    ).filter(old.c.rank == 1, new.c.rank == 1).group_by(old.c.tier, new.c.tier).all()
+
+    matrix = {tier: {t: 0 for t in ("A", "B", "C")} for tier in ("A", "B", "C")}
+    mean_delta = {}
+    for from_tier, to_tier, count, avg_delta in rows:
+        matrix[from_tier][to_tier] = count
+        mean_delta[f"{from_tier}->{to_tier}"] = round(float(avg_delta or 0.0), 2)
+    return {
+        "from_version": from_version,
+        "to_version": to_version,
+        "organizations": sum(count for _, _, count, _ in rows),
+        "changed_tiers": sum(count for from_tier, to_tier, count, _ in rows if from_tier != to_tier),
+        "matrix": matrix,
+        "mean_score_delta": mean_delta,
+    }
+
+
+def org_history(db, org_id, limit: int = 50) -> List[LeadScoringHistory]:
+    return db.query(LeadScoringHistory).filter(
+        LeadScoringHistory.org_id == org_id
+    ).order_by(LeadScoringHistory.id.desc()).limit(limit).all()
+
+
+def rollback_to_version(db, config_version: int) -> int:
+    """Restore lead_scoring from each org's latest history row for a config version.
+
+    Rationales are rebuilt from the stored components. Review status and
+    notes are kept. The next rescore with the current settings will
+    overwrite these again unless settings are changed to that config.
+    """
+    latest = _latest_per_org(db, config_version)
+    rows = db.query(latest, Organization.sector).join(
+        Organization, Organization.org_id == latest.c.org_id
+    ).filter(latest.c.rank == 1).all()
+
+    restored = [
+        {
+            "org_id": row.org_id,
+            "propensity_score": row.score,
+            "tier": row.tier,
+            "rationale": format_rationale(row.base, row.sector, row.exposure_bonus, row.program_bonus,
+                                          row.contact_bonus, row.country_bonus),
+            "reviewer_status": "pending",
+            "config_version": config_version,
+        }
+        for row in rows
+    ]
+    for start in range(0, len(restored), WRITE_BATCH_SIZE):
+        bulk_upsert(db, LeadScoring, restored[start:start + WRITE_BATCH_SIZE], index_elements=["org_id"],
+                    update_columns=["propensity_score", "tier", "rationale", "config_version"])
+    db.commit()
+    refresh_stats_summary(db)
+    invalidate_scoring_snapshot()
+    logger.info(f"Rolled back {len(restored)} lead scores to config version {config_version}")
+    return len(restored)
+
+
+def get_config_version(db, config_version: int) -> Optional[ScoringConfigVersion]:
+    return db.query(ScoringConfigVersion).filter(ScoringConfigVersion.id == config_version).first()
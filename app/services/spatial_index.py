@@ -0,0 +1,241 @@
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Organization
+import logging
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat: float, lon: float, lats, lons) -> np.ndarray:
+    """Great-circle distance from one point to many points"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class GridSpatialIndex:
+    """Uniform lat/lon grid over org points for bbox, radius and k-nearest queries.
+
+    Each cell holds the org ids whose point falls in it, so a query only
+    looks at the cells its search area overlaps. Points can be added,
+    moved and removed one at a time.
+    """
+
+    def __init__(self, cell_deg: float = 0.5):
+        self.cell_deg = cell_deg
+        self.cells: Dict[Tuple[int, int], Set] = {}
+        self.points: Dict[object, Tuple[float, float]] = {}
+        self.built_at = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def add(self, org_id, lat: float, lon: float):
+        with self._lock:
+            self.remove(org_id)
+            self.points[org_id] = (lat, lon)
+            self.cells.setdefault(self._cell(lat, lon), set()).add(org_id)
+
+    def remove(self, org_id):
+        with self._lock:
+            point = self.points.pop(org_id, None)
+            if point is None:
+                return
+            cell = self._cell(*point)
+            members = self.cells.get(cell)
+            if members is not None:
+                members.discard(org_id)
+                if not members:
+                    del self.cells[cell]
+
+    def rebuild(self, rows):
+        """Replace the contents with (org_id, lat, lon) rows"""
+        with self._lock:
+            self.cells = {}
+            self.points = {}
+            for org_id, lat, lon in rows:
+                self.points[org_id] = (lat, lon)
+                self.cells.setdefault(self._cell(lat, lon), set()).add(org_id)
+            self.built_at = time.time()
+
+    def _lon_ranges(self, min_lon: float, max_lon: float) -> List[Tuple[float, float]]:
+        if max_lon - min_lon >= 360:
+            return [(-180.0, 180.0)]
+        if min_lon < -180:
+            return [(min_lon + 360, 180.0), (-180.0, max_lon)]
+        if max_lon > 180:
+            return [(min_lon, 180.0), (-180.0, max_lon - 360)]
+        if min_lon > max_lon:  # box crosses the antimeridian
+            return [(min_lon, 180.0), (-180.0, max_lon)]
+        return [(min_lon, max_lon)]
+
+    def _candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List:
+        found = []
+        lat_lo, _ = self._cell(max(min_lat, -90.0), 0)
+        lat_hi, _ = self._cell(min(max_lat, 90.0), 0)
+        for lo, hi in self._lon_ranges(min_lon, max_lon):
+            _, lon_lo = self._cell(0, lo)
+            _, lon_hi = self._cell(0, hi)
+            # Sparse data: walking occupied cells beats enumerating a huge box
+            if (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) > len(self.cells):
+                for (i, j), members in self.cells.items():
+                    if lat_lo <= i <= lat_hi and lon_lo <= j <= lon_hi:
+                        found.extend(members)
+            else:
+                for i in range(lat_lo, lat_hi + 1):
+                    for j in range(lon_lo, lon_hi + 1):
+                        found.extend(self.cells.get((i, j), ()))
+        return found
+
+    def query_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List:
+        """Org ids inside the box (min_lon > max_lon means it crosses the antimeridian)"""
+        with self._lock:
+            ranges = self._lon_ranges(min_lon, max_lon)
+            result = []
+            for org_id in self._candidates(min_lat, min_lon, max_lat, max_lon):
+                lat, lon = self.points[org_id]
+                if min_lat <= lat <= max_lat and any(lo <= lon <= hi for lo, hi in ranges):
+                    result.append(org_id)
+            return result
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[object, float]]:
+        """(org_id, distance_km) within radius, nearest first"""
+        dlat = radius_km / KM_PER_DEG_LAT
+        cos_lat = math.cos(math.radians(lat))
+        if abs(lat) + dlat >= 90 or cos_lat < 1e-6:
+            dlon = 360.0  # circle reaches a pole: every longitude
+        else:
+            dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / cos_lat)))
+        with self._lock:
+            ids = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+            return self._within(lat, lon, ids, radius_km)
+
+    def _within(self, lat: float, lon: float, ids: List, radius_km: Optional[float]) -> List[Tuple[object, float]]:
+        if not ids:
+            return []
+        ids = list(dict.fromkeys(ids))
+        coords = np.array([self.points[org_id] for org_id in ids], dtype=np.float64)
+        distances = haversine_km(lat, lon, coords[:, 0], coords[:, 1])
+        order = np.argsort(distances, kind="stable")
+        if radius_km is not None:
+            order = order[distances[order] <= radius_km]
+        return [(ids[i], float(distances[i])) for i in order]
+
+    def nearest(self, lat: float, lon: float, k: int) -> List[Tuple[object, float]]:
+        """k nearest orgs as (org_id, distance_km), nearest first"""
+        with self._lock:
+            if not self.points or k <= 0:
+                return []
+            if k >= len(self.points):
+                return self._within(lat, lon, list(self.points), None)[:k]
+
+            # Grow the search box until it holds k points, then confirm with a
+            # radius query so closer points just outside the box are not missed
+            half = self.cell_deg
+            while True:
+                ids = self._candidates(lat - half, lon - half, lat + half, lon + half)
+                if len(ids) >= k or half >= 180:
+                    break
+                half *= 2
+            ranked = self._within(lat, lon, ids, None)
+            if len(ranked) < k:
+                return self._within(lat, lon, list(self.points), None)[:k]
+            return self.query_radius(lat, lon, ranked[k - 1][1])[:k]
+
+
+# -----------------------------------------------------------
+# 🗂️ Shared Index (rebuilt periodically, updated on ORM changes)
+# -----------------------------------------------------------
+_index: Optional[GridSpatialIndex] = None
+_index_lock = threading.Lock()
+
+
+def load_index(db, index: Optional[GridSpatialIndex] = None) -> GridSpatialIndex:
+    index = index or GridSpatialIndex(settings.spatial_index_cell_deg)
+    rows = db.query(Organization.org_id, Organization.latitude, Organization.longitude).filter(
+        Organization.latitude.isnot(None), Organization.longitude.isnot(None)
+    )
+    index.rebuild((org_id, lat, lon) for org_id, lat, lon in rows)
+    logger.info(f"Built spatial index with {len(index)} organizations in {len(index.cells)} cells")
+    return index
+
+
+def get_spatial_index(db) -> GridSpatialIndex:
+    """Process-wide index; rebuilt after spatial_index_refresh_seconds to pick up bulk writes from workers"""
+    global _index
+    with _index_lock:
+        stale = _index is None or time.time() - _index.built_at > settings.spatial_index_refresh_seconds
+        if stale:
+            _index = load_index(db, _index)
+        return _index
+
+
+@event.listens_for(Organization, "after_insert")
+@event.listens_for(Organization, "after_update")
+def _track_location_change(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("spatial_changes", {})[target.org_id] = (target.latitude, target.longitude)
+
+
+@event.listens_for(Organization, "after_delete")
+def _track_delete(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("spatial_changes", {})[target.org_id] = None
+
+
+def track_removed_orgs(session, org_ids):
+    """Drop orgs deleted with Core statements (no ORM events) from the index on commit"""
+    changes = session.info.setdefault("spatial_changes", {})
+    for org_id in org_ids:
+        changes[org_id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_location_changes(session):
+    changes = session.info.pop("spatial_changes", None)
+    if not changes or _index is None:
+        return
+    for org_id, point in changes.items():
+        if point is None or point[0] is None or point[1] is None:
+            _index.remove(org_id)
+        else:
+            _index.add(org_id, point[0], point[1])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_location_changes(session):
+    session.info.pop("spatial_changes", None)
+
+
+# -----------------------------------------------------------
+# 🔎 Query Functions
+# -----------------------------------------------------------
+def find_in_bbox(db, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                 limit: int = 1000) -> List[Tuple[object, Optional[float]]]:
+    return [(org_id, None) for org_id in get_spatial_index(db).query_bbox(min_lat, min_lon, max_lat, max_lon)[:limit]]
+
+
+def find_within_radius(db, lat: float, lon: float, radius_km: float,
+                       limit: int = 1000) -> List[Tuple[object, Optional[float]]]:
+    return get_spatial_index(db).query_radius(lat, lon, radius_km)[:limit]
+
+
+def find_nearest(db, lat: float, lon: float, k: int = 10) -> List[Tuple[object, Optional[float]]]:
+    return get_spatial_index(db).nearest(lat, lon, k)
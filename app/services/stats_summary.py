@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from typing import Dict
+from sqlalchemy import func
+from app.db import bulk_upsert
+from app.models import Organization, LeadScoring, StatsSummary
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_KEY = "organizations"
+HISTOGRAM_BINS = 10  # 0-10, 10-20, ... 90-100
+
+
+def _histogram(db, column) -> Dict[str, int]:
+    """Counts of a 0-100 score column in fixed-width bins (100 falls in the last bin)"""
+    width = 100 // HISTOGRAM_BINS
+    counts = [0] * HISTOGRAM_BINS
+    bucket = func.floor(column / width)  # CAST rounds on PostgreSQL, so 19.6 would land in 20-30
+    rows = db.query(bucket, func.count()).filter(column.isnot(None)).group_by(bucket).all()
+    for bucket, count in rows:
+        counts[min(max(int(bucket), 0), HISTOGRAM_BINS - 1)] += count
+    return {f"{i * width}-{(i + 1) * width}": count for i, count in enumerate(counts)}
+
+
+def _counts(db, column) -> Dict[str, int]:
+    return {str(value) if value is not None else "unknown": count
+            for value, count in db.query(column, func.count()).group_by(column).all()}
+
+
+def compute_stats_summary(db) -> Dict:
+    """Aggregates served by /api/orgs/stats/summary (one pass of GROUP BYs)"""
+    return {
+        "total_organizations": db.query(func.count(Organization.org_id)).scalar() or 0,
+        "scored_organizations": db.query(func.count(LeadScoring.org_id)).scalar() or 0,
+        "by_sector": _counts(db, Organization.sector),
+        "by_country": _counts(db, Organization.country),
+        "by_tier": _counts(db, LeadScoring.tier),
+        "by_reviewer_status": _counts(db, LeadScoring.reviewer_status),
+        "score_histogram": _histogram(db, LeadScoring.propensity_score),
+        "model_score_histogram": _histogram(db, LeadScoring.model_score),
+    }
+
+
+def refresh_stats_summary(db, commit: bool = True) -> Dict:
+    """Recompute the summary and store it in stats_summaries"""
+    data = compute_stats_summary(db)
+    refreshed_at = datetime.now(timezone.utc)
+    bulk_upsert(db, StatsSummary, [{"key": SUMMARY_KEY, "data": data, "refreshed_at": refreshed_at, "stale": False}],
+                index_elements=["key"], update_columns=["data", "refreshed_at", "stale"])
+    if commit:
+        db.commit()
+    logger.info(f"Refreshed stats summary ({data['total_organizations']} organizations)")
+    return {**data, "refreshed_at": refreshed_at.isoformat()}
+
+
+def get_stats_summary(db) -> Dict:
+    """Stored summary (a single primary-key read); recomputed on first use and after org/score writes.
+
+    ORM writes to organizations and lead_scoring mark the row stale (see
+    mark_stats_summary_stale), so reviewer decisions, ingestion and
+    extraction cost one UPDATE each and the GROUP BYs run once per read
+    that follows a change rather than once per write.
+    """
+    row = db.query(StatsSummary).filter(StatsSummary.key == SUMMARY_KEY).first()
+    if row is None or row.stale:
+        return refresh_stats_summary(db)
+    return {**row.data, "refreshed_at": row.refreshed_at.isoformat()}
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Exposure raster builder - combines the susceptibility and ignition layers
+into a single precomputed exposure raster using the configured weights.
+
+Re-run after changing susceptibility_weight / ignition_weight; overlays then
+read exposure with one lookup instead of two samples plus math.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.services.rasters import build_exposure_raster
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--susceptibility", default=settings.geotiff_susceptibility)
+    parser.add_argument("--ignition", default=settings.geotiff_ignition)
+    parser.add_argument("--output", default=settings.geotiff_exposure)
+    parser.add_argument("--susceptibility-weight", type=float, default=settings.susceptibility_weight)
+    parser.add_argument("--ignition-weight", type=float, default=settings.ignition_weight)
+    parser.add_argument("--chunk", type=int, default=1024, help="Window size in pixels per pass")
+    parser.add_argument("--cog", default=None, help="Also write a Cloud-Optimized GeoTIFF with overviews here")
+    args = parser.parse_args()
+
+    result = build_exposure_raster(
+        args.susceptibility,
+        args.ignition,
+        args.output,
+        args.susceptibility_weight,
+        args.ignition_weight,
+        chunk=args.chunk,
+        cog_path=args.cog,
+    )
+    logger.info(f"Exposure raster ready: {result}")
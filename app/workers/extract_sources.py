@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Incremental extraction worker - re-runs the LLM extractor only for sources
+whose content hash or prompt version changed since their last extraction.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Source
+from app.services.llm_telemetry import telemetry
+from app.services.llm_extract import (
+    WildfireLLMExtractor, PROMPT_VERSION, partition_sources_for_extraction, save_extraction
+)
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def run_incremental_extraction(force: bool = False, limit: Optional[int] = None,
+                                     concurrency: int = settings.extraction_concurrency) -> Dict[str, int]:
+    """Extract changed sources and record their provenance"""
+    db = SessionLocal()
+    try:
+        total_sources = db.query(Source).filter(Source.content_text.isnot(None)).count()
+        sources, unchanged = partition_sources_for_extraction(db, force=force, limit=limit)
+        logger.info(f"{len(sources)} of {total_sources} sources need extraction (prompt {PROMPT_VERSION})")
+        
+        extractor = WildfireLLMExtractor()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def extract(source):
+            async with semaphore:
+                return await extractor.process_source(str(source.source_id), source.url, source.content_text)
+        
+        results = await asyncio.gather(*(extract(source) for source in sources), return_exceptions=True)
+        
+        # "unchanged" counts every current source, not just those a --limit would have reached
+        stats = {"total": total_sources, "selected": len(sources), "extracted": 0, "failed": 0,
+                 "unchanged": unchanged}
+        for source, result in zip(sources, results):
+            if isinstance(result, Exception):
+                logger.error(f"Extraction error for {source.url}: {result}")
+                result = None
+            save_extraction(db, source, result, extractor.model)
+            stats["extracted" if result else "failed"] += 1
+        
+        db.commit()
+        telemetry.record_cache_hit("extractor", stats["unchanged"])
+        logger.info(f"Incremental extraction finished: {stats}")
+        logger.info(f"LLM telemetry:\n{telemetry.format_summary()}")
+        telemetry.save_snapshot("extract_sources")
+        return stats
+        
+    except Exception as e:
+        logger.error(f"Error during incremental extraction: {e}")
+        db.rollback()
+        return {}
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true", help="Re-extract every source regardless of provenance")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of sources to extract")
+    parser.add_argument("--concurrency", type=int, default=settings.extraction_concurrency)
+    args = parser.parse_args()
+    
+    asyncio.run(run_incremental_extraction(force=args.force, limit=args.limit, concurrency=args.concurrency))
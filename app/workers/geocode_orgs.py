@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Geocoding worker - resolves coordinates for every organization that has
+none, using the gazetteer first and rate-limited network providers in
+parallel threads.
+"""
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.services.geospatial import WildfireGeospatialService
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    results = WildfireGeospatialService().geocode_pending_organizations()
+    logger.info(f"Geocoded {sum(results.values())} of {len(results)} organizations")
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+LLM stub server - local OpenAI-compatible stand-in for pipeline benchmarking.
+
+Serves /v1/chat/completions with configurable latency, injected 500/429
+errors and canned or rule-derived JSON answers, so extractor and agent
+throughput can be measured without API cost or network variance.
+
+    python app/workers/llm_stub_server.py --latency lognormal --rate-limit-rate 0.05
+    LLM_STUB_ENABLED=true python app/workers/extract_sources.py --force
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from app.config import settings
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SECTOR_RULES = [
+    ("Utilities", ["utility", "electric", "power line", "grid", "psps"]),
+    ("Insurance/Analytics", ["insurance", "underwriting", "insurer", "catastrophe model"]),
+    ("Academia/Research", ["university", "research", "institute", "laboratory"]),
+    ("NGO/Conservation", ["foundation", "conservancy", "nonprofit", "non-profit", "coalition"]),
+    ("Forestry/Timber", ["forestry", "timber", "forest products"]),
+    ("Technology/GIS", ["satellite", "gis", "software", "platform", "sensor"]),
+    ("Agriculture", ["agricultur", "farm", "ranch"]),
+    ("Real Estate/Property", ["real estate", "property management", "homeowner"]),
+    ("Government", ["department", "agency", "service", "county", "ministry", ".gov", "federal"]),
+]
+
+COUNTRY_RULES = [
+    ("Canada", [".ca/", "canada", "british columbia", "alberta", "ontario"]),
+    ("Australia", [".au/", "australia", "new south wales", "victoria", "queensland"]),
+    ("United Kingdom", [".uk/", "united kingdom", "england", "scotland"]),
+    ("USA", [".gov/", ".us/", "california", "oregon", "colorado", "united states", "usa"]),
+]
+
+
+class StubBehaviour:
+    """Latency, error injection and response generation for the stub."""
+
+    def __init__(self, distribution: str, mean_ms: float, stddev_ms: float,
+                 error_rate: float, rate_limit_rate: float, retry_after: float,
+                 responses_path: Optional[str], seed: int):
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.stddev_ms = stddev_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.canned: Dict[str, dict] = {}
+        if responses_path:
+            with open(responses_path, "r", encoding="utf-8") as f:
+                self.canned = json.load(f)
+            logger.info(f"Loaded {len(self.canned)} canned responses from {responses_path}")
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def sample_latency(self) -> float:
+        """Draw one response latency in seconds from the configured distribution"""
+        mean, std = self.mean_ms, self.stddev_ms
+        if self.distribution == "fixed":
+            ms = mean
+        elif self.distribution == "uniform":
+            ms = self.rng.uniform(max(0.0, mean - std), mean + std)
+        elif self.distribution == "normal":
+            ms = self.rng.gauss(mean, std)
+        else:
+            # lognormal parameterised so the samples keep the requested mean/stddev
+            sigma2 = 0.0 if mean <= 0 else math.log(1 + (std / mean) ** 2)
+            mu = math.log(max(mean, 1e-6)) - sigma2 / 2
+            ms = self.rng.lognormvariate(mu, sigma2 ** 0.5)
+        return max(0.0, ms) / 1000.0
+
+    def roll_failure(self) -> Optional[int]:
+        """Return an HTTP status to inject, or None for a normal answer"""
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+    def canned_response(self, prompt: str) -> Optional[dict]:
+        for key, response in self.canned.items():
+            if key != "*" and key in prompt:
+                return response
+        return self.canned.get("*")
+
+
+def _prompt_sections(prompt: str) -> Dict[str, str]:
+    """Pull the URL and page text out of an extractor or agent prompt"""
+    url_match = re.search(r"URL:\s*(\S+)", prompt)
+    content_match = re.search(r"Page Content:\s*(.*?)\n\s*Extract the following", prompt, re.DOTALL)
+    if content_match:
+        text = content_match.group(1)
+    else:
+        text_match = re.search(r"Text:\s*(.*)", prompt, re.DOTALL)
+        text = text_match.group(1) if text_match else prompt
+    return {"url": url_match.group(1) if url_match else "", "text": text.strip()}
+
+
+def _first_match(haystack: str, rules) -> Optional[str]:
+    for label, needles in rules:
+        if any(needle in haystack for needle in needles):
+            return label
+    return None
+
+
+def derive_organization(url: str, text: str) -> Dict:
+    """Build a plausible extraction answer from simple text rules"""
+    lower = f"{url.lower()}/ {text.lower()}"
+
+    acronym = re.search(r"\b([A-Z][A-Za-z&.\- ]{2,80}?)\s*\(([A-Z][A-Z &]{1,15})\)", text)
+    if acronym:
+        name = f"{acronym.group(1).strip()} ({acronym.group(2).strip()})"
+    else:
+        lead = re.split(r"\s+(?:is|are|was|provides|works)\s+|[.|\-–]", text, maxsplit=1)[0]
+        name = " ".join(lead.split()[:8]) if lead.strip() else ""
+    if len(name) < 2:
+        name = urlparse(url).netloc.replace("www.", "") or "Unknown Organization"
+
+    sentences = re.split(r"(?<=[.!?])\s+", text)
+    programs = []
+    for sentence in sentences:
+        if re.search(r"\b(program|programme|initiative|grant)\b", sentence, re.IGNORECASE):
+            programs.append({
+                "name": " ".join(sentence.split()[:8]),
+                "url": None,
+                "description": sentence.strip()[:300],
+            })
+        if len(programs) >= 5:
+            break
+
+    return {
+        "name": name,
+        "sector": _first_match(lower, SECTOR_RULES) or "Other",
+        "role": " ".join(sentences[0].split()[:25]) if sentences and sentences[0] else None,
+        "country": _first_match(lower, COUNTRY_RULES) or "USA",
+        "region_state": None,
+        "website": url or None,
+        "programs": programs,
+        "notes": None,
+    }
+
+
+def build_answer(prompt: str, behaviour: StubBehaviour) -> str:
+    canned = behaviour.canned_response(prompt)
+    if canned is not None:
+        return json.dumps(canned)
+
+    sections = _prompt_sections(prompt)
+    org = derive_organization(sections["url"], sections["text"])
+    if "Page Content:" in prompt:
+        return json.dumps(org)
+
+    # Agent prompt shape (agent/wildfire_agent.py)
+    return json.dumps({
+        "organization": org["name"],
+        "sector": org["sector"],
+        "country": org["country"],
+        "role": org["role"],
+        "contacts": [],
+        "programs": [{"name": p["name"], "description": p["description"], "keywords": []}
+                     for p in org["programs"]],
+        "geospatial": {},
+        "lead_scoring": {},
+    })
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def create_app(behaviour: StubBehaviour) -> FastAPI:
+    app = FastAPI(title="LLM Stub Server", version="1.0.0")
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": settings.llm_model, "object": "model", "owned_by": "stub"}]}
+
+    @app.get("/stats")
+    async def stub_stats():
+        return behaviour.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages: List[dict] = body.get("messages", [])
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        behaviour.stats["requests"] += 1
+
+        await asyncio.sleep(behaviour.sample_latency())
+
+        status = behaviour.roll_failure()
+        if status == 429:
+            behaviour.stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": str(behaviour.retry_after)},
+                content={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+            )
+        if status == 500:
+            behaviour.stats["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Injected server error (stub)", "type": "server_error", "code": None}},
+            )
+
+        answer = build_answer(prompt, behaviour)
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(answer)
+        return {
+            "id": "chatcmpl-stub-" + hashlib.sha1(f"{prompt}{time.time()}".encode()).hexdigest()[:24],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", settings.llm_model),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible LLM stub server")
+    parser.add_argument("--host", default=settings.llm_stub_host)
+    parser.add_argument("--port", type=int, default=settings.llm_stub_port)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "normal", "lognormal"],
+                        default=settings.llm_stub_latency_distribution)
+    parser.add_argument("--latency-mean-ms", type=float, default=settings.llm_stub_latency_mean_ms)
+    parser.add_argument("--latency-stddev-ms", type=float, default=settings.llm_stub_latency_stddev_ms)
+    parser.add_argument("--error-rate", type=float, default=settings.llm_stub_error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=settings.llm_stub_rate_limit_rate)
+    parser.add_argument("--retry-after", type=float, default=settings.llm_stub_retry_after_seconds)
+    parser.add_argument("--responses", default=settings.llm_stub_responses_path,
+                        help="JSON file mapping URL substrings (or '*') to canned answers")
+    parser.add_argument("--seed", type=int, default=settings.llm_stub_seed)
+    args = parser.parse_args()
+
+    behaviour = StubBehaviour(
+        distribution=args.latency,
+        mean_ms=args.latency_mean_ms,
+        stddev_ms=args.latency_stddev_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        responses_path=args.responses,
+        seed=args.seed,
+    )
+
+    import uvicorn
+    logger.info(f"Starting LLM stub on http://{args.host}:{args.port}/v1 ({args.latency} latency)")
+    uvicorn.run(create_app(behaviour), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
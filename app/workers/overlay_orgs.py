@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Risk overlay worker - samples the risk layer stack for every organization
+and stores the results on risk_overlay.
+
+Default mode streams orgs in chunks (geocoding those without coordinates);
+--parallel samples already-located orgs in a process pool partitioned by
+raster tile.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.services.geospatial import process_all_organizations_geospatial, process_overlays_parallel
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parallel", action="store_true", help="Use a process pool (located orgs only)")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: settings.overlay_workers)")
+    args = parser.parse_args()
+
+    if args.parallel:
+        results = process_overlays_parallel(workers=args.workers)
+    else:
+        results = process_all_organizations_geospatial()
+    logger.info(f"Overlaid {sum(results.values())} of {len(results)} organizations")
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Risk layer refresh - registers new versions of changed risk rasters and
+re-overlays only the organizations that fall in tiles whose pixels
+changed. Everyone else is re-stamped with the current layer versions.
+
+Run after dropping in a new seasonal susceptibility/ignition raster.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.services.geospatial import refresh_risk_layers
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Re-sample every organization")
+    args = parser.parse_args()
+
+    counts = refresh_risk_layers(full=args.full)
+    logger.info(f"Refresh complete: {counts}")
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Zonal statistics refresh - recomputes mean/max/percentile of every
+available risk layer within the configured buffers around each located
+organization and stores them on risk_overlay.zonal_stats.
+
+Run after the risk rasters are replaced.
+"""
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.services.geospatial import refresh_zonal_stats
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    updated = refresh_zonal_stats()
+    logger.info(f"Zonal stats refreshed for {updated} organizations")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Rescoring worker - rescores only the organizations whose score inputs
+changed (queued in org_score_dirty by ORM events and bulk writers), in
+batches of settings.rescoring_batch_size.
+
+Runs until the queue is empty, or keeps polling with --watch.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.db import SessionLocal
+from app.services.scoring_engine import rescore_dirty_batch
+from app.services.stats_summary import refresh_stats_summary
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def drain_dirty_queue(batch_size: int) -> int:
+    """Rescore dirty orgs until none are left, then refresh the stats summary once"""
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            count = rescore_dirty_batch(db, batch_size)
+            if not count:
+                if total:
+                    refresh_stats_summary(db)
+                return total
+            total += count
+            logger.info(f"Rescored batch of {count} organizations ({total} so far)")
+    except Exception as e:
+        logger.error(f"Rescoring failed: {e}")
+        db.rollback()
+        return total
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=settings.rescoring_batch_size)
+    parser.add_argument("--watch", action="store_true", help="Keep polling for new dirty orgs")
+    args = parser.parse_args()
+
+    while True:
+        rescored = drain_dirty_queue(args.batch_size)
+        if rescored:
+            logger.info(f"Rescored {rescored} organizations")
+        if not args.watch:
+            break
+        time.sleep(settings.rescoring_poll_seconds)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Propensity model training - fits the logistic regression propensity model
+on reviewer approve/reject decisions and saves the artifact to
+settings.propensity_model_path. With --score, every org's model_score is
+then refreshed in one batched inference pass.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.db import SessionLocal
+from app.services.propensity_model import score_all_with_model, train_propensity_model
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default=settings.propensity_model_path)
+    parser.add_argument("--l2", type=float, default=1.0, help="L2 regularisation strength")
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--score", action="store_true", help="Score all orgs with the new model")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        model = train_propensity_model(db, l2=args.l2, epochs=args.epochs)
+        model.save(args.output)
+        logger.info(f"Saved propensity model to {args.output}")
+        if args.score:
+            timings = score_all_with_model(db, model)
+            logger.info(f"Model scoring complete: {timings}")
+    except ValueError as e:
+        logger.error(f"Training skipped: {e}")
+    except Exception as e:
+        logger.error(f"Training failed: {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+import pytest
+
+from app import db as app_db
+from app.db import bulk_upsert
+from app.models import Organization, RiskOverlay
+
+
+@pytest.fixture
+def org_ids(db):
+    orgs = [Organization(name=f"Org {i}", sector="Other", country="US") for i in range(2)]
+    db.add_all(orgs)
+    db.commit()
+    return [org.org_id for org in orgs]
+
+
+def overlays(db):
+    db.expire_all()
+    return {o.org_id: (o.exposure_score, o.zonal_stats) for o in db.query(RiskOverlay)}
+
+
+def test_bulk_upsert_inserts_then_updates(db, org_ids):
+    a, b = org_ids
+    bulk_upsert(db, RiskOverlay, [{"org_id": a, "exposure_score": 1.0, "zonal_stats": {"x": 1}}],
+                index_elements=["org_id"])
+    bulk_upsert(db, RiskOverlay, [{"org_id": a, "exposure_score": 2.0, "zonal_stats": {"x": 2}},
+                                  {"org_id": b, "exposure_score": 3.0, "zonal_stats": None}],
+                index_elements=["org_id"], update_columns=["exposure_score"])
+    db.commit()
+    assert overlays(db) == {a: (2.0, {"x": 1}), b: (3.0, None)}
+
+
+@pytest.mark.parametrize("use_connection", [False, True])
+def test_fallback_updates_then_inserts(db, org_ids, use_connection, monkeypatch):
+    a, b = org_ids
+    db.add(RiskOverlay(org_id=a, exposure_score=1.0, zonal_stats={"x": 1}))
+    db.commit()
+    monkeypatch.setattr(db.bind.dialect, "name", "mysql")
+
+    rows = [{"org_id": a, "exposure_score": 2.0, "zonal_stats": {"x": 2}},
+            {"org_id": b, "exposure_score": 3.0, "zonal_stats": {"x": 3}}]
+    if use_connection:
+        with db.bind.begin() as connection:
+            bulk_upsert(connection, RiskOverlay, rows, index_elements=["org_id"], update_columns=["exposure_score"])
+    else:
+        bulk_upsert(db, RiskOverlay, rows, index_elements=["org_id"], update_columns=["exposure_score"])
+        db.commit()
+    monkeypatch.undo()
+    assert overlays(db) == {a: (2.0, {"x": 1}), b: (3.0, {"x": 3})}
+
+
+def test_fallback_without_update_columns_skips_existing_rows(db, org_ids):
+    a, b = org_ids
+    db.add(RiskOverlay(org_id=a, exposure_score=1.0))
+    db.commit()
+    app_db._update_then_insert(db, RiskOverlay.__table__, [{"org_id": a, "exposure_score": 5.0},
+                                                          {"org_id": b, "exposure_score": 6.0}],
+                               ["org_id"], [], touch_updated_at=False)
+    db.commit()
+    assert overlays(db) == {a: (1.0, None), b: (6.0, None)}
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from app.models import Contact, LeadScoring, Organization, Program, RiskOverlay, Source
+from app.services import dedup
+from app.services.dedup import UnionFind, WildfireDeduplicator
+
+
+class FakeEmbedder:
+    """One-hot vectors: names in the same group have similarity 1, all others 0"""
+
+    groups = {}
+
+    def __init__(self):
+        self.model = None
+        self.stats = {}
+        self.ungrouped = {}
+
+    def encode(self, texts):
+        texts = list(texts)
+        vectors = np.zeros((len(texts), 256), dtype=np.float32)
+        for row, text in enumerate(texts):
+            if text:
+                column = self.groups.get(text) or self.ungrouped.setdefault(text, 16 + len(self.ungrouped))
+                vectors[row, column] = 1.0
+        return vectors
+
+
+@pytest.fixture
+def deduplicator(monkeypatch):
+    monkeypatch.setattr(dedup, "Embedder", FakeEmbedder)
+    monkeypatch.setattr(FakeEmbedder, "groups", {"Acme Forestry": 1, "ACME Forestry Inc": 1, "Acme Forestry LLC": 1})
+    return WildfireDeduplicator()
+
+
+def org(name, country="US", website=None):
+    return Organization(name=name, sector="Forestry/Timber", country=country, website=website)
+
+
+def test_union_find_chains_transitive_matches():
+    clusters = UnionFind(6)
+    for a, b in [(0, 1), (1, 2), (4, 3)]:
+        clusters.union(a, b)
+    assert sorted(clusters.clusters()) == [[0, 1, 2], [3, 4]]
+
+
+def test_oversized_clusters_are_not_merged(deduplicator, monkeypatch):
+    monkeypatch.setattr(dedup.settings, "dedup_max_cluster_size", 3)
+    orgs = [org(f"Org {i}") for i in range(6)]
+    chain = [(0, 1), (1, 2), (2, 3)]
+    assert deduplicator.cluster_matches(orgs, chain + [(4, 5)]) == [[4, 5]]
+    assert deduplicator.cluster_matches(orgs, chain[:2]) == [[0, 1, 2]]
+
+
+@pytest.mark.parametrize("first, second", [
+    (org("Acme Forestry", "US"), org("ACME Forestry Inc", None)),  # similar names, country unknown
+    (org("Sierra Timber", "US", "https://sierratimber.com"), org("STG Holdings", "us", "http://shop.sierratimber.com")),
+])
+def test_pairs_that_merge(deduplicator, first, second):
+    assert deduplicator.should_merge(first, second)
+
+
+@pytest.mark.parametrize("first, second", [
+    # similar names in different countries
+    (org("Acme Forestry", "US"), org("ACME Forestry Inc", "CA")),
+    # same domain only: country must be known and equal
+    (org("Sierra Timber", "US", "https://sierratimber.com"), org("STG Holdings", "CA", "https://sierratimber.com")),
+    (org("Sierra Timber", "US", "https://sierratimber.com"), org("STG Holdings", None, "https://sierratimber.com")),
+    # different agencies under one government suffix, or a shared host
+    (org("CAL FIRE", "US", "https://www.fire.ca.gov"), org("Water Resources", "US", "https://water.ca.gov")),
+    (org("Sierra Timber", "US", "https://facebook.com/a"), org("Pine Mill", "US", "https://facebook.com/b")),
+    # nothing in common
+    (org("Sierra Timber", "US"), org("Pine Mill", "US")),
+])
+def test_pairs_that_must_not_merge(deduplicator, first, second):
+    assert not deduplicator.should_merge(first, second)
+
+
+def test_deduplicate_reparents_children_and_deletes_secondaries(db, session_factory, deduplicator, monkeypatch):
+    monkeypatch.setattr(dedup, "SessionLocal", session_factory)
+    survivor = org("Acme Forestry")
+    db.add(survivor)
+    db.commit()  # oldest org survives
+    duplicate = org("ACME Forestry Inc", website="https://acmeforestry.com")
+    other = org("Pine Mill", website="https://pinemill.com")
+    db.add_all([duplicate, other])
+    db.flush()
+    db.add_all([
+        Contact(org_id=duplicate.org_id, channel_type="email", value="info@acmeforestry.com", source_url="x"),
+        Program(org_id=duplicate.org_id, name="Fuel breaks", source_url="x"),
+        Source(org_id=duplicate.org_id, url="https://acmeforestry.com/about"),
+        Contact(org_id=other.org_id, channel_type="email", value="info@pinemill.com", source_url="y"),
+        RiskOverlay(org_id=duplicate.org_id, exposure_score=42.0),
+        LeadScoring(org_id=survivor.org_id, propensity_score=10.0, tier="C", rationale="own"),
+        LeadScoring(org_id=duplicate.org_id, propensity_score=90.0, tier="A", rationale="duplicate"),
+    ])
+    db.commit()
+    survivor_id, duplicate_id, other_id = survivor.org_id, duplicate.org_id, other.org_id
+
+    merged = deduplicator.deduplicate_organizations()
+
+    assert merged == {survivor_id: [survivor_id, duplicate_id]}
+    db.expire_all()
+    assert {o.org_id for o in db.query(Organization)} == {survivor_id, other_id}
+    assert {c.org_id for c in db.query(Contact).filter(Contact.value == "info@acmeforestry.com")} == {survivor_id}
+    assert db.query(Contact).filter(Contact.value == "info@pinemill.com").one().org_id == other_id
+    assert db.query(Program).one().org_id == survivor_id
+    assert db.query(Source).one().org_id == survivor_id
+    # Single-row tables: the survivor keeps its own lead score and takes the duplicate's overlay
+    assert db.query(RiskOverlay).one().org_id == survivor_id
+    assert [(s.org_id, s.rationale) for s in db.query(LeadScoring)] == [(survivor_id, "own")]
+    assert db.get(Organization, survivor_id).website == "https://acmeforestry.com"
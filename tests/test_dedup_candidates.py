@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from app.services.dedup_candidates import CandidateGenerator, MinHashLSH, domain_pairs, registered_domain
+
+
+@pytest.mark.parametrize("url, domain", [
+    ("https://www.fire.example.org/about", "example.org"),
+    ("example.org", "example.org"),
+    ("HTTP://Example.co.uk:8080/x", "example.co.uk"),
+    ("https://www.fire.ca.gov", "fire.ca.gov"),
+    ("https://water.ca.gov/", "water.ca.gov"),
+    ("www.rfs.nsw.gov.au", "rfs.nsw.gov.au"),
+    ("https://www.facebook.com/acme", None),
+    ("https://acme.github.io", None),
+    ("", None),
+    (None, None),
+])
+def test_registered_domain(url, domain):
+    assert registered_domain(url) == domain
+
+
+def test_domain_pairs_skip_oversized_buckets():
+    domains = ["a.org", "a.org", None, "b.org", "a.org", "c.org", "c.org", "c.org"]
+    assert domain_pairs(domains, max_bucket=3) == {(0, 1), (0, 4), (1, 4), (5, 6), (5, 7), (6, 7)}
+    assert domain_pairs(domains, max_bucket=2) == set()
+
+
+class ZeroEmbedder:
+    """No name embedding evidence, so only LSH and domains produce candidates"""
+
+    def encode(self, texts):
+        return np.zeros((len(list(texts)), 4), dtype=np.float32)
+
+
+def test_candidates_use_registered_domains_not_url_text():
+    generator = CandidateGenerator(ZeroEmbedder(), str.lower, lsh=MinHashLSH(bands=4, rows=8))
+    names = ["Acme Forestry", "Sierra Timber Group", "Pacific Land Trust", "Redwood Analytics"]
+    websites = ["https://www.acme.com/a", "http://shop.acme.com", "https://fire.ca.gov", "https://water.ca.gov"]
+    assert generator.candidate_pairs(names, websites) == {(0, 1)}
+    assert generator.stats["domain_pairs"] == 1
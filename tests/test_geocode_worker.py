@@ -0,0 +1,35 @@
+import threading
+
+from app.services.geocode_worker import GeocodingWorker, LocationQuery, RateLimiter
+from app.services.geospatial import GeocodeResult, GeocoderChain
+
+
+class BlockingNetworkResolver:
+    name = "network"
+    network = True
+
+    def __init__(self):
+        self.rate_limiter = RateLimiter(0)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def resolve(self, query):
+        self.calls += 1
+        self.release.wait(5)
+        return GeocodeResult(1.0, 2.0, "address", self.name)
+
+
+def test_duplicate_queries_coalesce_and_finished_lookups_are_dropped():
+    resolver = BlockingNetworkResolver()
+    queries = [LocationQuery(i, "Acme Forestry", "CA", "US") for i in range(3)]
+    with GeocodingWorker(GeocoderChain([resolver], "city"), max_workers=2) as worker:
+        futures = [worker.submit(query) for query in queries]
+        assert futures[0] is futures[1] is futures[2]
+        assert len(worker._inflight) == 1
+        forgotten = threading.Event()
+        futures[0].add_done_callback(lambda future: forgotten.set())  # runs after the worker's own callback
+        resolver.release.set()
+        assert forgotten.wait(5)
+        assert worker._inflight == {}
+    assert resolver.calls == 1
+    assert worker.stats["coalesced"] == 2
@@ -0,0 +1,98 @@
+import pytest
+
+from app.models import Organization, RiskOverlay
+from app.services import geospatial
+from app.services.geospatial import GeocodeResult, GeocoderChain, NetworkResolver, WildfireGeospatialService
+
+
+class FakeResolver:
+    network = False
+
+    def __init__(self, name, precision, lat=1.0, lon=2.0):
+        self.name = name
+        self.precision = precision
+        self.lat = lat
+        self.lon = lon
+        self.calls = 0
+
+    def resolve(self, org):
+        self.calls += 1
+        if self.precision is None:
+            return None
+        return GeocodeResult(self.lat, self.lon, self.precision, self.name)
+
+
+def make_query():
+    return geospatial.LocationQuery(None, "Acme Forestry", "CA", "US")
+
+
+def make_org(db, **fields):
+    org = Organization(name="Acme Forestry", sector="Forestry/Timber", country="US", region_state="CA", **fields)
+    db.add(org)
+    db.commit()
+    return org
+
+
+def test_network_resolver_requires_create_geocoder():
+    with pytest.raises(TypeError):
+        NetworkResolver()
+
+
+def test_chain_stops_at_first_precise_result():
+    region = FakeResolver("gazetteer", "region")
+    city = FakeResolver("first", "city")
+    later = FakeResolver("later", "address")
+    result = GeocoderChain([region, city, later], min_precision="city").resolve(make_query())
+    assert result.provider == "first"
+    assert later.calls == 0
+
+
+def test_chain_falls_back_to_most_precise_centroid():
+    chain = GeocoderChain([FakeResolver("a", "country"), FakeResolver("b", "region"), FakeResolver("c", None)],
+                          min_precision="city")
+    result = chain.resolve(make_query())
+    assert (result.provider, result.precision) == ("b", "region")
+    assert not chain.is_precise(result.precision)
+    assert chain.is_precise("address")
+
+
+@pytest.fixture
+def service(session_factory, monkeypatch):
+    monkeypatch.setattr(geospatial, "SessionLocal", session_factory)
+    return WildfireGeospatialService()
+
+
+def test_pending_geocode_stores_precision_and_retries_centroids(db, service):
+    service.geocoder_chain = GeocoderChain([FakeResolver("gazetteer", "country", 10.0, 20.0)], "city")
+    org = make_org(db)
+
+    assert service.geocode_pending_organizations() == {org.org_id: True}
+    db.refresh(org)
+    assert (org.latitude, org.longitude, org.geocode_precision) == (10.0, 20.0, "country")
+
+    # A later run with a better provider replaces the centroid and unstamps the overlay
+    db.add(RiskOverlay(org_id=org.org_id, exposure_score=5.0, layer_versions={"susceptibility": 1}))
+    db.commit()
+    service.geocoder_chain = GeocoderChain([FakeResolver("network", "address", 11.0, 21.0)], "city")
+    assert service.geocode_pending_organizations() == {org.org_id: True}
+    db.refresh(org)
+    assert (org.latitude, org.longitude, org.geocode_precision) == (11.0, 21.0, "address")
+    assert db.query(RiskOverlay).one().layer_versions is None
+
+    # Precise enough now, so it is no longer selected
+    assert service.geocode_pending_organizations() == {}
+
+
+def test_pending_geocode_keeps_location_when_retry_is_no_better(db, service):
+    org = make_org(db, latitude=10.0, longitude=20.0, geocode_precision="region")
+    service.geocoder_chain = GeocoderChain([FakeResolver("gazetteer", "region", 30.0, 40.0)], "city")
+
+    assert service.geocode_pending_organizations() == {org.org_id: False}
+    db.refresh(org)
+    assert (org.latitude, org.longitude) == (10.0, 20.0)
+
+
+def test_entered_coordinates_are_not_regeocoded(db, service):
+    make_org(db, latitude=10.0, longitude=20.0)
+    service.geocoder_chain = GeocoderChain([FakeResolver("network", "address")], "city")
+    assert service.geocode_pending_organizations() == {}
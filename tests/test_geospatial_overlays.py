@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+import rasterio
+from affine import Affine
+
+from app.models import Organization, RiskLayerVersion, RiskOverlay
+from app.services import geospatial, rasters
+from app.services.geospatial import GeocoderChain, WildfireGeospatialService
+from app.services.raster_registry import LayerSpec, RasterRegistry
+
+
+def write_layer(path, value):
+    array = np.full((100, 100), value, dtype=np.float32)
+    with rasterio.open(path, "w", driver="GTiff", height=100, width=100, count=1, dtype="float32",
+                       crs="EPSG:4326", transform=Affine(0.1, 0, -125.0, 0, -0.1, 45.0), nodata=-9999) as dst:
+        dst.write(array, 1)
+    return str(path)
+
+
+@pytest.fixture
+def service(tmp_path, session_factory, monkeypatch):
+    monkeypatch.setattr(geospatial, "SessionLocal", session_factory)
+    service = WildfireGeospatialService()
+    service.registry = RasterRegistry([
+        LayerSpec("susceptibility", write_layer(tmp_path / "susceptibility.tif", 0.4), 0.5),
+        LayerSpec("ignition", write_layer(tmp_path / "ignition.tif", 0.8), 0.5),
+    ])
+    service.exposure_raster = None
+    service.geocoder_chain = GeocoderChain([], "city")
+    return service
+
+
+@pytest.fixture
+def located_org(db):
+    org = Organization(name="Acme Forestry", sector="Forestry/Timber", country="US", latitude=40.0, longitude=-120.0)
+    db.add(org)
+    db.flush()
+    db.add(RiskOverlay(org_id=org.org_id, susceptibility=0.1, ignition=0.1, exposure_score=10.0,
+                       layer_values={"susceptibility": 0.1, "ignition": 0.1}))
+    db.commit()
+    return org
+
+
+def assert_resampled(db, org):
+    db.expire_all()
+    overlay = db.query(RiskOverlay).filter(RiskOverlay.org_id == org.org_id).one()
+    assert overlay.susceptibility == pytest.approx(0.4)
+    assert overlay.exposure_score == pytest.approx(60.0)
+    assert overlay.layer_values == pytest.approx({"susceptibility": 0.4, "ignition": 0.8})
+    versions = {v.layer: v.version for v in db.query(RiskLayerVersion)}
+    assert overlay.layer_versions == versions == {"susceptibility": 1, "ignition": 1}
+    return overlay
+
+
+def test_process_all_organizations_updates_layer_values(db, service, located_org):
+    assert service.process_all_organizations() == {located_org.org_id: True}
+    assert_resampled(db, located_org)
+
+
+def test_process_organization_updates_layer_values(db, service, located_org):
+    assert service.process_organization_geospatial(located_org.org_id)
+    assert_resampled(db, located_org)
+
+
+def test_overlay_worker_builds_only_rasters(service, monkeypatch):
+    layers = {name: {"path": spec.path, "weight": spec.weight} for name, spec in service.registry.specs.items()}
+    monkeypatch.setattr(geospatial.settings, "risk_layers", layers)
+    monkeypatch.setattr(GeocoderChain, "from_settings", classmethod(lambda cls: pytest.fail("geocoder built")))
+    monkeypatch.setattr(geospatial, "_worker_registry", None)
+    monkeypatch.setattr(geospatial, "_worker_exposure_raster", None)
+
+    geospatial._overlay_worker_init()
+    lats, lons = np.array([40.0, 41.0]), np.array([-120.0, -121.0])
+    rows = geospatial._overlay_worker_task(["a", "b"], lats, lons, {"susceptibility": 3})
+
+    service.layer_versions = {"susceptibility": 3}
+    assert rows == service.overlay_rows(["a", "b"], lats, lons)
+    assert rows[0]["layer_versions"] == {"susceptibility": 3}
+
+
+def test_precomputed_exposure_matches_layer_stack(tmp_path):
+    registry = RasterRegistry([
+        LayerSpec("susceptibility", write_layer(tmp_path / "susceptibility.tif", 0.4), 0.6),
+        LayerSpec("ignition", write_layer(tmp_path / "ignition.tif", 0.5), 0.3),
+    ])
+    exposure_path = str(tmp_path / "exposure.tif")
+    rasters.build_exposure_raster(registry.specs["susceptibility"].path, registry.specs["ignition"].path,
+                                  exposure_path, 0.6, 0.3)
+    lats, lons = np.array([40.0, 41.0]), np.array([-120.0, -121.0])
+
+    with rasters.open_risk_raster(exposure_path) as exposure_raster:
+        _, precomputed = geospatial.compute_overlay_values(registry, exposure_raster, lats, lons)
+    _, stacked = geospatial.compute_overlay_values(registry, None, lats, lons)
+    assert precomputed == pytest.approx(stacked)
+    assert stacked == pytest.approx([39.0, 39.0])
+
+
+def test_exposure_is_empty_when_a_weighted_layer_is_unavailable(tmp_path):
+    registry = RasterRegistry([
+        LayerSpec("susceptibility", write_layer(tmp_path / "susceptibility.tif", 0.4), 0.6),
+        LayerSpec("ignition", str(tmp_path / "missing.tif"), 0.4),
+    ])
+    values, exposure = geospatial.compute_overlay_values(registry, None, np.array([40.0]), np.array([-120.0]))
+    assert values["susceptibility"] == pytest.approx([0.4])
+    assert np.isnan(exposure).all()
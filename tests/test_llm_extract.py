@@ -0,0 +1,126 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.models import Contact, ExtractionProvenance, Organization, Program, Source
+from app.services import llm_extract
+from app.services.llm_extract import PROMPT_VERSION, WildfireLLMExtractor, save_extraction
+
+PAGE = (
+    "Sonoma Fire Safe Council runs a wildfire mitigation grant program for rural homeowners. "
+    "Contact the program office at grants@sonomafiresafe.org or call 707-555-0123 for details."
+)
+
+
+def _llm_response(payload):
+    message = SimpleNamespace(content=json.dumps(payload))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _source(db):
+    org = Organization(name="Placeholder", sector="Other", country="USA")
+    db.add(org)
+    db.flush()
+    source = Source(org_id=org.org_id, url="https://sonomafiresafe.org/grants", content_text=PAGE)
+    db.add(source)
+    db.flush()
+    return source
+
+
+def test_save_extraction_writes_contacts_found_in_page(db, monkeypatch):
+    payload = {
+        "name": "Sonoma Fire Safe Council",
+        "sector": "NGO/Conservation",
+        "country": "USA",
+        "programs": [{"name": "Wildfire Mitigation Grants", "description": "Defensible space grants"}],
+    }
+    monkeypatch.setattr(llm_extract, "create_chat_completion", lambda *args, **kwargs: _llm_response(payload))
+    source = _source(db)
+
+    extracted = asyncio.run(WildfireLLMExtractor().extract_organization_data(source.url, PAGE))
+    save_extraction(db, source, extracted, "test-model")
+    db.commit()
+
+    contacts = {c.channel_type: c for c in db.query(Contact).filter(Contact.org_id == source.org_id)}
+    assert contacts["email"].value == "grants@sonomafiresafe.org"
+    assert contacts["phone"].value == "707-555-0123"
+    assert all(c.source_url == source.url for c in contacts.values())
+    assert db.query(Program).filter(Program.org_id == source.org_id).count() == 1
+
+    provenance = db.query(ExtractionProvenance).filter(ExtractionProvenance.source_id == source.source_id).one()
+    assert provenance.success and provenance.prompt_version == PROMPT_VERSION
+
+
+def test_save_extraction_replaces_contacts_from_previous_run(db, monkeypatch):
+    payload = {"name": "Sonoma Fire Safe Council", "sector": "NGO/Conservation", "country": "USA"}
+    monkeypatch.setattr(llm_extract, "create_chat_completion", lambda *args, **kwargs: _llm_response(payload))
+    source = _source(db)
+    extractor = WildfireLLMExtractor()
+
+    for _ in range(2):
+        save_extraction(db, source, asyncio.run(extractor.extract_organization_data(source.url, PAGE)), "test-model")
+        db.commit()
+
+    assert db.query(Contact).filter(Contact.org_id == source.org_id).count() == 2
+
+
+def test_partition_counts_only_current_extractions_as_unchanged(db):
+    from app.services.llm_extract import partition_sources_for_extraction, source_content_hash
+
+    org = Organization(name="Org", sector="Other", country="USA")
+    db.add(org)
+    db.flush()
+    sources = [Source(org_id=org.org_id, url=f"https://example.org/{i}", content_text=f"page {i}",
+                      content_sha256=None if i == 0 else f"hash-{i}") for i in range(5)]
+    db.add_all(sources)
+    db.flush()
+    # Sources 0 (unhashed) and 1 are current; 2 changed since; 3 and 4 never extracted
+    for source, stored_hash in ((sources[0], source_content_hash(sources[0])), (sources[1], "hash-1"),
+                                (sources[2], "stale")):
+        db.add(ExtractionProvenance(source_id=source.source_id, org_id=org.org_id, content_sha256=stored_hash,
+                                    prompt_version=PROMPT_VERSION, model="m", success=True))
+    db.commit()
+
+    selected, unchanged = partition_sources_for_extraction(db)
+    assert sorted(s.url for s in selected) == [sources[i].url for i in (2, 3, 4)]
+    assert unchanged == 2
+
+    # --limit caps the batch to extract; the unchanged count still covers every current source
+    selected, unchanged = partition_sources_for_extraction(db, limit=1)
+    assert len(selected) == 1
+    assert selected[0].url in {sources[i].url for i in (2, 3, 4)}
+    assert unchanged == 2
+
+    selected, unchanged = partition_sources_for_extraction(db, force=True, limit=3)
+    assert len(selected) == 3
+    assert unchanged == 0
+
+
+def test_retry_after_is_capped(monkeypatch):
+    from app.config import settings
+    from app.services.llm_client import _retry_delay
+
+    monkeypatch.setattr(settings, "llm_max_retry_after_seconds", 30.0)
+    error = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "3600"}))
+    assert _retry_delay(error, 1) == 30.0
+
+
+def test_limit_applies_after_the_unchanged_filter(db):
+    from app.services.llm_extract import select_sources_for_extraction, source_content_hash
+
+    org = Organization(name="Org", sector="Other", country="USA")
+    db.add(org)
+    db.flush()
+    sources = [Source(org_id=org.org_id, url=f"https://example.org/{i}", content_text=f"page {i}") for i in range(6)]
+    db.add_all(sources)
+    db.flush()
+    # The first four (unhashed by the crawler) are already extracted; only 4 and 5 need work
+    for source in sources[:4]:
+        db.add(ExtractionProvenance(source_id=source.source_id, org_id=org.org_id,
+                                    content_sha256=source_content_hash(source), prompt_version=PROMPT_VERSION,
+                                    model="m", success=True))
+    db.commit()
+
+    selected = select_sources_for_extraction(db, limit=2)
+    assert sorted(s.url for s in selected) == [sources[4].url, sources[5].url]
+    assert all(s.content_sha256 == source_content_hash(s) for s in sources)
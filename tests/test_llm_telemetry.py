@@ -0,0 +1,16 @@
+from app.services.llm_telemetry import LLMTelemetry, clear_snapshots, load_snapshots
+
+
+def test_worker_snapshot_is_visible_to_other_processes(tmp_path):
+    worker = LLMTelemetry()
+    worker.record_call("extractor", "gpt-4o-mini", 0.5, prompt_tokens=1000, completion_tokens=200)
+    worker.record_cache_hit("extractor", 3)
+    worker.save_snapshot("extract_sources", directory=str(tmp_path))
+
+    snapshots = load_snapshots(str(tmp_path))
+    extractor = snapshots["extract_sources"]["summary"]["components"]["extractor"]
+    assert extractor["calls"] == 1
+    assert extractor["cache"]["skipped_calls"] == 3
+
+    assert clear_snapshots(str(tmp_path)) == 1
+    assert load_snapshots(str(tmp_path)) == {}
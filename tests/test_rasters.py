@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from affine import Affine
+from rasterio.crs import CRS
+
+from app.services.rasters import ArrayRaster, points_to_pixels, zonal_stats
+
+
+def brute_force_zonal_stats(raster, lats, lons, buffers_km):
+    """Reference: per-point distance grid over the whole raster"""
+    rows, cols = points_to_pixels(raster.transform, lats, lons)
+    grid_r, grid_c = np.mgrid[0:raster.height, 0:raster.width]
+    px = abs(raster.transform.a) / 1000.0
+    data = raster.array.astype(np.float64)
+    data[data == raster.nodata] = np.nan
+    out = {b: {"mean": [], "max": [], "p90": []} for b in buffers_km}
+    for r, c in zip(rows, cols):
+        dist2 = ((grid_r - r) * px) ** 2 + ((grid_c - c) * px) ** 2
+        for b in buffers_km:
+            values = data[dist2 <= b * b]
+            values = values[~np.isnan(values)]
+            out[b]["mean"].append(values.mean() if values.size else np.nan)
+            out[b]["max"].append(values.max() if values.size else np.nan)
+            out[b]["p90"].append(np.percentile(values, 90) if values.size else np.nan)
+    return out
+
+
+@pytest.fixture
+def projected_raster():
+    rng = np.random.default_rng(0)
+    array = rng.uniform(0, 1, size=(60, 80)).astype(np.float32)
+    array[10:14, 20:30] = -9999  # nodata patch
+    array[:, :3] = -9999  # nodata edge
+    transform = Affine(100.0, 0, 0, 0, -100.0, 6000.0)  # 100 m pixels
+    return ArrayRaster(array, transform, -9999, "test", "memory", crs=CRS.from_epsg(3857))
+
+
+def test_zonal_stats_matches_brute_force(projected_raster):
+    # Interior points, points near the edge and nodata, and one well outside the raster
+    xs = np.array([4050.0, 150.0, 2550.0, 7950.0, 2450.0, 50000.0])
+    ys = np.array([3050.0, 5950.0, 4750.0, 50.0, 4850.0, 3000.0])
+    buffers = [0.25, 0.5, 1.0]
+    result = zonal_stats(projected_raster, ys, xs, buffers, tile=16)
+    expected = brute_force_zonal_stats(projected_raster, ys, xs, buffers)
+    for b in buffers:
+        for stat in ("mean", "max", "p90"):
+            np.testing.assert_allclose(result[b][stat], expected[b][stat], rtol=1e-6)
+    assert np.isnan(result[1.0]["mean"][-1])
+
+
+def test_zonal_stats_batches_points_sharing_a_window(projected_raster, monkeypatch):
+    monkeypatch.setattr("app.services.rasters.ZONAL_GATHER_CELLS", 50)
+    xs = np.linspace(500, 7500, 25)
+    ys = np.linspace(500, 5500, 25)
+    result = zonal_stats(projected_raster, ys, xs, [0.3])
+    expected = brute_force_zonal_stats(projected_raster, ys, xs, [0.3])
+    np.testing.assert_allclose(result[0.3]["mean"], expected[0.3]["mean"], rtol=1e-6)
+
+
+def test_zonal_stats_geographic_constant_raster():
+    array = np.full((200, 200), 7.0, dtype=np.float32)
+    transform = Affine(0.01, 0, -120.0, 0, -0.01, 40.0)
+    raster = ArrayRaster(array, transform, None, "geo", "memory", crs=CRS.from_epsg(4326))
+    result = zonal_stats(raster, [39.0, 38.5], [-119.0, -118.5], [2.0, 5.0])
+    for b in (2.0, 5.0):
+        np.testing.assert_allclose(result[b]["mean"], [7.0, 7.0])
+        np.testing.assert_allclose(result[b]["max"], [7.0, 7.0])
@@ -0,0 +1,29 @@
+import pytest
+
+from app.models import LeadScoring, LeadScoringHistory, Organization, RiskOverlay, ScoringConfigVersion
+from app.services import scoring
+
+
+def test_single_org_rescore_records_history_and_config_version(db, session_factory, monkeypatch):
+    monkeypatch.setattr(scoring, "SessionLocal", session_factory)
+    org = Organization(name="Acme Forestry", sector="Forestry/Timber", country="US")
+    other = Organization(name="Beta Utilities", sector="Utilities", country="US")
+    db.add_all([org, other])
+    db.flush()
+    db.add(RiskOverlay(org_id=org.org_id, exposure_score=50.0))
+    db.commit()
+
+    lead = scoring.score_organization(org.org_id)
+
+    assert lead is not None and lead.org_id == org.org_id
+    version = db.query(ScoringConfigVersion).one()
+    assert lead.config_version == version.id
+    history = db.query(LeadScoringHistory).one()
+    assert (history.org_id, history.config_version) == (org.org_id, version.id)
+    assert (history.score, history.tier) == (pytest.approx(lead.propensity_score), lead.tier)
+    assert db.query(LeadScoring).count() == 1
+
+
+def test_single_org_rescore_of_unknown_org_returns_none(db, session_factory, monkeypatch):
+    monkeypatch.setattr(scoring, "SessionLocal", session_factory)
+    assert scoring.score_organization("00000000-0000-0000-0000-000000000000") is None
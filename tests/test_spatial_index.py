@@ -0,0 +1,29 @@
+import pytest
+
+from app.models import Organization
+from app.services import spatial_index
+from app.services.spatial_index import find_in_bbox, find_nearest, find_within_radius
+
+
+@pytest.fixture
+def located(db, monkeypatch):
+    monkeypatch.setattr(spatial_index, "_index", None)
+    points = {"Sacramento": (38.58, -121.49), "Reno": (39.53, -119.81), "Fresno": (36.74, -119.79),
+              "Fiji": (-17.7, 179.9), "Unplaced": (None, None)}
+    orgs = {name: Organization(name=name, sector="Other", country="US", latitude=lat, longitude=lon)
+            for name, (lat, lon) in points.items()}
+    db.add_all(orgs.values())
+    db.commit()
+    return {name: org.org_id for name, org in orgs.items()}
+
+
+def test_queries_run_on_the_grid_index(db, located):
+    nearest = find_nearest(db, 38.6, -121.5, k=2)
+    assert [org_id for org_id, _ in nearest] == [located["Sacramento"], located["Reno"]]
+    assert nearest[0][1] < 5
+
+    within = find_within_radius(db, 38.6, -121.5, 250)
+    assert [org_id for org_id, _ in within] == [located["Sacramento"], located["Reno"]]
+
+    bbox = {org_id for org_id, _ in find_in_bbox(db, -20, 179, -15, -179)}  # crosses the antimeridian
+    assert bbox == {located["Fiji"]}
@@ -0,0 +1,51 @@
+from app.models import LeadScoring, Organization, StatsSummary
+from app.services.stats_summary import _histogram, get_stats_summary
+
+
+def add_scored(db, *scores):
+    for i, score in enumerate(scores):
+        org = Organization(name=f"Org {i}", sector="Utilities", country="US")
+        db.add(org)
+        db.flush()
+        db.add(LeadScoring(org_id=org.org_id, propensity_score=score, tier="B", rationale=""))
+    db.commit()
+
+
+def test_histogram_floors_scores_into_bins(db):
+    add_scored(db, 0.0, 9.99, 10.0, 19.6, 55.5, 99.9, 100.0)
+    histogram = _histogram(db, LeadScoring.propensity_score)
+    assert histogram["0-10"] == 2
+    assert histogram["10-20"] == 2
+    assert histogram["20-30"] == 0
+    assert histogram["50-60"] == 1
+    assert histogram["90-100"] == 2
+    assert sum(histogram.values()) == 7
+
+
+def test_summary_is_recomputed_after_org_and_review_writes(db):
+    add_scored(db, 42.0)
+    assert get_stats_summary(db)["total_organizations"] == 1
+    assert db.query(StatsSummary).one().stale is False
+
+    db.add(Organization(name="New Org", sector="Other", country="CA"))
+    db.commit()
+    assert db.query(StatsSummary).one().stale is True
+    summary = get_stats_summary(db)
+    assert summary["total_organizations"] == 2
+    assert summary["by_country"] == {"US": 1, "CA": 1}
+
+    lead = db.query(LeadScoring).one()
+    lead.reviewer_status = "approved"
+    db.commit()
+    assert get_stats_summary(db)["by_reviewer_status"] == {"approved": 1}
+
+
+def test_unrelated_writes_leave_summary_fresh(db):
+    add_scored(db, 42.0)
+    get_stats_summary(db)
+    org = db.query(Organization).one()
+    org.notes = "called back"
+    lead = db.query(LeadScoring).one()
+    lead.reviewer_notes = "looks good"
+    db.commit()
+    assert db.query(StatsSummary).one().stale is False